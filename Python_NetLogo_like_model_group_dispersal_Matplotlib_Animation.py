@@ -14,20 +14,34 @@ Features:
 - Results saved automatically when simulation finishes.
 - Comprehensive debugging and logging system.
 - Anti-loop movement system to prevent agents getting stuck.
+- Headless command-line runner:
+    python Python_NetLogo_like_model_group_dispersal_Matplotlib_Animation.py run --steps 18000 \
+        --param group_dispersal_range=10 --seed 3
 """
 
 import numpy as np
-import random
 import math
 import os
+import sys
 import time
 import logging
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import tkinter as tk
-from tkinter import messagebox
-import matplotlib.patches as mpatches
-from collections import defaultdict, deque
+import argparse
+import inspect
+import json
+import hashlib
+import shutil
+import tempfile
+import itertools
+import csv
+import platform
+import tracemalloc
+import threading
+import queue
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+# matplotlib and tkinter are imported lazily (plotting / GUI only), so headless runs start fast
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -35,17 +49,1270 @@ logger = logging.getLogger(__name__)
 
 # ---------------- Enhanced Model classes ----------------
 
+STRATEGIES = ('cooperator', 'conditional', 'defector')
+STRATEGY_CODES = {name: code for code, name in enumerate(STRATEGIES)}
+STRATEGY_COLORS = ('green', 'blue', 'red')
+NO_PATCH = -1  # patch column value for agents that never reached a food patch
+EMPTY = -1  # occupancy value of a cell without an agent
+
+
+@lru_cache(maxsize=None)
+def disk_offsets(radius):
+    """(dx, dy) offsets of the cells within ``radius`` of a cell, excluding the cell itself"""
+    r = int(math.floor(radius))
+    dx, dy = np.meshgrid(np.arange(-r, r + 1), np.arange(-r, r + 1), indexing='ij')
+    dx, dy = dx.ravel(), dy.ravel()
+    keep = (dx * dx + dy * dy <= radius * radius) & ((dx != 0) | (dy != 0))
+    dx, dy = dx[keep].astype(np.int32), dy[keep].astype(np.int32)
+    dx.flags.writeable = False
+    dy.flags.writeable = False
+    return dx, dy
+
+
+@lru_cache(maxsize=None)
+def neighbour_table(radius, height):
+    """Flat-index form of disk_offsets(radius) on a grid of the given height.
+
+    Returns the offsets ``dx * height + dy`` (K of them) and a boolean table of shape
+    (r+1, r+1, r+1, r+1, K): entry [left, right, below, above] marks the offsets that
+    stay inside the world for a cell with that many columns/rows to each edge (capped at r).
+    """
+    dx, dy = disk_offsets(radius)
+    r = int(math.floor(radius))
+    room = np.arange(r + 1)
+    left, right, below, above = np.ix_(room, room, room, room)
+    inside = ((-dx <= left[..., None]) & (dx <= right[..., None]) &
+              (-dy <= below[..., None]) & (dy <= above[..., None]))
+    offsets = dx.astype(np.int64) * height + dy
+    offsets.flags.writeable = False
+    inside.flags.writeable = False
+    return offsets, inside
+
+
+def neighbourhood(x, y, radius, width, height):
+    """Flat cell indices (x * height + y) within ``radius`` of (x, y), and which of them lie in the world.
+
+    Works for one position (K cells) and for arrays of positions (one row of K per
+    position); cells outside the world are replaced by (x, y) itself.
+    """
+    offsets, table = neighbour_table(radius, height)
+    r = int(math.floor(radius))
+    x = np.asarray(x, dtype=np.int64)
+    y = np.asarray(y, dtype=np.int64)
+    inside = table[np.minimum(x, r), np.minimum(width - 1 - x, r), np.minimum(y, r), np.minimum(height - 1 - y, r)]
+    cell = (x * height + y)[..., None]
+    return np.where(inside, cell + offsets, cell), inside
+
+
 class Patch:
-    def __init__(self):
-        self.is_gap = True
-        self.seedpatch = False
-        self.seedpatchnum = None
-        self.foodpatch = False
-        self.foodpatchnum = None
-        self.assortindex = 0.0
-        self.resource = 0.0
+    """Read-only view of one cell of the model's world arrays"""
+    __slots__ = ('model', 'x', 'y')
+
+    def __init__(self, model, x, y):
+        self.model = model
+        self.x = x
+        self.y = y
+
+    @property
+    def is_gap(self):
+        return bool(self.model.is_gap_grid[self.x, self.y])
+
+    @property
+    def seedpatch(self):
+        return (self.x, self.y) in self.model.seed_patches
+
+    @property
+    def seedpatchnum(self):
+        return self.model.seed_patches.get((self.x, self.y))
+
+    @property
+    def foodpatch(self):
+        return bool(self.model.foodpatch_grid[self.x, self.y])
+
+    @property
+    def foodpatchnum(self):
+        num = self.model.food_patch[self.model.food_index[self.x, self.y]]
+        return None if num == NO_PATCH else int(num)
+
+    @property
+    def assortindex(self):
+        """Cooperator share of the food patch this cell is the seed of (0 elsewhere), as NetLogo calcassort"""
+        num = self.seedpatchnum
+        return 0.0 if num is None else float(self.model.assortment()[num])
+
+    @property
+    def resource(self):
+        return float(self.model.food_resource[self.model.food_index[self.x, self.y]])
+
+
+class PatchGrid:
+    """Lazy ``grid[x][y]`` access to Patch views, for code that wants per-cell objects"""
+    __slots__ = ('model',)
+
+    def __init__(self, model):
+        self.model = model
+
+    def __len__(self):
+        return self.model.width
+
+    def __getitem__(self, x):
+        if not 0 <= x < self.model.width:
+            raise IndexError(x)
+        return _PatchColumn(self.model, x)
+
+
+class _PatchColumn:
+    __slots__ = ('model', 'x')
+
+    def __init__(self, model, x):
+        self.model = model
+        self.x = x
+
+    def __len__(self):
+        return self.model.height
+
+    def __getitem__(self, y):
+        if not 0 <= y < self.model.height:
+            raise IndexError(y)
+        return Patch(self.model, self.x, y)
+
+
+def resolve_claims(cells, priority):
+    """Mask of the claims that win their cell: per cell, the claim with the lowest priority value"""
+    order = np.argsort(priority, kind='stable')
+    _, first = np.unique(cells[order], return_index=True)
+    won = np.zeros(len(cells), dtype=bool)
+    won[order[first]] = True
+    return won
+
+
+def pick_random_true(mask, u):
+    """Column index of a uniformly chosen True entry in every row of ``mask`` (rows need one True)"""
+    pick = (u * mask.sum(axis=1)).astype(np.int64)
+    rank = np.cumsum(mask, axis=1) - 1
+    return np.argmax(mask & (rank == pick[:, None]), axis=1)
+
+
+def choose_moves(candidates, res, min_resource, u):
+    """Column of the move target in every row of ``candidates`` (rows need one True).
+
+    A uniformly chosen cell among the richest candidates holding at least
+    ``min_resource``, or among all candidates when none does; ``u`` are uniforms.
+    """
+    valid = candidates & (res >= min_resource)
+    richest = valid & (res == np.where(valid, res, -np.inf).max(axis=1, keepdims=True))
+    return pick_random_true(np.where(valid.any(axis=1, keepdims=True), richest, candidates), u)
+
+
+def tally_strategies(counter, codes):
+    """Add per-strategy counts of ``codes`` to a {strategy name: count} dict"""
+    for code, n in enumerate(np.bincount(codes, minlength=len(STRATEGIES))):
+        counter[STRATEGIES[code]] += int(n)
+
+
+def build_world(width, height, patch_width, gap_size, carrying_capacity):
+    """NetLogo-style island world: circular food patches on a regular lattice, separated by gaps.
+
+    Food cells are kept in flat arrays, in row-major order: ``food_x``, ``food_y``,
+    ``food_patch`` and ``food_resource``, each with one trailing sentinel entry
+    (NO_PATCH / 0.0) that ``food_index[x, y] == -1`` selects for gap cells. Every
+    disk is stamped on its own bounding box, so setup costs O(food area) apart
+    from allocating the dense masks.
+    """
+    centers = []
+    i = 0
+    while True:
+        cx = (gap_size // 2) + i * (gap_size + patch_width)
+        if cx >= width: 
+            break
+        j = 0
+        while True:
+            cy = (gap_size // 2) + j * (gap_size + patch_width)
+            if cy >= height: 
+                break
+            centers.append((cx, cy))
+            j += 1
+        i += 1
+
+    # Set seed patches
+    seed_patches = {(int(cx), int(cy)): k for k, (cx, cy) in enumerate(centers)}
+
+    # Disk offsets, same distance test as a full-grid np.sqrt
+    r = int(math.floor(patch_width))
+    dx, dy = np.meshgrid(np.arange(-r, r + 1), np.arange(-r, r + 1), indexing='ij')
+    inside = np.sqrt(dx ** 2 + dy ** 2) <= patch_width
+    dx, dy = dx[inside], dy[inside]
+
+    keys, patches = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int32)]
+    for k, (cx, cy) in enumerate(centers):
+        x, y = cx + dx, cy + dy
+        ok = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        keys.append((x[ok] * height + y[ok]).astype(np.int64))
+        patches.append(np.full(int(ok.sum()), k, dtype=np.int32))
+    # where disks overlap the later patch wins, as when stamping in order
+    keys, patches = np.concatenate(keys)[::-1], np.concatenate(patches)[::-1]
+    cells, first = np.unique(keys, return_index=True)
+    n_food = len(cells)
+
+    food_index = np.full(width * height, -1, dtype=np.int32)
+    food_index[cells] = np.arange(n_food, dtype=np.int32)
+    food_index = food_index.reshape(width, height)
+    foodpatch_grid = food_index >= 0
+    return {
+        'is_gap_grid': ~foodpatch_grid, 'foodpatch_grid': foodpatch_grid, 'food_index': food_index,
+        'food_x': (cells // height).astype(np.int32), 'food_y': (cells % height).astype(np.int32),
+        'food_patch': np.append(patches[first], np.int32(NO_PATCH)),
+        'food_resource': np.append(np.full(n_food, float(carrying_capacity), dtype=np.float32), np.float32(0.0)),
+        'seed_patches': seed_patches,
+    }
+
+
+WORLD_FORMAT = 1  # bump whenever build_world changes what it produces (invalidates cached worlds)
+WORLD_CACHE_SIZE = 8  # worlds kept in memory per process
+_world_cache = {}
+
+
+def world_key(width, height, patch_width, gap_size, carrying_capacity):
+    """Content address of a world layout: a hash of everything build_world depends on"""
+    spec = json.dumps([WORLD_FORMAT, width, height, patch_width, gap_size, carrying_capacity])
+    return hashlib.sha1(spec.encode()).hexdigest()[:16]
+
+
+def load_world(width, height, patch_width, gap_size, carrying_capacity, cache_dir=None):
+    """build_world output, built once per process and shared read-only by every model using it.
+
+    With ``cache_dir`` the arrays are also kept there as .npy files (one folder per
+    world key) and read back memory-mapped, so the workers of a sweep share a
+    single copy through the OS page cache. The arrays are read-only; models copy
+    ``food_resource`` before changing it.
+    """
+    key = world_key(width, height, patch_width, gap_size, carrying_capacity)
+    world = _world_cache.get(key)
+    if world is not None:
+        return world
+
+    if cache_dir is None:
+        world = build_world(width, height, patch_width, gap_size, carrying_capacity)
+    else:
+        path = os.path.join(cache_dir, f"world-{key}")
+        if not os.path.isdir(path):
+            _save_world(path, build_world(width, height, patch_width, gap_size, carrying_capacity))
+        world = _read_world(path)
+    for value in world.values():
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+
+    if len(_world_cache) >= WORLD_CACHE_SIZE:
+        del _world_cache[next(iter(_world_cache))]  # oldest first
+    _world_cache[key] = world
+    return world
+
+
+def _save_world(path, world):
+    """Write a world to ``path`` atomically (another process may be writing the same one)"""
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=".world-")
+    try:
+        for name, value in world.items():
+            if isinstance(value, np.ndarray):
+                np.save(os.path.join(tmp, f"{name}.npy"), value)
+        seeds = np.array([(x, y, k) for (x, y), k in world['seed_patches'].items()], dtype=np.int64).reshape(-1, 3)
+        np.save(os.path.join(tmp, "seed_patches.npy"), seeds)
+        os.rename(tmp, path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _read_world(path):
+    world = {}
+    for fname in os.listdir(path):
+        name, ext = os.path.splitext(fname)
+        if ext == ".npy":
+            world[name] = np.load(os.path.join(path, fname), mmap_mode='r')
+    world['seed_patches'] = {(int(x), int(y)): int(k) for x, y, k in world['seed_patches']}
+    return world
+
+
+class RandomBlock:
+    """Uniform [0, 1) numbers drawn from a Generator in blocks and handed out one at a time.
+
+    Keeps the per-agent draws of the asynchronous loop to one list lookup each
+    instead of one Generator call each.
+    """
+
+    def __init__(self, rng, size=4096):
+        self.rng = rng
+        self.size = size
+        self.buffer = []
+        self.pos = 0
+
+    def next(self):
+        if self.pos >= len(self.buffer):
+            self.buffer = self.rng.random(self.size).tolist()
+            self.pos = 0
+        u = self.buffer[self.pos]
+        self.pos += 1
+        return u
+
+    def index(self, n):
+        """Uniform random integer in [0, n)"""
+        return int(self.next() * n)
+
+
+def spawn_seeds(root_seed, n):
+    """Independent child seeds for ``n`` replicates, spawned from one root seed"""
+    return np.random.SeedSequence(root_seed).spawn(n)
+
+
+class AgentView:
+    """Read-only dict-style view of one agent row (keeps the old agent-dict keys working)"""
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key):
+        s, r = self.store, self.row
+        if key == 'position':
+            return (int(s.x[r]), int(s.y[r]))
+        if key == 'strategy':
+            return STRATEGIES[s.strategy[r]]
+        if key == 'eattype':
+            return 'low' if s.strategy[r] == STRATEGY_CODES['cooperator'] else 'high'
+        if key == 'color':
+            return STRATEGY_COLORS[s.strategy[r]]
+        if key == 'mypatch':
+            return None if s.patch[r] == NO_PATCH else int(s.patch[r])
+        if key == 'parent':
+            return None if s.parent[r] < 0 else int(s.parent[r])
+        if key == 'last_positions':
+            return s.recent_positions(r)
+        if key == 'id':
+            return int(s.id[r])
+        if key == 'energy':
+            return float(s.energy[r])
+        if key == 'alive':
+            return bool(s.alive[r])
+        if key == 'stuck_counter':
+            return int(s.stuck_counter[r])
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"AgentView(id={self['id']}, strategy={self['strategy']}, position={self['position']})"
+
+
+class AgentStore:
+    """Structure-of-arrays storage for every agent ever created.
+
+    Each agent owns one row of the column arrays; ``id_to_row`` maps the stable
+    agent id to its row. Columns grow by amortized doubling.
+    """
+    HISTORY = 3  # number of recent positions remembered for the anti-loop rule
+    N_STRATEGIES = len(STRATEGIES)  # strategy codes are 0 .. N_STRATEGIES - 1
+    COLUMNS = ('id', 'x', 'y', 'energy', 'strategy', 'alive', 'patch', 'parent', 'stuck_counter',
+               'history_x', 'history_y', 'history_len')
+
+    def __init__(self, capacity=64, first_id=0, id_step=1):
+        self.size = 0
+        self.capacity = 0
+        self.next_id = first_id
+        self.id_step = id_step  # ids handed out: first_id, first_id + id_step, ... (strided per tile, see TileWorker)
+        self.id_to_row = {}
+        self.n_alive = 0  # alive rows are alive_list[:n_alive]; alive_pos[row] is the slot of a row
+        self.alive_by_strategy = np.zeros(self.N_STRATEGIES, dtype=np.int64)  # kept up to date on add/kill
+        self.alive_by_patch = None  # (patches + 1, strategies) census, see track_patches
+        self._grow(max(1, capacity))
+
+    def _grow(self, capacity):
+        """Reallocate all columns to the given capacity, keeping existing rows"""
+        def resized(old, shape, dtype, fill):
+            new = np.full(shape, fill, dtype=dtype)
+            if old is not None:
+                new[:self.size] = old[:self.size]
+            return new
+
+        get = lambda name: getattr(self, name, None)
+        self.id = resized(get('id'), capacity, np.int64, -1)
+        self.x = resized(get('x'), capacity, np.int32, 0)
+        self.y = resized(get('y'), capacity, np.int32, 0)
+        self.energy = resized(get('energy'), capacity, np.float64, 0.0)
+        self.strategy = resized(get('strategy'), capacity, np.int8, 0)
+        self.alive = resized(get('alive'), capacity, bool, False)
+        self.patch = resized(get('patch'), capacity, np.int32, NO_PATCH)
+        self.parent = resized(get('parent'), capacity, np.int64, -1)
+        self.stuck_counter = resized(get('stuck_counter'), capacity, np.int32, 0)
+        self.history_x = resized(get('history_x'), (capacity, self.HISTORY), np.int32, -1)
+        self.history_y = resized(get('history_y'), (capacity, self.HISTORY), np.int32, -1)
+        self.history_len = resized(get('history_len'), capacity, np.int8, 0)
+        self.alive_list = resized(get('alive_list'), capacity, np.int64, -1)
+        self.alive_pos = resized(get('alive_pos'), capacity, np.int64, -1)
+        self.capacity = capacity
+
+    def add(self, x, y, energy, strategy, patch=NO_PATCH, parent=-1):
+        """Append one agent and return its row"""
+        if self.size == self.capacity:
+            self._grow(2 * self.capacity)
+        row = self.size
+        self.id[row] = self.next_id
+        self.x[row] = x
+        self.y[row] = y
+        self.energy[row] = energy
+        self.strategy[row] = strategy
+        self.alive[row] = True
+        self.patch[row] = patch
+        self.parent[row] = parent
+        self.clear_movement(row)
+        self.id_to_row[self.next_id] = row
+        self.alive_list[self.n_alive] = row
+        self.alive_pos[row] = self.n_alive
+        self.n_alive += 1
+        self.alive_by_strategy[strategy] += 1
+        self.count_patches(row, 1)
+        self.next_id += self.id_step
+        self.size += 1
+        return row
+
+    def add_many(self, xs, ys, energy, strategies, patch=NO_PATCH, parent=-1, ids=None):
+        """Append several agents at once and return their rows (``ids`` keeps existing ids, e.g. of arrivals)"""
+        n = len(xs)
+        while self.size + n > self.capacity:
+            self._grow(2 * self.capacity)
+        rows = np.arange(self.size, self.size + n)
+        if ids is None:
+            ids = self.next_id + self.id_step * np.arange(n, dtype=np.int64)
+            self.next_id += self.id_step * n
+        else:
+            ids = np.asarray(ids, dtype=np.int64)
+        self.id[rows] = ids
+        self.x[rows] = xs
+        self.y[rows] = ys
+        self.energy[rows] = energy
+        self.strategy[rows] = strategies
+        self.alive[rows] = True
+        self.patch[rows] = patch
+        self.parent[rows] = parent
+        self.clear_movement(rows)
+        self.id_to_row.update(zip(ids.tolist(), rows.tolist()))
+        self.alive_list[self.n_alive:self.n_alive + n] = rows
+        self.alive_pos[rows] = np.arange(self.n_alive, self.n_alive + n)
+        self.n_alive += n
+        self.alive_by_strategy += np.bincount(self.strategy[rows], minlength=self.N_STRATEGIES)
+        self.count_patches(rows, 1)
+        self.size += n
+        return rows
+
+    def clear_movement(self, row):
+        """Reset the anti-loop state of ``row`` (or an array of rows); rows are reused after ``compact``"""
+        self.stuck_counter[row] = 0
+        self.history_x[row] = -1
+        self.history_y[row] = -1
+        self.history_len[row] = 0
+
+    def kill(self, row):
+        """Mark one agent dead; its slot in the alive list is filled by the last alive row"""
+        self.alive[row] = False
+        slot = self.alive_pos[row]
+        last = self.alive_list[self.n_alive - 1]
+        self.alive_list[slot] = last
+        self.alive_pos[last] = slot
+        self.alive_pos[row] = -1
+        self.n_alive -= 1
+        self.alive_by_strategy[self.strategy[row]] -= 1
+        self.count_patches(row, -1)
+
+    def kill_many(self, rows):
+        """Mark several agents dead at once (one pass over the alive list)"""
+        if len(rows) == 0:
+            return
+        self.alive_by_strategy -= np.bincount(self.strategy[rows], minlength=self.N_STRATEGIES)
+        self.count_patches(rows, -1)
+        self.alive[rows] = False
+        self.alive_pos[rows] = -1
+        alive = self.alive_list[:self.n_alive]
+        alive = alive[self.alive[alive]]
+        self.n_alive = len(alive)
+        self.alive_list[:self.n_alive] = alive
+        self.alive_pos[alive] = np.arange(self.n_alive)
+
+    def compact(self):
+        """Drop the rows of dead agents so their storage is reused.
+
+        Alive agents keep their ids and their order in the alive list, but move
+        to lower rows; returns ``remap`` (old row -> new row, -1 for dropped rows)
+        so that callers can update row references they hold.
+        """
+        keep = np.flatnonzero(self.alive[:self.size])
+        n = len(keep)
+        remap = np.full(self.size, -1, dtype=np.int64)
+        remap[keep] = np.arange(n)
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[:n] = column[keep]
+        self.alive[n:self.size] = False
+        self.alive_list[:self.n_alive] = remap[self.alive_list[:self.n_alive]]
+        self.alive_pos[:self.size] = -1
+        self.alive_pos[self.alive_list[:self.n_alive]] = np.arange(self.n_alive)
+        self.size = n
+        self.id_to_row = dict(zip(self.id[:n].tolist(), range(n)))
+        if self.capacity > 64 and self.capacity > 4 * n:
+            self._grow(max(64, 2 * n))  # also give back memory after a population crash
+        return remap
+
+    def state(self):
+        """The used part of every column, keyed by column name (for checkpoints)"""
+        columns = {name: getattr(self, name)[:self.size] for name in self.COLUMNS}
+        columns['alive_list'] = self.alive_list[:self.n_alive]
+        return columns
+
+    def restore(self, columns, next_id):
+        """Replace the whole store with previously saved columns"""
+        size = len(columns['id'])
+        self.size = 0
+        self._grow(max(64, 2 * size))
+        for name in self.COLUMNS:
+            getattr(self, name)[:size] = columns[name]
+        self.size = size
+        self.next_id = int(next_id)
+        self.id_to_row = dict(zip(self.id[:size].tolist(), range(size)))
+        alive = np.asarray(columns['alive_list'], dtype=np.int64)
+        self.n_alive = len(alive)
+        self.alive_list[:self.n_alive] = alive
+        self.alive_pos[:] = -1
+        self.alive_pos[alive] = np.arange(self.n_alive)
+        self.alive_by_strategy = np.bincount(self.strategy[alive], minlength=self.N_STRATEGIES).astype(np.int64)
+        if self.alive_by_patch is not None:
+            self.track_patches(len(self.alive_by_patch) - 1)
+
+    def push_history(self, row, x, y):
+        """Remember (x, y) as the most recent position of the agent in ``row`` (or arrays of them)"""
+        self.history_x[row, :-1] = self.history_x[row, 1:]
+        self.history_y[row, :-1] = self.history_y[row, 1:]
+        self.history_x[row, -1] = x
+        self.history_y[row, -1] = y
+        self.history_len[row] = np.minimum(self.history_len[row] + 1, self.HISTORY)
+
+    def recent_positions(self, row):
+        """Recent positions of one agent, oldest first"""
+        n = int(self.history_len[row])
+        return [(int(px), int(py)) for px, py in
+                zip(self.history_x[row, self.HISTORY - n:], self.history_y[row, self.HISTORY - n:])]
+
+    def alive_rows(self):
+        """Rows of the alive agents, in alive-list order (a copy, safe to keep across kills)"""
+        return self.alive_list[:self.n_alive].copy()
+
+    @property
+    def n_dead(self):
+        """Rows still held by dead agents (reclaimed by ``compact``)"""
+        return self.size - self.n_alive
+
+    def row_of(self, agent_id):
+        return self.id_to_row[agent_id]
+
+    def view(self, row):
+        return AgentView(self, row)
+
+    def strategy_counts(self, rows=None):
+        """Number of agents per strategy code among ``rows`` (default: all alive, from the running counts)"""
+        if rows is None:
+            return self.alive_by_strategy.copy()
+        return np.bincount(self.strategy[rows], minlength=self.N_STRATEGIES)
+
+    # ---------- Per-patch census ----------
+    def track_patches(self, n_patches):
+        """Keep alive agents counted by food patch and strategy from now on.
+
+        ``alive_by_patch[p, s]`` is the number of alive agents of strategy ``s``
+        whose patch column is ``p``; the last row counts agents with NO_PATCH.
+        Births, deaths and ``set_patch`` keep it up to date.
+        """
+        self.alive_by_patch = np.zeros((n_patches + 1, self.N_STRATEGIES), dtype=np.int64)
+        self.count_patches(self.alive_list[:self.n_alive], 1)
+
+    def count_patches(self, rows, sign):
+        """Add (sign=1) or remove (sign=-1) one row or an array of rows in the per-patch census"""
+        census = self.alive_by_patch
+        if census is None:
+            return
+        if np.ndim(rows) == 0:
+            census[self.patch[rows], self.strategy[rows]] += sign  # NO_PATCH (-1) is the last row
+        elif len(rows):
+            cells = self.patch[rows] % len(census) * self.N_STRATEGIES + self.strategy[rows]
+            census += sign * np.bincount(cells, minlength=census.size).reshape(census.shape)
+
+    def set_patch(self, rows, patch):
+        """Move alive agents (one row or an array of rows) to another food patch"""
+        self.count_patches(rows, -1)
+        self.patch[rows] = patch
+        self.count_patches(rows, 1)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.size
+        if not 0 <= row < self.size:
+            raise IndexError(row)
+        return AgentView(self, row)
+
+    def __iter__(self):
+        for row in range(self.size):
+            yield AgentView(self, row)
+
+
+class FlockmateCounter:
+    """Per-strategy neighbour counting within a fixed Euclidean radius.
+
+    Keeps, for every strategy, column-wise prefix sums of agent counts along y
+    (``prefix[s, x, j]`` = agents of strategy ``s`` in column ``x`` with ``y < j``).
+    A disk count is then one prefix difference per disk column, so a query
+    costs O(radius) and moving an agent costs O(height), independent of the
+    number of agents.
+    """
+
+    def __init__(self, width, height, radius, n_strategies=len(STRATEGIES)):
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.prefix = np.zeros((n_strategies, width, height + 1), dtype=np.int32)
+
+        # Column offsets of the disk and the half-height of the disk in each column
+        r = min(int(math.floor(radius)), max(width, height)) if radius >= 0 else -1
+        self.dx = np.arange(-r, r + 1, dtype=np.int64)
+        rest = radius * radius - self.dx * self.dx
+        half = np.floor(np.sqrt(np.maximum(rest, 0))).astype(np.int64)
+        half[(half + 1) ** 2 <= rest] += 1  # guard against sqrt rounding down a perfect square
+        half[half * half > rest] -= 1
+        self.half = half
+
+    def add(self, x, y, strategy):
+        self.prefix[strategy, x, y + 1:] += 1
+
+    def remove(self, x, y, strategy):
+        self.prefix[strategy, x, y + 1:] -= 1
+
+    def move(self, ox, oy, x, y, strategy):
+        self.prefix[strategy, ox, oy + 1:] -= 1
+        self.prefix[strategy, x, y + 1:] += 1
+
+    def rebuild(self, xs, ys, strategies):
+        """Recompute all prefix sums from scratch for the given agent positions"""
+        n_strategies, width, height = self.prefix.shape[0], self.width, self.height
+        cells = (np.asarray(strategies, dtype=np.int64) * width + xs) * height + ys
+        counts = np.bincount(cells, minlength=n_strategies * width * height)
+        np.cumsum(counts.reshape(n_strategies, width, height), axis=2, out=self.prefix[:, :, 1:])
+
+    def count_at(self, x, y, strategy):
+        """Agents of ``strategy`` within radius of (x, y), including one standing on (x, y)"""
+        return int(self.count_many(np.array([x]), np.array([y]), np.array([strategy]))[0])
+
+    def count_many(self, xs, ys, strategies):
+        """Vectorized ``count_at`` for arrays of query cells and strategy codes"""
+        xs = np.asarray(xs, dtype=np.int64)[:, None]
+        ys = np.asarray(ys, dtype=np.int64)[:, None]
+        strategies = np.asarray(strategies, dtype=np.int64)[:, None]
+        cols = xs + self.dx
+        inside = (cols >= 0) & (cols < self.width)
+        cols = np.clip(cols, 0, self.width - 1)
+        lo = np.clip(ys - self.half, 0, self.height)
+        hi = np.clip(ys + self.half + 1, 0, self.height)
+        counts = self.prefix[strategies, cols, hi] - self.prefix[strategies, cols, lo]
+        return np.where(inside, counts, 0).sum(axis=1)
+
+
+class StatsSink:
+    """Bounded-memory columnar store for the per-step statistics.
+
+    Rows go into preallocated NumPy buffers of ``buffer_rows`` rows. A full buffer
+    is appended to ``path`` as CSV and dropped from memory or, without a path, kept
+    as a compact in-memory chunk. ``every=k`` records every k-th step only; the
+    latest values are always available through ``last``.
+    """
+    COLUMNS = (('steps', np.int64), ('cooperators', np.int64), ('conditionals', np.int64),
+               ('defectors', np.int64), ('total_resources', np.float64), ('runtime', np.float64),
+               ('agents_alive', np.int64), ('loop_prevention_ratio', np.float64))
+
+    def __init__(self, path=None, buffer_rows=4096, every=1, columns=None):
+        self.columns = tuple(columns or self.COLUMNS)
+        self.names = tuple(name for name, _ in self.columns)
+        self.path = path
+        self.buffer_rows = max(1, int(buffer_rows))
+        self.every = max(1, int(every))
+        self.buffer = {name: np.zeros(self.buffer_rows, dtype=dtype) for name, dtype in self.columns}
+        self.filled = 0
+        self.chunks = []  # flushed blocks, in-memory mode only
+        self.flushed_rows = 0
+        self.flushed_bytes = 0  # size of the CSV file after the last flush
+        self.steps_seen = 0
+        self.latest = {}
+
+    def append(self, values):
+        """Record one step, given as {column name: value}"""
+        self.latest = values
+        self.steps_seen += 1
+        if (self.steps_seen - 1) % self.every:
+            return
+        for name in self.names:
+            self.buffer[name][self.filled] = values[name]
+        self.filled += 1
+        if self.filled == self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """Move the buffered rows to the file (or to an in-memory chunk)"""
+        if not self.filled:
+            return
+        block = {name: self.buffer[name][:self.filled].copy() for name in self.names}
+        if self.path is None:
+            self.chunks.append(block)
+        else:
+            self._write(block)
+        self.flushed_rows += self.filled
+        self.filled = 0
+
+    def _write(self, block):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        new_file = self.flushed_bytes == 0
+        with open(self.path, 'w' if new_file else 'a', newline='', encoding='utf-8') as f:
+            if new_file:
+                f.write(",".join(self.names) + "\n")
+            fmt = ['%d' if np.issubdtype(dtype, np.integer) else '%.10g' for _, dtype in self.columns]
+            np.savetxt(f, np.column_stack([block[name] for name in self.names]), fmt=fmt, delimiter=",")
+        self.flushed_bytes = os.path.getsize(self.path)
+
+    def column(self, name):
+        """Every recorded value of one column (reads flushed rows back from the file)"""
+        dtype = dict(self.columns)[name]
+        parts = []
+        if self.path is not None and self.flushed_rows:
+            parts.append(np.loadtxt(self.path, delimiter=",", skiprows=1, ndmin=1,
+                                    usecols=self.names.index(name)).astype(dtype))
+        parts.extend(chunk[name] for chunk in self.chunks)
+        parts.append(self.buffer[name][:self.filled])
+        return np.concatenate(parts)
+
+    def last(self, name):
+        return self.latest[name]
+
+    def __getitem__(self, name):
+        return self.column(name)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __len__(self):
+        """Number of recorded rows"""
+        return self.flushed_rows + self.filled
+
+    # Checkpoint support: rows still in memory plus the file position they follow
+    def state(self):
+        columns = {name: np.concatenate([chunk[name] for chunk in self.chunks]
+                                        + [self.buffer[name][:self.filled]]) for name in self.names}
+        meta = {'steps_seen': self.steps_seen, 'flushed_rows': self.flushed_rows,
+                'flushed_bytes': self.flushed_bytes,
+                'latest': {k: (v.item() if isinstance(v, np.generic) else v) for k, v in self.latest.items()}}
+        return columns, meta
+
+    def restore(self, columns, meta):
+        self.steps_seen = meta['steps_seen']
+        self.flushed_bytes = meta['flushed_bytes']
+        self.latest = meta['latest']
+        if self.path is not None:
+            # Drop rows written after the checkpoint was taken
+            if self.flushed_bytes and os.path.exists(self.path) and os.path.getsize(self.path) > self.flushed_bytes:
+                os.truncate(self.path, self.flushed_bytes)
+            self.flushed_rows = meta['flushed_rows']
+        n = len(columns[self.names[0]])
+        self.chunks = []
+        self.filled = 0
+        if self.path is None:
+            self.flushed_rows = 0
+            if n > self.buffer_rows:
+                self.chunks.append({name: np.asarray(columns[name], dtype=dtype) for name, dtype in self.columns})
+                self.flushed_rows = n
+                return
+        for name in self.names:
+            self.buffer[name][:n] = columns[name]
+        self.filled = n
+
+
+class StepProfiler:
+    """Per-phase wall-clock times and call counts of ``AgentModel.step``, one table row per step.
+
+    Phases accumulate through ``lap`` and counters through ``count``; ``end_step``
+    moves the totals of the current step into ``table`` (a StatsSink, so long runs
+    can stream it to ``path``). Models built without ``profile=True`` have no
+    profiler, and the instrumented code only tests ``if prof:``.
+    """
+    PHASES = ('move', 'flockmates', 'dispersal', 'harvest', 'living', 'reproduce', 'regrow', 'compact')
+    COUNTERS = ('agents', 'neighbour_lookups', 'free_neighbours', 'flockmate_queries', 'moves', 'deaths', 'births')
+
+    def __init__(self, path=None, buffer_rows=4096):
+        columns = ([('steps', np.int64), ('step_time', np.float64)]
+                   + [(f"{phase}_time", np.float64) for phase in self.PHASES]
+                   + [(name, np.int64) for name in self.COUNTERS])
+        self.table = StatsSink(path=path, buffer_rows=buffer_rows, columns=columns)
+        self.times = dict.fromkeys(self.PHASES, 0.0)
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+        self.step_start = None
+
+    def begin_step(self):
+        self.step_start = time.perf_counter()
+        return self.step_start
+
+    def lap(self, phase, since):
+        """Charge the time since ``since`` to ``phase``; returns now, for the next lap"""
+        now = time.perf_counter()
+        self.times[phase] += now - since
+        return now
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def end_step(self, step):
+        row = {'steps': step, 'step_time': time.perf_counter() - self.step_start}
+        row.update({f"{phase}_time": t for phase, t in self.times.items()})
+        row.update(self.counts)
+        self.table.append(row)
+        self.times = dict.fromkeys(self.PHASES, 0.0)
+        self.counts = dict.fromkeys(self.COUNTERS, 0)
+
+    def summary(self):
+        """{phase: (total seconds, share of the step time)} over all profiled steps"""
+        total = float(self.table['step_time'].sum())
+        return {phase: (t, t / total if total else 0.0)
+                for phase, t in ((p, float(self.table[f"{p}_time"].sum())) for p in self.PHASES)}
+
+    def save_csv(self, path):
+        """Write the per-step table to ``path``"""
+        columns = [self.table[name] for name in self.table.names]
+        fmt = ['%d' if np.issubdtype(dtype, np.integer) else '%.6g' for _, dtype in self.table.columns]
+        np.savetxt(path, np.column_stack(columns), fmt=fmt, delimiter=",",
+                   header=",".join(self.table.names), comments="")
+
+
+# ---------------- Trajectory recording ----------------
+class TrajectoryRecorder:
+    """Append-only recording of a run, for offline replay (see Trajectory and render_replay).
+
+    A recording is a folder:
+      meta.json      format version, world size and model parameters
+      layout.npz     food_x, food_y of the food cells (gaps hold no resource)
+      agents.bin     AGENT_RECORD rows: the alive agents of every recorded step
+      resources.bin  4-byte words: per recorded step a keyframe (the float32 resource of
+                     every food cell) or a delta (n int32 food cells, then their n float32 values)
+      index.bin      INDEX_RECORD per recorded step: where its data starts in the two files and how many
+    A keyframe is written every ``keyframe_every`` recorded steps, and whenever the
+    delta to the previous recorded step would not be smaller. Rows are buffered and
+    appended ``chunk_steps`` recorded steps at a time, index last, so a recording
+    can be read up to its last chunk while the run goes on or after a crash.
+    """
+    FORMAT = 1
+    FILES = ('agents.bin', 'resources.bin', 'index.bin')
+    AGENT_RECORD = np.dtype([('id', '<i4'), ('x', '<u2'), ('y', '<u2'), ('strategy', 'i1'), ('energy', '<f2')])
+    INDEX_RECORD = np.dtype([('step', '<i8'), ('agents_start', '<i8'), ('agents_count', '<i8'),
+                             ('resources_start', '<i8'), ('resources_count', '<i8'), ('keyframe', '?')])
+
+    def __init__(self, path, every=1, keyframe_every=100, chunk_steps=64):
+        self.path = path
+        self.every = max(1, int(every))
+        self.keyframe_every = max(1, int(keyframe_every))
+        self.chunk_steps = max(1, int(chunk_steps))
+        self.opened = False
+        self.agent_chunks = []
+        self.resource_chunks = []
+        self.index_rows = []
+        self.agents_end = 0  # rows written or buffered so far
+        self.resources_end = 0
+        self.last_resource = None  # food resources at the previous recorded step
+        self.since_keyframe = 0
+
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+    def open(self, model, step):
+        """Start a new recording or, for a run resumed at ``step``, continue the one already in ``path``"""
+        os.makedirs(self.path, exist_ok=True)
+        meta = {'format': self.FORMAT, 'width': model.width, 'height': model.height,
+                'food_cells': len(model.food_x), 'params': model.params_snapshot}
+        if step > 0 and os.path.exists(self.file('index.bin')) and self._same_world(meta):
+            # drop whatever was recorded from the resume step on, then append
+            index = np.fromfile(self.file('index.bin'), dtype=self.INDEX_RECORD)
+            index = index[index['step'] < step]
+            if len(index):
+                self.agents_end = int(index['agents_start'][-1] + index['agents_count'][-1])
+                self.resources_end = int(index['resources_start'][-1] + self.resource_words(index[-1]))
+            os.truncate(self.file('agents.bin'), self.agents_end * self.AGENT_RECORD.itemsize)
+            os.truncate(self.file('resources.bin'), self.resources_end * 4)
+            index.tofile(self.file('index.bin'))
+            logger.info(f"Continuing trajectory recording {self.path} at step {step}")
+        else:
+            for name in self.FILES:
+                open(self.file(name), 'wb').close()
+            with open(self.file('meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, indent=1, default=str)
+            np.savez(self.file('layout.npz'), food_x=model.food_x, food_y=model.food_y)
+        self.opened = True
+
+    def _same_world(self, meta):
+        try:
+            with open(self.file('meta.json'), encoding='utf-8') as f:
+                old = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return all(old.get(key) == meta[key] for key in ('format', 'width', 'height', 'food_cells'))
+
+    def record(self, model, step):
+        """Buffer the state after ``step`` (recorded every ``every`` steps)"""
+        if step % self.every:
+            return
+        if not self.opened:
+            self.open(model, step)
+        store = model.agents
+        rows = store.alive_rows()
+        agents = np.empty(len(rows), dtype=self.AGENT_RECORD)
+        agents['id'] = store.id[rows]
+        agents['x'] = store.x[rows]
+        agents['y'] = store.y[rows]
+        agents['strategy'] = store.strategy[rows]
+        agents['energy'] = store.energy[rows]
+
+        resource = model.food_resource[:-1].astype('<f4')
+        keyframe = self.last_resource is None or self.since_keyframe + 1 >= self.keyframe_every
+        if not keyframe:
+            cells = np.flatnonzero(resource != self.last_resource).astype('<i4')
+            keyframe = 2 * len(cells) >= len(resource)
+        if keyframe:
+            n, words = len(resource), resource
+            self.since_keyframe = 0
+        else:
+            n, words = len(cells), np.concatenate((cells.view('<f4'), resource[cells]))
+            self.since_keyframe += 1
+        self.last_resource = resource
+
+        self.index_rows.append((step, self.agents_end, len(agents), self.resources_end, n, keyframe))
+        self.agent_chunks.append(agents)
+        self.resource_chunks.append(words)
+        self.agents_end += len(agents)
+        self.resources_end += len(words)
+        if len(self.index_rows) >= self.chunk_steps:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered steps to the files"""
+        if not self.index_rows:
+            return
+        for name, chunks in (('agents.bin', self.agent_chunks), ('resources.bin', self.resource_chunks)):
+            with open(self.file(name), 'ab') as f:
+                np.concatenate(chunks).tofile(f)
+        with open(self.file('index.bin'), 'ab') as f:
+            np.array(self.index_rows, dtype=self.INDEX_RECORD).tofile(f)
+        self.agent_chunks, self.resource_chunks, self.index_rows = [], [], []
+
+    @staticmethod
+    def resource_words(entry):
+        """Number of resources.bin words of an index entry: n for a keyframe, 2 n for a delta"""
+        return int(entry['resources_count']) * (1 if entry['keyframe'] else 2)
+
+
+class Trajectory:
+    """A TrajectoryRecorder folder opened for reading, with random access to every recorded step.
+
+    The agent and resource files are memory-mapped; ``resources`` rebuilds a step
+    from the nearest keyframe before it, or from the last step it rebuilt when that
+    is closer, so replaying forwards applies one set of changes per step.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != TrajectoryRecorder.FORMAT:
+            raise ValueError(f"{path} is not a trajectory recording of format {TrajectoryRecorder.FORMAT}")
+        self.width = self.meta['width']
+        self.height = self.meta['height']
+        with np.load(os.path.join(path, 'layout.npz')) as layout:
+            self.food_x, self.food_y = layout['food_x'], layout['food_y']
+        self.index = np.fromfile(os.path.join(path, 'index.bin'), dtype=TrajectoryRecorder.INDEX_RECORD)
+        self.steps = self.index['step']
+        ends = self.index[-1] if len(self.index) else None
+        self.agent_rows = self._map('agents.bin', TrajectoryRecorder.AGENT_RECORD,
+                                    0 if ends is None else ends['agents_start'] + ends['agents_count'])
+        self.resource_words = self._map('resources.bin', np.dtype('<f4'), 0 if ends is None else
+                                        ends['resources_start'] + TrajectoryRecorder.resource_words(ends))
+        self._rebuilt = None  # (index position, resources) of the last rebuilt step
+
+    def _map(self, name, dtype, rows):
+        if not rows:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode='r', shape=(int(rows),))
+
+    def __len__(self):
+        return len(self.index)
+
+    def position(self, step):
+        """Index position of a recorded step"""
+        i = int(np.searchsorted(self.steps, step))
+        if i == len(self.steps) or self.steps[i] != step:
+            span = f"{self.steps[0]}..{self.steps[-1]}" if len(self.steps) else "none"
+            raise KeyError(f"Step {step} is not in the recording (recorded steps: {span})")
+        return i
+
+    def agents(self, step):
+        """AGENT_RECORD rows (id, x, y, strategy, energy) of the agents alive after ``step``"""
+        entry = self.index[self.position(step)]
+        return self.agent_rows[entry['agents_start']:entry['agents_start'] + entry['agents_count']]
+
+    def resources(self, step):
+        """Resources of the food cells (in ``food_x`` / ``food_y`` order) after ``step``"""
+        i = self.position(step)
+        start = int(np.flatnonzero(self.index['keyframe'][:i + 1])[-1])
+        if self._rebuilt is not None and start <= self._rebuilt[0] <= i:
+            start, values = self._rebuilt[0] + 1, self._rebuilt[1].copy()
+        else:
+            values = np.zeros(len(self.food_x), dtype=np.float32)
+        for entry in self.index[start:i + 1]:
+            first, n = entry['resources_start'], entry['resources_count']
+            if entry['keyframe']:
+                values[:] = self.resource_words[first:first + n]
+            else:
+                values[self.resource_words[first:first + n].view('<i4')] = self.resource_words[first + n:first + 2 * n]
+        self._rebuilt = (i, values)
+        return values.copy()
+
+    def resource_grid(self, step):
+        """Dense (width, height) resources after ``step``"""
+        grid = np.zeros((self.width, self.height), dtype=np.float32)
+        grid[self.food_x, self.food_y] = self.resources(step)
+        return grid
+
+
+# ---------------- Event log ----------------
+class EventLog:
+    """Append-only, columnar log of births, deaths and patch changes, for lineage and founder analyses.
+
+    Every kind of event is a table (TABLES) whose rows are appended in batches to
+    preallocated NumPy buffers of ``buffer_rows`` rows. Full buffers are flushed
+    as one chunk: an ``events_NNNNN.npz`` file in ``path`` or, without a path, a
+    block kept in memory. Agents are identified by their stable id; the agents
+    created at setup are logged as births at step -1 with parent -1 (the founders).
+    Deaths carry their cause (CAUSES); a migration is any change of food patch,
+    from NO_PATCH for an agent born in a gap.
+    """
+    TABLES = {
+        'birth': (('step', np.int32), ('parent', np.int64), ('child', np.int64), ('strategy', np.int8),
+                  ('mutated', bool), ('patch', np.int32)),
+        'death': (('step', np.int32), ('agent', np.int64), ('strategy', np.int8), ('cause', np.int8),
+                  ('patch', np.int32)),
+        'migration': (('step', np.int32), ('agent', np.int64), ('strategy', np.int8), ('from_patch', np.int32),
+                      ('to_patch', np.int32)),
+    }
+    CAUSES = ('living_costs', 'migration')  # death causes, by code
+
+    def __init__(self, path=None, buffer_rows=65536):
+        self.path = path
+        self.buffer_rows = max(1, int(buffer_rows))
+        self.buffers = {kind: {name: np.zeros(self.buffer_rows, dtype=dtype) for name, dtype in columns}
+                        for kind, columns in self.TABLES.items()}
+        self.filled = dict.fromkeys(self.TABLES, 0)
+        self.chunks = []  # flushed blocks, in-memory mode only
+        self.n_chunks = 0
+        self.started = False  # old chunk files in ``path`` are removed before the first flush
+
+    # ---------- Writing ----------
+    def add(self, kind, **values):
+        """Append events of one kind; values are scalars or equal-length arrays, one per column"""
+        sizes = [np.size(value) for value in values.values() if np.ndim(value)]
+        n = sizes[0] if sizes else 1
+        if n == 0:
+            return
+        if self.filled[kind] + n > self.buffer_rows:
+            self.flush()
+            if n > self.buffer_rows:
+                self._write({k: {name: np.broadcast_to(values[name], n) if k == kind else
+                                 np.empty(0, dtype=dtype) for name, dtype in self.TABLES[k]} for k in self.TABLES})
+                return
+        start = self.filled[kind]
+        for name, column in self.buffers[kind].items():
+            column[start:start + n] = values[name]
+        self.filled[kind] = start + n
+
+    def birth(self, step, parent, child, strategy, mutated, patch):
+        self.add('birth', step=step, parent=parent, child=child, strategy=strategy, mutated=mutated, patch=patch)
+
+    def death(self, step, agent, strategy, cause, patch):
+        self.add('death', step=step, agent=agent, strategy=strategy, cause=self.CAUSES.index(cause), patch=patch)
+
+    def migration(self, step, agent, strategy, from_patch, to_patch):
+        self.add('migration', step=step, agent=agent, strategy=strategy, from_patch=from_patch, to_patch=to_patch)
+
+    def flush(self):
+        """Move the buffered events to a new chunk"""
+        if not any(self.filled.values()):
+            return
+        block = {kind: {name: column[:self.filled[kind]].copy() for name, column in columns.items()}
+                 for kind, columns in self.buffers.items()}
+        self.filled = dict.fromkeys(self.TABLES, 0)
+        self._write(block)
+
+    def _write(self, block):
+        if self.path is None:
+            self.chunks.append(block)
+            return
+        if not self.started:
+            os.makedirs(self.path, exist_ok=True)
+            for name in self.chunk_files():
+                os.remove(name)
+            self.started = True
+        np.savez(os.path.join(self.path, f"events_{self.n_chunks:05d}.npz"),
+                 **{f"{kind}__{name}": column for kind, columns in block.items() for name, column in columns.items()})
+        self.n_chunks += 1
+
+    def chunk_files(self):
+        if self.path is None or not os.path.isdir(self.path):
+            return []
+        return sorted(os.path.join(self.path, name) for name in os.listdir(self.path)
+                      if name.startswith("events_") and name.endswith(".npz"))
+
+    def resume(self, step):
+        """Continue the log of a run resumed at ``step``: drop what was logged from ``step`` on
+        (and the setup births of the rebuilt model, which the log already has)"""
+        self.filled = dict.fromkeys(self.TABLES, 0)
+        self.chunks = [{kind: {name: column[columns['step'] < step] for name, column in columns.items()}
+                        for kind, columns in block.items()} for block in self.chunks]
+        for name in self.chunk_files():
+            block = self._read(name)
+            keep = {kind: columns['step'] < step for kind, columns in block.items()}
+            if not all(mask.all() for mask in keep.values()):
+                np.savez(name, **{f"{kind}__{col}": column[keep[kind]]
+                                  for kind, columns in block.items() for col, column in columns.items()})
+            self.n_chunks = max(self.n_chunks, int(os.path.basename(name)[7:12]) + 1)
+        self.started = True
+
+    def state(self):
+        """Every logged event as {'<kind>__<column>': array}, for checkpoints of logs kept in memory"""
+        return {f"{kind}__{name}": column for kind in self.TABLES for name, column in self.table(kind).items()}
+
+    def restore(self, columns):
+        """Replace an in-memory log with ``state`` output"""
+        self.filled = dict.fromkeys(self.TABLES, 0)
+        self.chunks = [{kind: {name: np.asarray(columns[f"{kind}__{name}"], dtype=dtype) for name, dtype in spec}
+                        for kind, spec in self.TABLES.items()}]
+
+    # ---------- Reading ----------
+    def _read(self, name):
+        with np.load(name) as data:
+            return {kind: {col: data[f"{kind}__{col}"] for col, _ in columns} for kind, columns in self.TABLES.items()}
+
+    def table(self, kind):
+        """Every logged event of one kind, as {column: array} in logging order"""
+        blocks = [self._read(name)[kind] for name in self.chunk_files()] if self.started else []
+        blocks += [block[kind] for block in self.chunks]
+        blocks.append({name: column[:self.filled[kind]] for name, column in self.buffers[kind].items()})
+        return {name: np.concatenate([block[name] for block in blocks]).astype(dtype, copy=False)
+                for name, dtype in self.TABLES[kind]}
+
+    @classmethod
+    def load(cls, path):
+        """Open the log written to ``path`` by a finished (or checkpointed) run, for queries"""
+        log = cls(path)
+        log.started = True
+        return log
+
+    # ---------- Queries ----------
+    def lineage(self):
+        """(child ids sorted, their parent ids) of every birth; founders have parent -1"""
+        births = self.table('birth')
+        order = np.argsort(births['child'], kind='stable')
+        return births['child'][order], births['parent'][order]
+
+    def ancestors(self, agent):
+        """Ids from ``agent`` up to its founder, ``agent`` first"""
+        child, parent = self.lineage()
+        chain = [agent]
+        while True:
+            i = np.searchsorted(child, chain[-1])
+            if i == len(child) or child[i] != chain[-1] or parent[i] == -1:
+                return chain
+            chain.append(int(parent[i]))
+
+    def descendants(self, agent):
+        """Ids of all descendants of ``agent``, generation by generation"""
+        births = self.table('birth')
+        generations = []
+        frontier = np.array([agent], dtype=np.int64)
+        while len(frontier):
+            frontier = births['child'][np.isin(births['parent'], frontier)]
+            generations.append(frontier)
+        return np.concatenate(generations)
+
+    def founders(self):
+        """(agent ids, founder ids): the setup agent every logged agent descends from"""
+        child, parent = self.lineage()
+        if not len(child):
+            return child, child.copy()
+        founder = np.where(parent == -1, child, parent)
+        while True:  # pointer jumping: replace every founder guess by its own parent until it has none
+            i = np.minimum(np.searchsorted(child, founder), len(child) - 1)
+            up = (child[i] == founder) & (parent[i] != -1)
+            if not up.any():
+                return child, founder
+            founder[up] = parent[i[up]]
+
+    def population(self):
+        """{'agent', 'strategy', 'patch'} of the agents alive at the end of the log, by id (patch: the
+        last food patch moved to, else the birth patch)"""
+        births, deaths, moves = self.table('birth'), self.table('death'), self.table('migration')
+        alive = ~np.isin(births['child'], deaths['agent'])
+        order = np.argsort(births['child'][alive], kind='stable')
+        agent = births['child'][alive][order]
+        strategy, patch = births['strategy'][alive][order], births['patch'][alive][order]
+        last = len(moves['agent']) - 1 - np.unique(moves['agent'][::-1], return_index=True)[1]
+        if len(agent) and len(last):
+            i = np.minimum(np.searchsorted(agent, moves['agent'][last]), len(agent) - 1)
+            hit = agent[i] == moves['agent'][last]
+            patch[i[hit]] = moves['to_patch'][last[hit]]
+        return {'agent': agent, 'strategy': strategy, 'patch': patch}
+
+    def founder_effects(self):
+        """Per food patch, among the agents alive at the end of the log: number of agents, number of
+        founder lineages they come from and the share of the largest lineage"""
+        pop = self.population()
+        child, founder = self.founders()
+        lineage = founder[np.searchsorted(child, pop['agent'])]
+        on_patch = pop['patch'] != NO_PATCH
+        patch, lineage = pop['patch'][on_patch], lineage[on_patch]
+        pairs, pair_counts = np.unique(np.stack((patch.astype(np.int64), lineage)), axis=1, return_counts=True)
+        patches, start = np.unique(pairs[0], return_index=True)
+        agents = np.add.reduceat(pair_counts, start) if len(start) else np.zeros(0, dtype=np.int64)
+        lineages = np.diff(np.append(start, len(pairs[0])))
+        largest = np.maximum.reduceat(pair_counts, start) if len(start) else np.zeros(0, dtype=np.int64)
+        return {'patch': patches, 'agents': agents, 'lineages': lineages,
+                'top_share': largest / np.maximum(agents, 1)}
+
+
+def default_results_dir():
+    """``results`` folder next to this script"""
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
 
 class AgentModel:
+    COMPACT_MIN_DEAD = 1024  # dead rows tolerated before the agent store is compacted
+    STATS_COLUMNS = StatsSink.COLUMNS + (('mean_assortment', np.float64), ('relatedness', np.float64))
+    STOP_RULES = ('fixation', 'extinction', 'stationary')
+
     def __init__(self, width=112, height=112,
                  initial_agents=80, percent_cooperators=60, percent_conditionals=10,
                  patch_width=4, gap_size=20,
@@ -53,7 +1320,12 @@ class AgentModel:
                  living_costs=1, dispersal_cost=8, group_dispersal_range=50,
                  mutation_rate=0.0, cost_child=10,
                  results_prefix="simulation_results", random_seed=None,
-                 debug_mode=True):
+                 debug_mode=True, update_mode="asynchronous",
+                 checkpoint_every=0, checkpoint_path=None,
+                 stats_path=None, stats_buffer_rows=4096, stats_every=1, profile=False,
+                 stop_rules="", stationary_window=500, stationary_tolerance=0.01, world_cache=None,
+                 record_path=None, record_every=1, record_keyframe_every=100,
+                 log_events=False, events_path=None, events_buffer_rows=65536):
         
         # Performance tracking
         self.start_time = time.time()
@@ -76,10 +1348,32 @@ class AgentModel:
         self.cost_child = cost_child
         self.results_prefix = results_prefix
         self.run_seed = random_seed
+        if update_mode not in ("asynchronous", "synchronous"):
+            raise ValueError(f"update_mode must be 'asynchronous' or 'synchronous', not {update_mode!r}")
+        self.update_mode = update_mode
+        self.checkpoint_every = checkpoint_every  # 0 = no automatic checkpoints
+        self.checkpoint_path = checkpoint_path
+        self.world_cache = world_cache  # folder for memory-mapped world templates (see load_world)
+
+        # Stopping rules ("fixation,extinction,stationary"; empty = run for the whole step budget)
+        if isinstance(stop_rules, str):
+            stop_rules = [rule.strip() for rule in stop_rules.split(",") if rule.strip()]
+        unknown = set(stop_rules) - set(self.STOP_RULES)
+        if unknown:
+            raise ValueError(f"Unknown stop rule(s) {sorted(unknown)}, expected some of {self.STOP_RULES}")
+        self.stop_rules = tuple(stop_rules)
+        if 'fixation' in self.stop_rules and mutation_rate > 0:
+            logger.warning("Stop rule 'fixation' ignored: with mutation a lost strategy can come back")
+        self.stationary_window = int(stationary_window)
+        self.stationary_tolerance = stationary_tolerance
+        self.mix_history = np.zeros((max(2, self.stationary_window), len(STRATEGIES)))  # ring buffer of strategy shares
+        self.mix_seen = 0
+        self.stop_reason = None
+        self.stop_step = None
 
-        if random_seed is not None:
-            random.seed(random_seed)
-            np.random.seed(random_seed)
+        # Model-owned random stream (random_seed may be an int, None or a SeedSequence)
+        self.rng = np.random.default_rng(random_seed)
+        self.uniforms = RandomBlock(self.rng)
 
         # Snapshot of params for logging
         self.params_snapshot = {
@@ -92,34 +1386,37 @@ class AgentModel:
             "living_costs": living_costs, "dispersal_cost": dispersal_cost,
             "group_dispersal_range": group_dispersal_range,
             "mutation_rate": mutation_rate, "cost_child": cost_child,
-            "results_prefix": results_prefix, "random_seed": random_seed
+            "results_prefix": results_prefix, "random_seed": random_seed,
+            "update_mode": update_mode,
+            "checkpoint_every": checkpoint_every, "checkpoint_path": checkpoint_path,
+            "stats_path": stats_path, "stats_buffer_rows": stats_buffer_rows, "stats_every": stats_every,
+            "profile": profile, "stop_rules": ",".join(self.stop_rules),
+            "stationary_window": stationary_window, "stationary_tolerance": stationary_tolerance,
+            "world_cache": world_cache,
+            "record_path": record_path, "record_every": record_every, "record_keyframe_every": record_keyframe_every,
+            "log_events": log_events, "events_path": events_path, "events_buffer_rows": events_buffer_rows
         }
         
         if self.debug_mode:
             logger.info(f"[PARAMS] {self.params_snapshot}")
 
-        # Enhanced data structures for performance
-        self.grid = [[Patch() for _ in range(self.height)] for _ in range(self.width)]
-        
-        # Numpy arrays for faster operations
-        self.resource_grid = np.zeros((self.width, self.height), dtype=np.float32)
-        self.is_gap_grid = np.ones((self.width, self.height), dtype=bool)
-        self.foodpatch_grid = np.zeros((self.width, self.height), dtype=bool)
-        
-        # Agents list and spatial optimization
-        self.agents = []
-        self.next_agent_id = 0
-        self.alive_agents_cache = []  # Cache for alive agents
-        self.cache_valid = False
-        
-        # Agent movement history to prevent loops
-        self.agent_movement_history = defaultdict(lambda: deque(maxlen=5))
+        # World state: numpy arrays only (``grid`` gives read-only Patch views)
+        self.grid = PatchGrid(self)
+        # (food cells: flat arrays plus the food_index lookup, see build_world)
+        self.occupancy = np.full((self.width, self.height), EMPTY, dtype=np.int32)  # agent row per cell
+        self.flock_counter = FlockmateCounter(self.width, self.height, self.group_dispersal_range)
         
+        # Agents (columnar store) and spatial optimization
+        self.agents = AgentStore(capacity=max(64, 2 * initial_agents))
+
         # Statistics
-        self.stats = {
-            'cooperators': [], 'conditionals': [], 'defectors': [], 
-            'total_resources': [], 'steps': [], 'performance_metrics': []
-        }
+        self.stats = StatsSink(path=stats_path, buffer_rows=stats_buffer_rows, every=stats_every,
+                               columns=self.STATS_COLUMNS)
+        self.profiler = StepProfiler() if profile else None  # per-phase timings, see StepProfiler
+        self.recorder = (TrajectoryRecorder(record_path, every=record_every, keyframe_every=record_keyframe_every)
+                         if record_path else None)  # per-step agents and resources for replay
+        self.events = (EventLog(events_path, buffer_rows=events_buffer_rows)
+                       if log_events or events_path else None)  # births, deaths and migrations, see EventLog
 
         # Enhanced tracking
         self.migration_deaths = {'cooperator': 0, 'conditional': 0, 'defector': 0}
@@ -128,79 +1425,85 @@ class AgentModel:
         self.total_moves = 0
 
         # Create world and agents
+        setup_start = time.perf_counter()
         self.setup_world_netlogo_style()
+        world_done = time.perf_counter()
+        self.agents.track_patches(len(self.seed_patches))
         self.setup_agents_from_params()
+        self.setup_times = {'world': world_done - setup_start, 'agents': time.perf_counter() - world_done}
+
+    def get_alive_rows(self):
+        """Array of the store rows of alive agents (maintained incrementally by the store)"""
+        return self.agents.alive_rows()
 
     def get_alive_agents(self):
-        """Cached access to alive agents for performance"""
-        if not self.cache_valid:
-            self.alive_agents_cache = [a for a in self.agents if a['alive']]
-            self.cache_valid = True
-        return self.alive_agents_cache
+        """Views of the alive agents (dict-style access, for inspection and plotting)"""
+        return [self.agents.view(row) for row in self.get_alive_rows()]
+
+    def patch_census(self):
+        """(patches, strategies) alive agents by food patch (the last one reached) and strategy"""
+        return self.agents.alive_by_patch[:-1].copy()
+
+    def assortment(self):
+        """Per food patch, the share of cooperators (low eaters) among its agents; 0 for empty patches"""
+        census = self.agents.alive_by_patch[:-1]
+        return census[:, STRATEGY_CODES['cooperator']] / np.maximum(census.sum(axis=1), 1)
 
-    def invalidate_cache(self):
-        """Invalidate cache when agents die/born"""
-        self.cache_valid = False
+    def group_structure(self):
+        """Group-selection statistics from the per-patch census, O(patches).
+
+        ``mean_assortment``: mean cooperator share over the occupied food patches
+        (NetLogo avassort, without the empty patches). ``relatedness``: variance
+        of the cooperator share between patches, weighted by patch size, over
+        p(1 - p) for the global cooperator share p (assortment coefficient; 0 when
+        groups are random samples of the population, 1 when they are pure).
+        """
+        census = self.agents.alive_by_patch[:-1]
+        sizes = census.sum(axis=1)
+        occupied = sizes > 0
+        total = sizes.sum()
+        if total == 0:
+            return {'mean_assortment': 0.0, 'relatedness': 0.0}
+        share = census[occupied, STRATEGY_CODES['cooperator']] / sizes[occupied]
+        p = census[:, STRATEGY_CODES['cooperator']].sum() / total
+        between = np.dot(sizes[occupied], (share - p) ** 2) / total
+        return {'mean_assortment': float(share.mean()),
+                'relatedness': float(between / (p * (1 - p))) if 0 < p < 1 else 0.0}
+
+    def compact_agents(self):
+        """Drop dead agents from the store and point the occupancy grid at their new rows"""
+        store = self.agents
+        store.compact()
+        self.occupancy[store.x[:store.size], store.y[:store.size]] = np.arange(store.size, dtype=np.int32)
 
     # ---------- Enhanced world setup ----------
     def setup_world_netlogo_style(self):
         """Enhanced world setup with numpy optimization"""
-        centers = []
-        i = 0
-        while True:
-            cx = (self.gap_size // 2) + i * (self.gap_size + self.patch_width)
-            if cx >= self.width: 
-                break
-            j = 0
-            while True:
-                cy = (self.gap_size // 2) + j * (self.gap_size + self.patch_width)
-                if cy >= self.height: 
-                    break
-                centers.append((cx, cy))
-                j += 1
-            i += 1
-
-        # Set seed patches
-        for k, (cx, cy) in enumerate(centers):
-            if 0 <= cx < self.width and 0 <= cy < self.height:
-                p = self.grid[cx][cy]
-                p.seedpatch = True
-                p.seedpatchnum = k
-
-        # Create circular food patches efficiently
-        x_coords, y_coords = np.meshgrid(np.arange(self.width), np.arange(self.height), indexing='ij')
-        
-        for k, (cx, cy) in enumerate(centers):
-            # Calculate distances using numpy for speed
-            distances = np.sqrt((x_coords - cx)**2 + (y_coords - cy)**2)
-            mask = distances <= self.patch_width
-            
-            # Apply mask to create food patches
-            self.is_gap_grid[mask] = False
-            self.foodpatch_grid[mask] = True
-            self.resource_grid[mask] = float(self.carrying_capacity)
-            
-            # Update grid objects
-            for x in range(max(0, cx - self.patch_width - 1), min(self.width, cx + self.patch_width + 2)):
-                for y in range(max(0, cy - self.patch_width - 1), min(self.height, cy + self.patch_width + 2)):
-                    if mask[x, y]:
-                        cell = self.grid[x][y]
-                        cell.is_gap = False
-                        cell.foodpatch = True
-                        cell.foodpatchnum = k
-                        cell.resource = float(self.carrying_capacity)
+        world = load_world(self.width, self.height, self.patch_width, self.gap_size, self.carrying_capacity,
+                           cache_dir=self.world_cache)
+        for name, value in world.items():
+            setattr(self, name, value)  # shared, read-only
+        self.food_resource = np.array(world['food_resource'])  # the only part of the layout a model changes
 
         if self.debug_mode:
-            total_food_patches = np.sum(self.foodpatch_grid)
-            logger.info(f"Created {len(centers)} food patch centers, {total_food_patches} total food cells")
+            logger.info(f"Created {len(self.seed_patches)} food patch centers, {len(self.food_x)} total food cells")
+
+    @property
+    def resource_grid(self):
+        """Dense (width, height) copy of the resources, for display; the model works on ``food_resource``"""
+        return self.food_resource[self.food_index]
+
+    @property
+    def foodpatchnum_grid(self):
+        """Dense (width, height) food patch numbers (NO_PATCH in gaps), for display and inspection"""
+        return self.food_patch[self.food_index]
 
     # ---------- Agent setup ----------
     def setup_agents_from_params(self):
         """Enhanced agent setup with validation"""
-        food_positions = [(x, y) for x in range(self.width) for y in range(self.height) 
-                         if self.foodpatch_grid[x, y]]
+        food_x, food_y = self.food_x, self.food_y
         
-        if not food_positions:
+        if len(food_x) == 0:
             raise RuntimeError("No foodpatches created — adjust patch_width/gap_size/world size")
 
         n_coop = round(self.initial_agents * self.percent_cooperators / 100)
@@ -208,30 +1511,20 @@ class AgentModel:
         n_def = self.initial_agents - n_coop - n_cond
         if n_def < 0:
             n_def = 0
+        n_total = n_coop + n_cond + n_def
+        if n_total > len(food_x):
+            raise RuntimeError(f"{n_total} agents do not fit on {len(food_x)} food cells")
 
-        colors = {"cooperator": "green", "conditional": "blue", "defector": "red"}
-
-        def spawn(n, strategy):
-            for _ in range(n):
-                x, y = random.choice(food_positions)
-                eattype = 'low' if strategy == 'cooperator' else 'high'
-                self.agents.append({
-                    'id': self.next_agent_id,
-                    'strategy': strategy,
-                    'position': (x, y),
-                    'energy': 5.0,
-                    'eattype': eattype,
-                    'alive': True,
-                    'mypatch': self.grid[x][y].foodpatchnum,
-                    'color': colors[strategy],
-                    'last_positions': deque(maxlen=3),  # Track recent positions
-                    'stuck_counter': 0  # Track if agent is stuck
-                })
-                self.next_agent_id += 1
-        
-        spawn(n_coop, 'cooperator')
-        spawn(n_cond, 'conditional')
-        spawn(n_def, 'defector')
+        # One agent per cell, on distinct random food cells
+        cells = self.rng.choice(len(food_x), size=n_total, replace=False)
+        xs, ys = food_x[cells], food_y[cells]
+        codes = np.repeat(np.arange(len(STRATEGIES), dtype=np.int8), [n_coop, n_cond, n_def])
+        rows = self.agents.add_many(xs, ys, 5.0, codes, patch=self.food_patch[cells])
+        self.occupancy[xs, ys] = rows
+        if self.events:
+            self.events.birth(step=-1, parent=-1, child=self.agents.id[rows], strategy=codes, mutated=False,
+                              patch=self.food_patch[cells])
+        self.flock_counter.rebuild(xs, ys, codes)
         
         if self.debug_mode:
             logger.info(f"Created {n_coop} cooperators, {n_cond} conditionals, {n_def} defectors")
@@ -239,418 +1532,2122 @@ class AgentModel:
     # ---------- Enhanced movement helpers ----------
     def neighbors_coords_circular(self, x, y, radius=2):
         """Get neighbors in circular pattern (NetLogo-style)"""
-        pts = []
-        for dx in range(-radius, radius + 1):
-            for dy in range(-radius, radius + 1):
-                if dx == 0 and dy == 0:
-                    continue
-                # Check if within circular radius
-                if math.sqrt(dx*dx + dy*dy) <= radius:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < self.width and 0 <= ny < self.height:
-                        pts.append((nx, ny))
-        return pts
+        cells, inside = neighbourhood(x, y, radius, self.width, self.height)
+        nx, ny = np.divmod(cells[inside], self.height)
+        return list(zip(nx.tolist(), ny.tolist()))
+
+    def free_cells(self, x, y, radius=2):
+        """Flat indices of the unoccupied cells within radius of (x, y), from the neighbour tables"""
+        offsets, table = neighbour_table(radius, self.height)
+        r = int(math.floor(radius))
+        cells = x * self.height + y + offsets[table[min(x, r), min(self.width - 1 - x, r),
+                                                    min(y, r), min(self.height - 1 - y, r)]]
+        free = self.occupancy.ravel()[cells] == EMPTY
+        if self.profiler:
+            self.profiler.count('neighbour_lookups')
+            self.profiler.count('free_neighbours', int(free.sum()))
+        return cells[free]
+
+    def free_neighbors(self, x, y, radius=2):
+        """Unoccupied cells within radius of (x, y) as x and y arrays"""
+        return np.divmod(self.free_cells(x, y, radius), self.height)
 
     def is_position_occupied(self, pos, exclude_agent=None):
-        """Fast check if position is occupied"""
-        for agent in self.get_alive_agents():
-            if agent is not exclude_agent and agent['position'] == pos:
-                return True
-        return False
+        """O(1) occupancy lookup (``exclude_agent`` is a store row)"""
+        row = self.occupancy[pos[0], pos[1]]
+        return row != EMPTY and row != exclude_agent
+
+    def move_agent(self, row, x, y):
+        """Move an agent to (x, y), remembering its old position and updating the occupancy index"""
+        store = self.agents
+        ox, oy = store.x[row], store.y[row]
+        store.push_history(row, ox, oy)
+        if self.occupancy[ox, oy] == row:
+            self.occupancy[ox, oy] = EMPTY
+        store.x[row] = x
+        store.y[row] = y
+        self.occupancy[x, y] = row
+        self.flock_counter.move(ox, oy, x, y, store.strategy[row])
+
+    def kill_agent(self, row, cause='living_costs'):
+        """Mark an agent dead and free its cell (``cause``: one of EventLog.CAUSES)"""
+        store = self.agents
+        store.kill(row)
+        if self.events:
+            self.events.death(step=self.stats.steps_seen, agent=store.id[row], strategy=store.strategy[row],
+                              cause=cause, patch=store.patch[row])
+        x, y = store.x[row], store.y[row]
+        if self.occupancy[x, y] == row:
+            self.occupancy[x, y] = EMPTY
+        self.flock_counter.remove(x, y, store.strategy[row])
 
-    def get_best_move_anti_loop(self, agent):
+    def get_best_move_anti_loop(self, row):
         """Enhanced movement with anti-loop mechanism"""
-        x, y = agent['position']
-        neighbors = self.neighbors_coords_circular(x, y, radius=2)
-        
-        # Filter unoccupied neighbors
-        free_neighbors = [pos for pos in neighbors if not self.is_position_occupied(pos, agent)]
-        
-        if not free_neighbors:
+        store = self.agents
+        # Unoccupied neighbors
+        cells = self.free_cells(int(store.x[row]), int(store.y[row]), radius=2)
+        if len(cells) == 0:
             return None
-            
+
         # Anti-loop mechanism: avoid recently visited positions
-        recent_positions = agent['last_positions']
-        if len(recent_positions) >= 2:
-            # Prefer positions not recently visited
-            non_recent = [pos for pos in free_neighbors if pos not in recent_positions]
-            if non_recent:
-                free_neighbors = non_recent
+        n = int(store.history_len[row])
+        if n >= 2:
+            recent = store.history_x[row, -n:].astype(np.int64) * self.height + store.history_y[row, -n:]
+            non_recent = cells[(cells[:, None] != recent).all(axis=1)]
+            if len(non_recent):
+                cells = non_recent
                 self.loop_prevention_moves += 1
 
-        # Find patch with max resources where resource >= living_costs
-        valid_neighbors = []
-        for nx, ny in free_neighbors:
-            if self.resource_grid[nx, ny] >= self.living_costs:
-                valid_neighbors.append((nx, ny))
+        # Cell with max resources where resource >= living_costs, ties broken at random
+        res = self.food_resource[self.food_index.ravel()[cells]]
+        valid = res >= self.living_costs
+        if valid.any():
+            best = cells[valid & (res == res[valid].max())]
+            cell = best[0] if len(best) == 1 else best[self.uniforms.index(len(best))]
+        else:
+            # Move to random unoccupied neighbor
+            cell = cells[self.uniforms.index(len(cells))]
+        return divmod(int(cell), self.height)
+
+    # ---------- Enhanced step function ----------
+    def step(self):
+        """Enhanced step function with performance monitoring"""
+        step_start = time.time()
+        prof = self.profiler
+        if prof:
+            prof.begin_step()
+            prof.count('agents', self.agents.n_alive)
+        
+        if self.update_mode == 'synchronous':
+            moves_this_step, deaths_this_step, births_this_step = self.step_synchronous()
+        else:
+            moves_this_step, deaths_this_step, births_this_step = self.step_asynchronous()
+
+        # Regrow resources (optimized)
+        if prof:
+            t = time.perf_counter()
+        self.regrow_optimized()
+        if prof:
+            t = prof.lap('regrow', t)
+
+        # Reclaim the rows of dead agents once they outnumber the living
+        if self.agents.n_dead > max(self.COMPACT_MIN_DEAD, self.agents.n_alive):
+            self.compact_agents()
+        
+        step_time = time.time() - step_start
+        if prof:
+            prof.lap('compact', t)
+            prof.count('moves', moves_this_step)
+            prof.count('deaths', deaths_this_step)
+            prof.count('births', births_this_step)
+            prof.end_step(self.stats.steps_seen)
+        
+        if self.debug_mode and hasattr(self, 'current_step'):
+            if self.current_step % 100 == 0:  # Log every 100 steps
+                logger.info(f"Step {self.current_step}: {len(self.get_alive_rows())} alive, "
+                          f"{moves_this_step} moves, {deaths_this_step} deaths, {births_this_step} births, "
+                          f"time: {step_time:.3f}s")
+
+    def step_asynchronous(self):
+        """Reference update: agents act one after another in a random order"""
+        store = self.agents
+        alive_rows = self.rng.permutation(self.get_alive_rows()).tolist()
+        prof = self.profiler
+        
+        moves_this_step = 0
+        deaths_this_step = 0
+        births_this_step = 0
+        
+        for row in alive_rows:
+            if not store.alive[row]:
+                continue
+            if prof:
+                t = time.perf_counter()
+                
+            strategy = STRATEGIES[store.strategy[row]]
+            old_patch = int(store.patch[row])
+
+            # Enhanced movement
+            new_pos = self.get_best_move_anti_loop(row)
+            if prof:
+                t = prof.lap('move', t)
+            if new_pos:
+                newx, newy = new_pos
+                
+                # Flockmates are counted before moving, and only when stepping into a gap
+                if self.is_gap_grid[newx, newy]:
+                    flockmates = self.count_flockmates(row)
+                    if prof:
+                        t = prof.lap('flockmates', t)
+                        prof.count('flockmate_queries')
+
+                # Update position, history and occupancy
+                self.move_agent(row, newx, newy)
+                moves_this_step += 1
+                self.total_moves += 1
+                if prof:
+                    t = prof.lap('move', t)
+                
+                # Update patch info
+                if self.foodpatch_grid[newx, newy]:
+                    new_patch = self.food_patch[self.food_index[newx, newy]]
+                    store.set_patch(row, new_patch)
+                    if old_patch != NO_PATCH and old_patch != new_patch:
+                        self.successful_migrations[strategy] += 1
+                    if self.events and old_patch != new_patch:
+                        self.events.migration(step=self.stats.steps_seen, agent=store.id[row],
+                                              strategy=store.strategy[row], from_patch=old_patch,
+                                              to_patch=new_patch)
+                
+                # Apply dispersal cost if in gap
+                if self.is_gap_grid[newx, newy]:
+                    flock_count = 1 + flockmates
+                    if strategy != 'defector':
+                        cost = float(self.dispersal_cost) / float(flock_count)
+                    else:
+                        cost = float(self.dispersal_cost)
+                    
+                    store.energy[row] -= cost
+                    if store.energy[row] <= 0:
+                        self.migration_deaths[strategy] += 1
+                        self.kill_agent(row, cause='migration')
+                        deaths_this_step += 1
+                        if prof:
+                            prof.lap('dispersal', t)
+                        continue
+                if prof:
+                    t = prof.lap('dispersal', t)
+
+            # Harvest (optimized)
+            self.harvest_optimized(row)
+            if prof:
+                t = prof.lap('harvest', t)
+            
+            # Living cost
+            store.energy[row] -= self.living_costs
+            if store.energy[row] <= 0:
+                self.kill_agent(row, cause='living_costs')
+                deaths_this_step += 1
+                if prof:
+                    prof.lap('living', t)
+                continue
+            if prof:
+                t = prof.lap('living', t)
+
+            # Reproduction
+            if self.reproduce_optimized(row):
+                births_this_step += 1
+            if prof:
+                prof.lap('reproduce', t)
+
+        return moves_this_step, deaths_this_step, births_this_step
+
+    def step_synchronous(self):
+        """Vectorized update: every phase is applied to all agents at once.
+
+        Phases follow the asynchronous order (move, dispersal cost, harvest, living
+        cost, reproduction), but within a phase all agents act on the same state.
+        Conflict rule: each step every agent draws a random priority; when several
+        agents claim the same cell (as a move target or for a child), the highest
+        priority claim wins and the others stay put or do not reproduce. Cells
+        vacated during the move phase become available in the next step, and
+        flockmates are counted on the positions before the move. Occupancy is
+        exclusive, so harvesting never has to share a cell.
+        """
+        store = self.agents
+        rows = self.get_alive_rows()
+        n = len(rows)
+        if n == 0:
+            return 0, 0, 0
+        priority = self.rng.permutation(n)
+        prof = self.profiler
+        if prof:
+            t = time.perf_counter()
+
+        # Movement: best free neighbour per agent, conflicts resolved by priority
+        tx, ty, has_free = self.select_moves_vectorized(rows)
+        movers = np.flatnonzero(has_free)
+        movers = movers[resolve_claims(tx[movers] * self.height + ty[movers], priority[movers])]
+        mover_rows = rows[movers]
+        mx, my = tx[movers], ty[movers]
+        if prof:
+            t = prof.lap('move', t)
+
+        # Flockmates of agents stepping into a gap, counted on pre-move positions
+        into_gap = self.is_gap_grid[mx, my]
+        gap_rows = mover_rows[into_gap]
+        flockmates = self.flock_counter.count_many(store.x[gap_rows], store.y[gap_rows],
+                                                   store.strategy[gap_rows]) - 1
+        if prof:
+            t = prof.lap('flockmates', t)
+            prof.count('flockmate_queries', len(gap_rows))
+
+        self.occupancy[store.x[mover_rows], store.y[mover_rows]] = EMPTY
+        store.push_history(mover_rows, store.x[mover_rows], store.y[mover_rows])
+        store.x[mover_rows] = mx
+        store.y[mover_rows] = my
+        self.occupancy[mx, my] = mover_rows
+        self.total_moves += len(mover_rows)
+
+        # Patch info
+        on_food = self.foodpatch_grid[mx, my]
+        new_patch = self.food_patch[self.food_index[mx, my]]
+        old_patch = store.patch[mover_rows]
+        migrated = on_food & (old_patch != NO_PATCH) & (old_patch != new_patch)
+        tally_strategies(self.successful_migrations, store.strategy[mover_rows[migrated]])
+        changed = on_food & (old_patch != new_patch)
+        moved = mover_rows[changed]
+        if self.events:
+            self.events.migration(step=self.stats.steps_seen, agent=store.id[moved], strategy=store.strategy[moved],
+                                  from_patch=old_patch[changed], to_patch=new_patch[changed])
+        store.set_patch(moved, new_patch[changed])
+        if prof:
+            t = prof.lap('move', t)
+
+        def die(dead, cause):
+            store.kill_many(dead)
+            self.occupancy[store.x[dead], store.y[dead]] = EMPTY
+            if self.events:
+                self.events.death(step=self.stats.steps_seen, agent=store.id[dead], strategy=store.strategy[dead],
+                                  cause=cause, patch=store.patch[dead])
+
+        # Dispersal cost
+        is_defector = store.strategy[gap_rows] == STRATEGY_CODES['defector']
+        cost = np.where(is_defector, float(self.dispersal_cost), float(self.dispersal_cost) / (1.0 + flockmates))
+        store.energy[gap_rows] -= cost
+        dead = gap_rows[store.energy[gap_rows] <= 0]
+        tally_strategies(self.migration_deaths, store.strategy[dead])
+        die(dead, 'migration')
+        deaths_this_step = len(dead)
+        if prof:
+            t = prof.lap('dispersal', t)
+
+        # Harvest and living cost
+        alive = np.flatnonzero(store.alive[rows])
+        self.harvest_optimized(rows[alive])
+        if prof:
+            t = prof.lap('harvest', t)
+        store.energy[rows[alive]] -= self.living_costs
+        starved = store.energy[rows[alive]] <= 0
+        die(rows[alive[starved]], 'living_costs')
+        deaths_this_step += int(starved.sum())
+        if prof:
+            t = prof.lap('living', t)
+
+        # Reproduction
+        parents = alive[~starved]
+        births_this_step = self.reproduce_vectorized(rows[parents], priority[parents])
+        if prof:
+            t = prof.lap('reproduce', t)
+
+        alive_rows = self.get_alive_rows()
+        self.flock_counter.rebuild(store.x[alive_rows], store.y[alive_rows], store.strategy[alive_rows])
+        if prof:
+            prof.lap('flockmates', t)
+
+        return len(mover_rows), deaths_this_step, births_this_step
+
+    def select_moves_vectorized(self, rows):
+        """get_best_move_anti_loop for many agents at once, on the current occupancy.
+
+        Returns target x, target y and a mask of the agents that have a free neighbour.
+        """
+        store = self.agents
+        cells, inside = neighbourhood(store.x[rows], store.y[rows], 2, self.width, self.height)
+        free = inside & (self.occupancy.ravel()[cells] == EMPTY)
+        has_free = free.any(axis=1)
+        if self.profiler:
+            self.profiler.count('neighbour_lookups', len(rows))
+            self.profiler.count('free_neighbours', int(free.sum()))
+
+        # Anti-loop mechanism: avoid recently visited positions
+        recent = store.history_x[rows].astype(np.int64) * self.height + store.history_y[rows]
+        non_recent = free & ~(cells[:, :, None] == recent[:, None, :]).any(axis=2)
+        avoid = (store.history_len[rows] >= 2) & non_recent.any(axis=1)
+        candidates = np.where(avoid[:, None], non_recent, free)
+        self.loop_prevention_moves += int(avoid.sum())
+
+        # Highest resource cell with resource >= living_costs, else a random candidate
+        res = self.food_resource[self.food_index.ravel()[cells]]
+        choice = choose_moves(candidates, res, self.living_costs, self.rng.random(len(rows)))
+
+        tx, ty = np.divmod(cells[np.arange(len(rows)), choice], self.height)
+        return tx, ty, has_free
+
+    def reproduce_vectorized(self, rows, priority):
+        """Reproduction for many agents at once; returns the number of births"""
+        store = self.agents
+        energy = store.energy[rows]
+        eligible = energy >= self.cost_child
+        eligible &= self.rng.random(len(rows)) <= 0.0005 * energy
+        rows, priority = rows[eligible], priority[eligible]
+
+        cells, inside = neighbourhood(store.x[rows], store.y[rows], 1, self.width, self.height)
+        free = inside & (self.occupancy.ravel()[cells] == EMPTY)
+        has_free = free.any(axis=1)
+        if self.profiler:
+            self.profiler.count('neighbour_lookups', len(rows))
+            self.profiler.count('free_neighbours', int(free.sum()))
+        rows, priority = rows[has_free], priority[has_free]
+        cells, free = cells[has_free], free[has_free]
+
+        choice = pick_random_true(free, self.rng.random(len(rows)))
+        cx, cy = np.divmod(cells[np.arange(len(rows)), choice], self.height)
+        won = resolve_claims(cx * self.height + cy, priority)
+        rows, cx, cy = rows[won], cx[won], cy[won]
+
+        # Mutation
+        strategy = store.strategy[rows].copy()
+        mutate = self.rng.random(len(rows)) < self.mutation_rate
+        strategy[mutate] = self.rng.integers(0, len(STRATEGIES), size=int(mutate.sum()))
+
+        patch = self.food_patch[self.food_index[cx, cy]]
+        children = store.add_many(cx, cy, float(self.cost_child), strategy, patch=patch, parent=store.id[rows])
+        self.occupancy[cx, cy] = children
+        if self.events:
+            self.events.birth(step=self.stats.steps_seen, parent=store.id[rows], child=store.id[children],
+                              strategy=strategy, mutated=mutate, patch=patch)
+        store.energy[rows] -= self.cost_child
+        return len(children)
+
+    def count_flockmates(self, row):
+        """Number of other alive agents with the same strategy within group_dispersal_range"""
+        store = self.agents
+        return self.flock_counter.count_at(store.x[row], store.y[row], store.strategy[row]) - 1
+
+    def find_flockmates_optimized(self, row):
+        """Rows of alive agents with the same strategy within group_dispersal_range (for inspection)"""
+        store = self.agents
+        rows = self.get_alive_rows()
+        dx = store.x[rows] - store.x[row]
+        dy = store.y[rows] - store.y[row]
+        mask = (store.alive[rows] & (store.strategy[rows] == store.strategy[row]) & (rows != row)
+                & (np.sqrt(dx * dx + dy * dy) <= self.group_dispersal_range))
+        return rows[mask]
+
+    def harvest_optimized(self, rows):
+        """Vectorized harvest for one agent row or an array of rows on distinct cells"""
+        store = self.agents
+        rows = np.atleast_1d(rows)
+        rows = rows[store.alive[rows]]
+        rows = rows[self.foodpatch_grid[store.x[rows], store.y[rows]]]
+
+        food = self.food_index[store.x[rows], store.y[rows]]
+        res = np.maximum(self.food_resource[food], 0.0)
+        share = np.where(store.strategy[rows] == STRATEGY_CODES['cooperator'], np.float32(0.5), np.float32(0.99))
+        take = share * res
+
+        self.food_resource[food] = res - take
+        store.energy[rows] += take
+
+    def reproduce_optimized(self, row):
+        """Optimized reproduction with better neighbor finding"""
+        store = self.agents
+        energy = store.energy[row]
+        if energy < self.cost_child:
+            return False
+            
+        prob = 0.0005 * energy
+        uniforms = self.uniforms
+        if uniforms.next() > prob:
+            return False
+            
+        x, y = int(store.x[row]), int(store.y[row])
+        fx, fy = self.free_neighbors(x, y, radius=1)
+        free = list(zip(fx.tolist(), fy.tolist()))
+        
+        if not free:
+            return False
+            
+        dest = free[uniforms.index(len(free))]
+        strat = store.strategy[row]
+        
+        # Mutation
+        mutated = uniforms.next() < self.mutation_rate
+        if mutated:
+            strat = uniforms.index(len(STRATEGIES))
+
+        patch = self.food_patch[self.food_index[dest[0], dest[1]]]
+        child = store.add(dest[0], dest[1], float(self.cost_child), strat, patch=patch, parent=store.id[row])
+        if self.events:
+            self.events.birth(step=self.stats.steps_seen, parent=store.id[row], child=store.id[child],
+                              strategy=strat, mutated=mutated, patch=patch)
+        self.occupancy[dest[0], dest[1]] = child
+        self.flock_counter.add(dest[0], dest[1], strat)
+        store.energy[row] -= self.cost_child
+        
+        return True
+
+    def regrow_optimized(self):
+        """Optimized resource regrowth using numpy"""
+        # Only food cells hold resources (the trailing gap sentinel stays 0)
+        resource = self.food_resource[:-1]
+        mask = resource >= 0.1
+        
+        # Vectorized growth calculation
+        r = resource[mask]
+        growth = self.growth_rate * r * (1 - r / self.carrying_capacity)
+        resource[mask] = np.minimum(r + growth, self.carrying_capacity)
+        
+        # Handle low resource patches
+        resource[resource < 0.1] = 0.1
+
+    def collect_stats(self, step):
+        """Enhanced statistics collection"""
+        self.current_step = step  # Store for debugging
+        
+        counts = self.agents.strategy_counts()
+        coop, cond, defe = (int(n) for n in counts)
+        total_res = np.sum(self.food_resource[:-1])
+        group = self.group_structure()
+        
+        self.stats.append({
+            'steps': step, 'cooperators': coop, 'conditionals': cond, 'defectors': defe,
+            'total_resources': total_res,
+            # Performance metrics
+            'runtime': time.time() - self.start_time,
+            'agents_alive': self.agents.n_alive,
+            'loop_prevention_ratio': self.loop_prevention_moves / max(1, self.total_moves),
+            # Group structure
+            'mean_assortment': group['mean_assortment'], 'relatedness': group['relatedness']
+        })
+
+        if self.stop_rules and self.stop_reason is None:
+            reason = self.check_stop_rules(counts)
+            if reason is not None:
+                self.stop_reason, self.stop_step = reason, step
+                if self.debug_mode:
+                    logger.info(f"Stopping at step {step}: {reason}")
+
+        if self.recorder:
+            self.recorder.record(self, step)
+
+        if self.checkpoint_every and (step + 1) % self.checkpoint_every == 0:
+            self.save_checkpoint()
+
+    def check_stop_rules(self, counts):
+        """Name of the first stop rule met by the current strategy counts, or None.
+
+        fixation: a single strategy is left (only without mutation, where it is final);
+        extinction: no agents are left; stationary: over the last ``stationary_window``
+        steps, the mean share of every strategy in the two halves of the window
+        differs by at most ``stationary_tolerance``.
+        """
+        total = int(counts.sum())
+        if 'extinction' in self.stop_rules and total == 0:
+            return 'extinction'
+        if 'fixation' in self.stop_rules and self.mutation_rate == 0 and np.count_nonzero(counts) == 1:
+            return 'fixation'
+        if 'stationary' in self.stop_rules:
+            window = len(self.mix_history)
+            self.mix_history[self.mix_seen % window] = counts / max(1, total)
+            self.mix_seen += 1
+            if self.mix_seen >= window:
+                recent = np.roll(self.mix_history, -(self.mix_seen % window), axis=0)  # oldest first
+                half = window // 2
+                drift = np.abs(recent[half:].mean(axis=0) - recent[:half].mean(axis=0))
+                if drift.max() <= self.stationary_tolerance:
+                    return 'stationary'
+        return None
+
+    # ---------- Checkpoints ----------
+    WORLD_ARRAYS = ('food_resource', 'occupancy')  # the rest of the world is rebuilt from the parameters
+
+    def save_checkpoint(self, path=None):
+        """Write the full model state (world, agents, RNG, counters, stats) to one .npz file"""
+        if path is None:
+            path = self.checkpoint_path or os.path.join(default_results_dir(),
+                                                        f"{self.results_prefix}_checkpoint.npz")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.stats.flush()  # partial stats are on disk whenever a checkpoint exists
+        if self.recorder:
+            self.recorder.flush()
+        if self.events:
+            self.events.flush()
+        stats_columns, stats_meta = self.stats.state()
+
+        params = dict(self.params_snapshot, debug_mode=self.debug_mode)
+        if not isinstance(self.run_seed, (int, type(None))):
+            params['random_seed'] = None  # spawned SeedSequence; the RNG state below is what matters
+        meta = {
+            'params': params,
+            'rng_state': self.rng.bit_generator.state,
+            'uniforms_pos': self.uniforms.pos,
+            'next_id': self.agents.next_id,
+            'migration_deaths': self.migration_deaths,
+            'successful_migrations': self.successful_migrations,
+            'loop_prevention_moves': self.loop_prevention_moves,
+            'total_moves': self.total_moves,
+            'current_step': getattr(self, 'current_step', None),
+            'runtime': time.time() - self.start_time,
+            'stats': stats_meta,
+            'mix_seen': self.mix_seen, 'stop_reason': self.stop_reason, 'stop_step': self.stop_step,
+        }
+        arrays = {'meta': np.array(json.dumps(meta)),
+                  'uniforms_buffer': np.array(self.uniforms.buffer, dtype=np.float64),
+                  'mix_history': self.mix_history}
+        arrays.update({name: getattr(self, name) for name in self.WORLD_ARRAYS})
+        arrays.update({f"agent_{name}": column for name, column in self.agents.state().items()})
+        arrays.update({f"stats_{name}": column for name, column in stats_columns.items()})
+        if self.events and self.events.path is None:
+            arrays.update({f"events_{key}": column for key, column in self.events.state().items()})
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)  # never leave a half-written checkpoint behind
+        if self.debug_mode:
+            logger.info(f"Saving checkpoint to: {path}")
+        return path
+
+    @classmethod
+    def load_checkpoint(cls, path, **overrides):
+        """Rebuild a model from ``save_checkpoint`` output; ``overrides`` replace saved parameters.
+
+        The random stream always continues from the saved state, whatever ``random_seed`` says.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            params = {**meta['params'], **overrides}
+            model = cls(**params)
+
+            for name in cls.WORLD_ARRAYS:
+                getattr(model, name)[...] = data[name]
+            model.agents.restore({name: data[f"agent_{name}"] for name in AgentStore.COLUMNS + ('alive_list',)},
+                                 meta['next_id'])
+            alive = model.agents.alive_rows()
+            model.flock_counter.rebuild(model.agents.x[alive], model.agents.y[alive], model.agents.strategy[alive])
+
+            model.rng.bit_generator.state = meta['rng_state']
+            model.uniforms.buffer = data['uniforms_buffer'].tolist()
+            model.uniforms.pos = meta['uniforms_pos']
+
+            model.migration_deaths = meta['migration_deaths']
+            model.successful_migrations = meta['successful_migrations']
+            model.loop_prevention_moves = meta['loop_prevention_moves']
+            model.total_moves = meta['total_moves']
+            if meta['current_step'] is not None:
+                model.current_step = meta['current_step']
+            model.start_time = time.time() - meta['runtime']
+            if len(model.mix_history) == len(data['mix_history']):
+                model.mix_history[...] = data['mix_history']
+                model.mix_seen = meta['mix_seen']
+            model.stop_reason, model.stop_step = meta['stop_reason'], meta['stop_step']
+
+            model.stats.restore({name: data[f"stats_{name}"] for name in model.stats.names}, meta['stats'])
+            if model.events:
+                model.events.resume(model.stats.steps_seen)
+                if model.events.path is None:
+                    saved = {key[len("events_"):]: data[key] for key in data.files if key.startswith("events_")}
+                    if saved:
+                        model.events.restore(saved)
+                    else:
+                        logger.warning(f"Checkpoint {path} holds no event log; events before the resume are lost")
+
+        logger.info(f"Resumed from checkpoint {path} at step {model.stats.steps_seen}")
+        return model
+
+    def save_results(self, results_dir=None, plots=True):
+        """Enhanced results saving with performance metrics (``plots=False`` skips the PNGs)"""
+        if results_dir is None:
+            results_dir = default_results_dir()
+        os.makedirs(results_dir, exist_ok=True)
+        
+        self.stats.flush()
+        if self.recorder:
+            self.recorder.flush()
+        if self.events:
+            self.events.flush()
+        fname = os.path.join(results_dir, f"{self.results_prefix}.txt")
+        logger.info(f"Saving text results to: {fname}")
+        
+        with open(fname, 'w', encoding='utf-8') as f:
+            f.write("Enhanced Simulation Results\n\nParameters:\n")
+            for k, v in self.params_snapshot.items():
+                f.write(f"  {k}: {v}\n")
+            
+            f.write("\nPerformance Metrics:\n")
+            if hasattr(self, 'start_time'):
+                total_runtime = time.time() - self.start_time
+                f.write(f"  Total runtime: {total_runtime:.2f} seconds\n")
+                f.write(f"  Total moves: {self.total_moves}\n")
+                f.write(f"  Loop prevention moves: {self.loop_prevention_moves}\n")
+                f.write(f"  Loop prevention ratio: {self.loop_prevention_moves / max(1, self.total_moves):.3f}\n")
+            
+            f.write("\nFinal Results:\n")
+            if self.stats.steps_seen:
+                f.write(f"Number of Steps: {self.stats.steps_seen}\n")
+                if self.stop_reason is not None:
+                    f.write(f"Stopped: {self.stop_reason} at step {self.stop_step}\n")
+                f.write(f"Cooperators: {self.stats.last('cooperators')}\n")
+                f.write(f"Conditionals: {self.stats.last('conditionals')}\n")
+                f.write(f"Defectors: {self.stats.last('defectors')}\n")
+                f.write(f"Total Resources: {self.stats.last('total_resources'):.2f}\n")
+                
+                f.write("\nMigration Statistics:\n")
+                for strategy in ['cooperator', 'conditional', 'defector']:
+                    f.write(f"  {strategy.capitalize()} - Deaths: {self.migration_deaths[strategy]}, "
+                           f"Successful: {self.successful_migrations[strategy]}\n")
+
+            if self.profiler and len(self.profiler.table):
+                f.write("\nStep Profile (total seconds, share of step time):\n")
+                for phase, (seconds, share) in self.profiler.summary().items():
+                    f.write(f"  {phase}: {seconds:.3f}s ({100 * share:.1f}%)\n")
+
+        if self.profiler and len(self.profiler.table):
+            profile_name = os.path.join(results_dir, f"{self.results_prefix}_profile.csv")
+            logger.info(f"Saving step profile to: {profile_name}")
+            self.profiler.save_csv(profile_name)
+
+        # Save all the plots (same as before but with enhanced data)
+        if plots:
+            self._save_plots(results_dir)
+
+    def _save_plots(self, results_dir):
+        """Save all visualization plots"""
+        import matplotlib.pyplot as plt
+
+        steps = self.stats['steps']
+
+        # Save performance metrics plot
+        if len(steps):
+            plt.figure(figsize=(10, 6))
+            plt.plot(steps, self.stats['runtime'], 'purple', label='Cumulative Runtime (s)')
+            plt.title('Performance Over Time')
+            plt.xlabel('Step')
+            plt.ylabel('Cumulative Runtime (seconds)')
+            plt.legend()
+            plt.grid(True)
+            perf_plot_path = os.path.join(results_dir, f"{self.results_prefix}_performance.png")
+            plt.savefig(perf_plot_path)
+            logger.info(f"Saving performance plot to: {perf_plot_path}")
+            plt.close()
+
+        # Agent population evolution
+        plt.figure(figsize=(10, 6))
+        plt.plot(steps, self.stats['cooperators'], 'g-', label='Cooperators (low harvest, share migration)')
+        plt.plot(steps, self.stats['conditionals'], 'b-', label='Conditionals (high harvest, share migration)')
+        plt.plot(steps, self.stats['defectors'], 'r-', label='Defectors (high harvest, no migration help)')
+        plt.title('Agent Population Evolution')
+        plt.xlabel('Step')
+        plt.ylabel('Number')
+        plt.legend()
+        plt.grid(True)
+        agent_plot_path = os.path.join(results_dir, f"{self.results_prefix}_agents.png")
+        plt.savefig(agent_plot_path)
+        logger.info(f"Saving agent population plot to: {agent_plot_path}")
+        plt.close()
+
+        # Resources evolution
+        plt.figure(figsize=(10, 6))
+        plt.plot(steps, self.stats['total_resources'], 'k-', label='Total Resources')
+        plt.title('Total Resources Evolution')
+        plt.xlabel('Step')
+        plt.ylabel('Resources')
+        plt.legend()
+        plt.grid(True)
+        resources_plot_path = os.path.join(results_dir, f"{self.results_prefix}_resources.png")
+        plt.savefig(resources_plot_path)
+        logger.info(f"Saving resources plot to: {resources_plot_path}")
+        plt.close()
+
+        # Final populations bar chart
+        plt.figure(figsize=(8, 6))
+        categories = ['Cooperators', 'Conditionals', 'Defectors']
+        values = [
+            self.stats.last('cooperators'),
+            self.stats.last('conditionals'), 
+            self.stats.last('defectors')
+        ]
+        colors = ['green', 'blue', 'red']
+        bars = plt.bar(categories, values, color=colors)
+        plt.title(f'Final Agent Populations (Step {self.stats.steps_seen})')
+        plt.ylabel('Number of Agents')
+        for bar in bars:
+            yval = bar.get_height()
+            plt.text(bar.get_x() + bar.get_width()/2, yval + 0.5, int(yval), ha='center', va='bottom')
+        plt.grid(True, axis='y', linestyle='--', alpha=0.7)
+        summary_plot_path = os.path.join(results_dir, f"{self.results_prefix}_summary.png")
+        plt.savefig(summary_plot_path)
+        logger.info(f"Saving summary bar chart to: {summary_plot_path}")
+        plt.close()
+
+        # Migration statistics
+        plt.figure(figsize=(12, 6))
+        categories = ['Coop Deaths', 'Cond Deaths', 'Def Deaths', 'Coop Success', 'Cond Success', 'Def Success']
+        values = [
+            self.migration_deaths['cooperator'],
+            self.migration_deaths['conditional'],
+            self.migration_deaths['defector'],
+            self.successful_migrations['cooperator'],
+            self.successful_migrations['conditional'],
+            self.successful_migrations['defector']
+        ]
+        colors = ['darkgreen', 'darkblue', 'darkred', 'green', 'blue', 'red']
+        bars = plt.bar(categories, values, color=colors)
+        plt.title('Migration Deaths and Successful Migrations by Agent Type')
+        plt.ylabel('Number')
+        plt.xticks(rotation=45)
+        for bar in bars:
+            yval = bar.get_height()
+            plt.text(bar.get_x() + bar.get_width()/2, yval + 0.5, int(yval), ha='center', va='bottom')
+        plt.grid(True, axis='y', linestyle='--', alpha=0.7)
+        plt.tight_layout()
+        migration_plot_path = os.path.join(results_dir, f"{self.results_prefix}_migrations.png")
+        plt.savefig(migration_plot_path)
+        logger.info(f"Saving migration statistics plot to: {migration_plot_path}")
+        plt.close()
+
+# ---------------- Ensemble engine ----------------
+class EnsembleAgentStore(AgentStore):
+    """AgentStore for the agents of several replicate worlds; the ``world`` column says whose they are"""
+    COLUMNS = AgentStore.COLUMNS + ('world',)
+
+    def _grow(self, capacity):
+        world = np.zeros(capacity, dtype=np.int32)
+        if getattr(self, 'world', None) is not None:
+            world[:self.size] = self.world[:self.size]
+        super()._grow(capacity)
+        self.world = world
+
+    def add_many(self, xs, ys, energy, strategies, patch=NO_PATCH, parent=-1, world=0):
+        rows = super().add_many(xs, ys, energy, strategies, patch=patch, parent=parent)
+        self.world[rows] = world
+        return rows
+
+
+class EnsembleModel:
+    """``replicates`` independent worlds of the synchronous AgentModel, stepped together in one process.
+
+    Per-replicate state carries a leading replicate axis (``food_resource`` is
+    (R, F + 1), ``occupancy`` is (R, W, H)); the island layout is built once and shared.
+    All agents live in one EnsembleAgentStore, so every phase of a step is a
+    single vectorized pass over all worlds, with cells keyed by world. Flockmates
+    are counted pairwise among agents of the same world and strategy, which
+    avoids per-world prefix grids. World r draws from its own Generator, in the same order and
+    amounts as a synchronous AgentModel, and so reproduces
+    ``AgentModel(random_seed=seeds[r], update_mode="synchronous")`` step for step.
+
+    Stop rules 'fixation' and 'extinction' freeze a world at the step they are met.
+    """
+    PARAMS = ('width', 'height', 'initial_agents', 'percent_cooperators', 'percent_conditionals',
+              'patch_width', 'gap_size', 'carrying_capacity', 'growth_rate', 'living_costs',
+              'dispersal_cost', 'group_dispersal_range', 'mutation_rate', 'cost_child', 'results_prefix',
+              'world_cache')
+    STOP_RULES = ('fixation', 'extinction')
+
+    def __init__(self, replicates=8, random_seed=None, seeds=None, stop_rules="", debug_mode=False,
+                 update_mode="synchronous", **params):
+        if update_mode != "synchronous":
+            raise ValueError("EnsembleModel only implements the synchronous update")
+        unsupported = set(params) - set(self.PARAMS)
+        if unsupported:
+            raise ValueError(f"Parameter(s) {sorted(unsupported)} not supported by EnsembleModel")
+        defaults = inspect.signature(AgentModel.__init__).parameters
+        for name in self.PARAMS:
+            setattr(self, name, params.get(name, defaults[name].default))
+        self.params_snapshot = {name: getattr(self, name) for name in self.PARAMS}
+        self.debug_mode = debug_mode
+        self.start_time = time.time()
+
+        # One Generator per world
+        if seeds is None:
+            seeds = spawn_seeds(random_seed, replicates)
+        self.rngs = [np.random.default_rng(seed) for seed in seeds]
+        self.replicates = R = len(self.rngs)
+
+        if isinstance(stop_rules, str):
+            stop_rules = [rule.strip() for rule in stop_rules.split(",") if rule.strip()]
+        unknown = set(stop_rules) - set(self.STOP_RULES)
+        if unknown:
+            raise ValueError(f"Stop rule(s) {sorted(unknown)} not supported by EnsembleModel")
+        self.stop_rules = tuple(stop_rules)
+        self.active = np.ones(R, dtype=bool)
+        self.stop_step = np.full(R, -1, dtype=np.int64)
+        self.stop_reason = [None] * R
+
+        # World: shared layout, per-replicate resources and occupancy
+        world = load_world(self.width, self.height, self.patch_width, self.gap_size, self.carrying_capacity,
+                           cache_dir=self.world_cache)
+        for name in ('is_gap_grid', 'foodpatch_grid', 'food_index', 'food_x', 'food_y', 'food_patch', 'seed_patches'):
+            setattr(self, name, world[name])
+        self.food_resource = np.repeat(world['food_resource'][None], R, axis=0)
+        self.occupancy = np.full((R, self.width, self.height), EMPTY, dtype=np.int32)
+        self.agents = EnsembleAgentStore(capacity=max(64, 2 * R * self.initial_agents))
+
+        S = len(STRATEGIES)
+        self.migration_deaths = np.zeros((R, S), dtype=np.int64)
+        self.successful_migrations = np.zeros((R, S), dtype=np.int64)
+        self.loop_prevention_moves = np.zeros(R, dtype=np.int64)
+        self.total_moves = np.zeros(R, dtype=np.int64)
+        self.stats = StatsSink(columns=[('steps', np.int64)] +
+                               [(name, np.dtype((np.int64, (R,)))) for name in
+                                ('cooperators', 'conditionals', 'defectors', 'agents_alive')] +
+                               [('total_resources', np.dtype((np.float64, (R,))))])
+
+        self.setup_agents()
+
+    def setup_agents(self):
+        """Initial agents of every world, placed as AgentModel.setup_agents_from_params does"""
+        food_x, food_y = self.food_x, self.food_y
+        n_coop = round(self.initial_agents * self.percent_cooperators / 100)
+        n_cond = round(self.initial_agents * self.percent_conditionals / 100)
+        n_def = max(0, self.initial_agents - n_coop - n_cond)
+        n_total = n_coop + n_cond + n_def
+        if n_total > len(food_x):
+            raise RuntimeError(f"{n_total} agents do not fit on {len(food_x)} food cells")
+        codes = np.repeat(np.arange(len(STRATEGIES), dtype=np.int8), [n_coop, n_cond, n_def])
+
+        for r, rng in enumerate(self.rngs):
+            cells = rng.choice(len(food_x), size=n_total, replace=False)
+            xs, ys = food_x[cells], food_y[cells]
+            rows = self.agents.add_many(xs, ys, 5.0, codes, patch=self.food_patch[cells], world=r)
+            self.occupancy[r, xs, ys] = rows
+
+    PAIR_BLOCK = 1 << 22  # candidate pairs examined at once by count_flockmates
+
+    def count_flockmates(self, rows):
+        """Alive agents of the same world and strategy within group_dispersal_range of each of ``rows``,
+        the agent itself included (as FlockmateCounter.count_many)"""
+        store = self.agents
+        S = len(STRATEGIES)
+        alive = store.alive_rows()
+        codes = store.world[alive].astype(np.int64) * S + store.strategy[alive]
+        order = np.argsort(codes, kind='stable')
+        codes, alive = codes[order], alive[order]
+        ax, ay = store.x[alive].astype(np.int64), store.y[alive].astype(np.int64)
+
+        qcodes = store.world[rows].astype(np.int64) * S + store.strategy[rows]
+        qx, qy = store.x[rows].astype(np.int64), store.y[rows].astype(np.int64)
+        start = np.searchsorted(codes, qcodes, side='left')
+        n = np.searchsorted(codes, qcodes, side='right') - start
+        radius2 = self.group_dispersal_range * self.group_dispersal_range
+
+        counts = np.zeros(len(rows), dtype=np.int64)
+        first = 0
+        while first < len(rows):
+            # a block of queries whose candidate pairs fit in PAIR_BLOCK
+            last = first + max(1, int(np.searchsorted(np.cumsum(n[first:]), self.PAIR_BLOCK, side='right')))
+            q = np.repeat(np.arange(first, last), n[first:last])
+            offset = np.arange(len(q)) - np.repeat(np.cumsum(n[first:last]) - n[first:last], n[first:last])
+            j = start[q] + offset
+            dx, dy = ax[j] - qx[q], ay[j] - qy[q]
+            counts += np.bincount(q[dx * dx + dy * dy <= radius2], minlength=len(rows))
+            first = last
+        return counts
+
+    def per_world(self, draw, counts):
+        """Concatenate ``draw(rng, n)`` over the worlds, n = counts[r] values from world r's Generator"""
+        return np.concatenate([draw(rng, int(n)) for rng, n in zip(self.rngs, counts)] or [np.zeros(0)])
+
+    def world_counts(self, rows):
+        return np.bincount(self.agents.world[rows], minlength=self.replicates)
+
+    def uniforms(self, rows):
+        """One uniform per row, rows grouped by world (in world order)"""
+        return self.per_world(lambda rng, n: rng.random(n), self.world_counts(rows))
+
+    def step(self):
+        """One synchronous step of every active world (see AgentModel.step_synchronous)"""
+        store = self.agents
+        S = len(STRATEGIES)
+        rows = store.alive_rows()
+        rows = rows[self.active[store.world[rows]]]
+        rows = rows[np.argsort(store.world[rows], kind='stable')]  # grouped by world, alive order kept
+
+        if len(rows):
+            priority = self.per_world(lambda rng, n: rng.permutation(n), self.world_counts(rows))
+            self.step_worlds(rows, priority)
+
+        # Regrow resources, as AgentModel.regrow_optimized
+        resource = self.food_resource[:, :-1]
+        mask = resource >= 0.1
+        r = resource[mask]
+        growth = self.growth_rate * r * (1 - r / self.carrying_capacity)
+        resource[mask] = np.minimum(r + growth, self.carrying_capacity)
+        resource[resource < 0.1] = 0.1
+
+        if store.n_dead > max(AgentModel.COMPACT_MIN_DEAD, store.n_alive):
+            store.compact()
+            n = store.size
+            self.occupancy[store.world[:n], store.x[:n], store.y[:n]] = np.arange(n, dtype=np.int32)
+
+    def step_worlds(self, rows, priority):
+        store = self.agents
+        S = len(STRATEGIES)
+        R = self.replicates
+        world = store.world
+
+        # Movement
+        tx, ty, has_free = self.select_moves(rows)
+        movers = np.flatnonzero(has_free)
+        keys = (world[rows[movers]].astype(np.int64) * self.width + tx[movers]) * self.height + ty[movers]
+        movers = movers[resolve_claims(keys, priority[movers])]
+        mover_rows = rows[movers]
+        mw = world[mover_rows]
+        mx, my = tx[movers], ty[movers]
+
+        # Flockmates of agents stepping into a gap, counted on pre-move positions
+        into_gap = self.is_gap_grid[mx, my]
+        gap_rows = mover_rows[into_gap]
+        flockmates = self.count_flockmates(gap_rows) - 1
+
+        self.occupancy[mw, store.x[mover_rows], store.y[mover_rows]] = EMPTY
+        store.push_history(mover_rows, store.x[mover_rows], store.y[mover_rows])
+        store.x[mover_rows] = mx
+        store.y[mover_rows] = my
+        self.occupancy[mw, mx, my] = mover_rows
+        self.total_moves += np.bincount(mw, minlength=R)
+
+        # Patch info
+        on_food = self.foodpatch_grid[mx, my]
+        new_patch = self.food_patch[self.food_index[mx, my]]
+        old_patch = store.patch[mover_rows]
+        migrated = on_food & (old_patch != NO_PATCH) & (old_patch != new_patch)
+        self.successful_migrations += self.tally(mover_rows[migrated])
+        store.patch[mover_rows[on_food]] = new_patch[on_food]
+
+        def die(dead):
+            store.kill_many(dead)
+            self.occupancy[world[dead], store.x[dead], store.y[dead]] = EMPTY
+
+        # Dispersal cost
+        is_defector = store.strategy[gap_rows] == STRATEGY_CODES['defector']
+        cost = np.where(is_defector, float(self.dispersal_cost), float(self.dispersal_cost) / (1.0 + flockmates))
+        store.energy[gap_rows] -= cost
+        dead = gap_rows[store.energy[gap_rows] <= 0]
+        self.migration_deaths += self.tally(dead)
+        die(dead)
+
+        # Harvest and living cost
+        alive = np.flatnonzero(store.alive[rows])
+        self.harvest(rows[alive])
+        store.energy[rows[alive]] -= self.living_costs
+        starved = store.energy[rows[alive]] <= 0
+        die(rows[alive[starved]])
+
+        # Reproduction
+        parents = alive[~starved]
+        self.reproduce(rows[parents], priority[parents])
+
+    def tally(self, rows):
+        """(R, S) counts of ``rows`` by world and strategy"""
+        S = len(STRATEGIES)
+        codes = self.agents.world[rows].astype(np.int64) * S + self.agents.strategy[rows]
+        return np.bincount(codes, minlength=self.replicates * S).reshape(self.replicates, S)
+
+    def select_moves(self, rows):
+        """AgentModel.select_moves_vectorized across worlds"""
+        store = self.agents
+        w = store.world[rows, None]
+        cells, inside = neighbourhood(store.x[rows], store.y[rows], 2, self.width, self.height)
+        free = inside & (self.occupancy.reshape(self.replicates, -1)[w, cells] == EMPTY)
+        has_free = free.any(axis=1)
+
+        recent = store.history_x[rows].astype(np.int64) * self.height + store.history_y[rows]
+        non_recent = free & ~(cells[:, :, None] == recent[:, None, :]).any(axis=2)
+        avoid = (store.history_len[rows] >= 2) & non_recent.any(axis=1)
+        candidates = np.where(avoid[:, None], non_recent, free)
+        self.loop_prevention_moves += np.bincount(store.world[rows[avoid]], minlength=self.replicates)
+
+        res = self.food_resource[w, self.food_index.ravel()[cells]]
+        choice = choose_moves(candidates, res, self.living_costs, self.uniforms(rows))
+
+        tx, ty = np.divmod(cells[np.arange(len(rows)), choice], self.height)
+        return tx, ty, has_free
+
+    def harvest(self, rows):
+        store = self.agents
+        rows = rows[self.foodpatch_grid[store.x[rows], store.y[rows]]]
+        w, food = store.world[rows], self.food_index[store.x[rows], store.y[rows]]
+        res = np.maximum(self.food_resource[w, food], 0.0)
+        share = np.where(store.strategy[rows] == STRATEGY_CODES['cooperator'], np.float32(0.5), np.float32(0.99))
+        take = share * res
+        self.food_resource[w, food] = res - take
+        store.energy[rows] += take
+
+    def reproduce(self, rows, priority):
+        """AgentModel.reproduce_vectorized across worlds"""
+        store = self.agents
+        energy = store.energy[rows]
+        eligible = energy >= self.cost_child
+        eligible &= self.uniforms(rows) <= 0.0005 * energy
+        rows, priority = rows[eligible], priority[eligible]
+
+        w = store.world[rows, None]
+        cells, inside = neighbourhood(store.x[rows], store.y[rows], 1, self.width, self.height)
+        free = inside & (self.occupancy.reshape(self.replicates, -1)[w, cells] == EMPTY)
+        has_free = free.any(axis=1)
+        rows, priority = rows[has_free], priority[has_free]
+        cells, free = cells[has_free], free[has_free]
+
+        choice = pick_random_true(free, self.uniforms(rows))
+        cx, cy = np.divmod(cells[np.arange(len(rows)), choice], self.height)
+        world = store.world[rows]
+        won = resolve_claims((world.astype(np.int64) * self.width + cx) * self.height + cy, priority)
+        rows, cx, cy, world = rows[won], cx[won], cy[won], world[won]
+
+        # Mutation
+        strategy = store.strategy[rows].copy()
+        mutate = self.uniforms(rows) < self.mutation_rate
+        strategy[mutate] = self.per_world(lambda rng, n: rng.integers(0, len(STRATEGIES), size=n),
+                                          self.world_counts(rows[mutate]))
+
+        patch = self.food_patch[self.food_index[cx, cy]]
+        children = store.add_many(cx, cy, float(self.cost_child), strategy, patch=patch,
+                                  parent=store.id[rows], world=world)
+        self.occupancy[world, cx, cy] = children
+        store.energy[rows] -= self.cost_child
+        return len(children)
+
+    def strategy_counts(self):
+        """(R, S) alive agents per world and strategy"""
+        return self.tally(self.agents.alive_rows())
+
+    def collect_stats(self, step):
+        """Statistics of every world for one step; also applies the stop rules"""
+        self.current_step = step
+        counts = self.strategy_counts()
+        totals = counts.sum(axis=1)
+        self.stats.append({
+            'steps': step, 'cooperators': counts[:, 0], 'conditionals': counts[:, 1], 'defectors': counts[:, 2],
+            'agents_alive': totals,
+            # row by row: a 1-D float32 sum adds in the same order as AgentModel.collect_stats
+            'total_resources': [food.sum() for food in self.food_resource[:, :-1]],
+        })
+
+        if self.stop_rules:
+            stop = np.zeros(self.replicates, dtype=bool)
+            if 'extinction' in self.stop_rules:
+                extinct = self.active & (totals == 0)
+                self.mark_stopped(extinct, 'extinction', step)
+                stop |= extinct
+            if 'fixation' in self.stop_rules and self.mutation_rate == 0:
+                fixed = self.active & ~stop & (np.count_nonzero(counts, axis=1) == 1)
+                self.mark_stopped(fixed, 'fixation', step)
+
+    def mark_stopped(self, worlds, reason, step):
+        for r in np.flatnonzero(worlds):
+            self.active[r] = False
+            self.stop_step[r] = step
+            self.stop_reason[r] = reason
+            if self.debug_mode:
+                logger.info(f"World {r} stopped at step {step}: {reason}")
+
+    def run(self, steps):
+        """Step every world up to ``steps`` collected steps (or until all of them have stopped)"""
+        for step in range(self.stats.steps_seen, steps):
+            if not self.active.any():
+                break
+            self.step()
+            self.collect_stats(step)
+        return self
+
+    def steps_run(self):
+        """Collected steps per world (up to and including the stop step of stopped worlds)"""
+        return np.where(self.stop_step >= 0, self.stop_step + 1, self.stats.steps_seen)
+
+
+# ---------------- Tiled engine ----------------
+HANDOFF_DTYPE = np.dtype([
+    # a claim on a cell of the neighbouring strip, with everything needed to take the agent in
+    ('cell', np.int64), ('priority', np.float64), ('won', np.bool_),
+    ('from_cell', np.int64),  # previous cell of a moving agent, -1 for a newborn
+    ('id', np.int64), ('parent', np.int64), ('energy', np.float64), ('strategy', np.int8), ('patch', np.int32),
+    ('history_x', np.int32, (AgentStore.HISTORY,)), ('history_y', np.int32, (AgentStore.HISTORY,)),
+    ('history_len', np.int8), ('flockmates', np.int64),
+])
+# per-tile statistics row written every step (counters are cumulative)
+TILE_STATS = (STRATEGIES + ('total_resources', 'total_moves', 'loop_prevention_moves')
+              + tuple(f"{s}_migration_deaths" for s in STRATEGIES)
+              + tuple(f"{s}_successful_migrations" for s in STRATEGIES) + ('time',))
+
+
+class SharedArrays:
+    """Named NumPy arrays laid out in one ``multiprocessing.shared_memory`` block.
+
+    The parent creates the block from (name, shape, dtype) specs; worker processes
+    attach with ``SharedArrays(specs, name)`` (see ``handle``). The arrays are views
+    of the block, so drop every reference to them before ``close``.
+    """
+
+    def __init__(self, specs, name=None):
+        from multiprocessing import shared_memory
+        self.specs = [(key, tuple(shape), np.dtype(dtype)) for key, shape, dtype in specs]
+        offsets, size = [], 0
+        for _, shape, dtype in self.specs:
+            size = -(-size // 64) * 64  # 64-byte aligned
+            offsets.append(size)
+            size += int(np.prod(shape)) * dtype.itemsize
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=max(1, size))
+        self.arrays = {key: np.ndarray(shape, dtype, buffer=self.shm.buf, offset=offset)
+                       for (key, shape, dtype), offset in zip(self.specs, offsets)}
+
+    @property
+    def handle(self):
+        """Arguments that attach another process to this block"""
+        return self.specs, self.shm.name
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def close(self, unlink=False):
+        self.arrays.clear()
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+class TileWorker:
+    """One vertical strip [x0, x1) of a TiledModel world, stepped in its own process.
+
+    The strip's agents live in a private AgentStore. What neighbours need to see is
+    shared: ``occupancy`` (strategy code of the agent on every cell, EMPTY if free)
+    and ``food_resource``. A strip writes only its own columns of both and reads
+    the halo around them: 2 columns for moves, group_dispersal_range for flockmates.
+    Claims on cells of a neighbouring strip (moves and children) are posted to the
+    ``handoff`` mailboxes; the owner of the cell resolves them together with its
+    own claims, takes in the winners and flags them, so the sender can let go of
+    the agent (or charge the parent). Phases are separated by a barrier.
+    """
+    # kernels shared with AgentModel (they only compare occupancy with EMPTY)
+    select_moves = AgentModel.select_moves_vectorized
+    harvest = AgentModel.harvest_optimized
+
+    def __init__(self, tile, bounds, params, seed, shared, agents, first_id, barrier):
+        for name, value in params.items():
+            setattr(self, name, value)
+        self.tile = tile
+        self.n_tiles = len(bounds) - 1
+        self.x0, self.x1 = int(bounds[tile]), int(bounds[tile + 1])
+        self.sides = [side for side, other in ((0, tile - 1), (1, tile + 1)) if 0 <= other < self.n_tiles]
+        self.barrier = barrier
+        self.rng = np.random.default_rng(seed)
+        self.profiler = None
+
+        world = load_world(self.width, self.height, self.patch_width, self.gap_size, self.carrying_capacity,
+                           cache_dir=self.world_cache)
+        for name in ('is_gap_grid', 'foodpatch_grid', 'food_index', 'food_patch'):
+            setattr(self, name, world[name])
+        self.own_food = np.flatnonzero((world['food_x'] >= self.x0) & (world['food_x'] < self.x1))
+        self.occupancy = shared['cells']
+        self.flat_cells = self.occupancy.reshape(-1)
+        self.food_resource = shared['food_resource']
+        self.handoff, self.n_handoff = shared['handoff'], shared['n_handoff']
+        self.stats_rows = shared['stats']
+
+        reach = int(math.ceil(self.group_dispersal_range))
+        self.fx0 = max(0, self.x0 - reach)
+        self.flock_counter = FlockmateCounter(min(self.width, self.x1 + reach) - self.fx0, self.height,
+                                              self.group_dispersal_range)
+
+        self.agents = AgentStore(capacity=max(64, 2 * len(agents['id'])), first_id=first_id, id_step=self.n_tiles)
+        self.agents.add_many(agents['x'], agents['y'], 5.0, agents['strategy'], patch=agents['patch'],
+                             ids=agents['id'])
+        S = len(STRATEGIES)
+        self.migration_deaths = np.zeros(S, dtype=np.int64)
+        self.successful_migrations = np.zeros(S, dtype=np.int64)
+        self.loop_prevention_moves = 0
+        self.total_moves = 0
+
+    # ---------- Mailboxes ----------
+    def side_of(self, x):
+        """-1 for columns of this strip, 0 / 1 for the left / right neighbour"""
+        return np.where(x < self.x0, 0, np.where(x >= self.x1, 1, -1))
+
+    def post(self, side, claims):
+        self.handoff[self.tile, side, :len(claims)] = claims
+        self.n_handoff[self.tile, side] = len(claims)
+
+    def posted(self, side):
+        """Claims this strip posted towards ``side`` (``won`` is filled in by the neighbour)"""
+        return self.handoff[self.tile, side, :self.n_handoff[self.tile, side]]
+
+    def received(self, side):
+        """Claims the neighbour on ``side`` posted on this strip (a view: ``won`` is set in place)"""
+        other = self.tile - 1 if side == 0 else self.tile + 1
+        return self.handoff[other, 1 - side, :self.n_handoff[other, 1 - side]]
+
+    def resolve(self, cells, priority):
+        """Resolve own claims together with the received ones; returns the own winners
+        and the received winning claims (flagged for their senders)"""
+        received = [self.received(side) for side in self.sides]
+        won = resolve_claims(np.concatenate([cells] + [claims['cell'] for claims in received]),
+                             np.concatenate([priority] + [claims['priority'] for claims in received]))
+        own, start = won[:len(cells)], len(cells)
+        arrived = []
+        for claims in received:
+            claims['won'] = won[start:start + len(claims)]
+            arrived.append(claims[claims['won']])
+            start += len(claims)
+        return own, np.concatenate(arrived) if arrived else np.zeros(0, dtype=HANDOFF_DTYPE)
+
+    def count_flockmates(self, rows):
+        """As AgentModel.count_flockmates for many rows, counted on the occupancy of the halo"""
+        window = self.occupancy[self.fx0:self.fx0 + self.flock_counter.width]
+        xs, ys = np.nonzero(window != EMPTY)
+        self.flock_counter.rebuild(xs, ys, window[xs, ys])
+        store = self.agents
+        return self.flock_counter.count_many(store.x[rows] - self.fx0, store.y[rows], store.strategy[rows])
+
+    # ---------- Step ----------
+    def step(self, index):
+        """One synchronous step (the rules of AgentModel.step_synchronous) of this strip"""
+        store = self.agents
+        H = self.height
+        wait = self.barrier.wait
+
+        # 1. Moves, chosen on the state at the start of the step
+        rows = store.alive_rows()
+        tx, ty, has_free = self.select_moves(rows)
+        movers, tx, ty = rows[has_free], tx[has_free], ty[has_free]
+        priority = self.rng.random(len(movers))
+        flockmates = np.zeros(len(movers), dtype=np.int64)
+        into_gap = self.is_gap_grid[tx, ty]
+        if into_gap.any():
+            flockmates[into_gap] = self.count_flockmates(movers[into_gap]) - 1
+        side = self.side_of(tx)
+        for s in self.sides:
+            out = side == s
+            claims = np.zeros(int(out.sum()), dtype=HANDOFF_DTYPE)
+            leaving = movers[out]
+            claims['cell'] = tx[out] * H + ty[out]
+            claims['priority'] = priority[out]
+            claims['from_cell'] = store.x[leaving].astype(np.int64) * H + store.y[leaving]
+            claims['flockmates'] = flockmates[out]
+            for name in ('id', 'parent', 'energy', 'strategy', 'patch', 'history_x', 'history_y', 'history_len'):
+                claims[name] = getattr(store, name)[leaving]
+            self.post(s, claims)
+        wait()
+
+        # 2. Move claims on this strip: own and received, conflicts resolved by priority
+        own = side == -1
+        won, arrived = self.resolve(tx[own] * H + ty[own], priority[own])
+        wait()
+
+        # 3. Apply the moves, then dispersal cost, harvest and living cost
+        mover_rows, mx, my = movers[own][won], tx[own][won], ty[own][won]
+        gap_flockmates = flockmates[own][won]
+        left = np.concatenate([movers[side == s][self.posted(s)['won']] for s in self.sides] or [rows[:0]])
+        vacated = np.concatenate([mover_rows, left])
+        self.flat_cells[store.x[vacated].astype(np.int64) * H + store.y[vacated]] = EMPTY
+        store.kill_many(left)
+        store.push_history(mover_rows, store.x[mover_rows], store.y[mover_rows])
+        store.x[mover_rows] = mx
+        store.y[mover_rows] = my
+
+        ax, ay = np.divmod(arrived['cell'], H)
+        newcomers = store.add_many(ax, ay, arrived['energy'], arrived['strategy'], patch=arrived['patch'],
+                                   parent=arrived['parent'], ids=arrived['id'])
+        store.history_x[newcomers] = arrived['history_x']
+        store.history_y[newcomers] = arrived['history_y']
+        store.history_len[newcomers] = arrived['history_len']
+        store.push_history(newcomers, *np.divmod(arrived['from_cell'], H))
+
+        moved = np.concatenate([mover_rows, newcomers])
+        flockmates = np.concatenate([gap_flockmates, arrived['flockmates']])
+        mx, my = store.x[moved], store.y[moved]
+        self.occupancy[mx, my] = store.strategy[moved]
+        self.total_moves += len(moved)
+
+        on_food = self.foodpatch_grid[mx, my]
+        new_patch = self.food_patch[self.food_index[mx, my]]
+        old_patch = store.patch[moved]
+        migrated = on_food & (old_patch != NO_PATCH) & (old_patch != new_patch)
+        self.successful_migrations += store.strategy_counts(moved[migrated])
+        store.patch[moved[on_food]] = new_patch[on_food]
+
+        def die(dead):
+            store.kill_many(dead)
+            self.occupancy[store.x[dead], store.y[dead]] = EMPTY
+
+        into_gap = self.is_gap_grid[mx, my]
+        gap_rows, flockmates = moved[into_gap], flockmates[into_gap]
+        is_defector = store.strategy[gap_rows] == STRATEGY_CODES['defector']
+        cost = np.where(is_defector, float(self.dispersal_cost), float(self.dispersal_cost) / (1.0 + flockmates))
+        store.energy[gap_rows] -= cost
+        dead = gap_rows[store.energy[gap_rows] <= 0]
+        self.migration_deaths += store.strategy_counts(dead)
+        die(dead)
+
+        alive = store.alive_rows()
+        self.harvest(alive)
+        store.energy[alive] -= self.living_costs
+        die(alive[store.energy[alive] <= 0])
+        wait()
+
+        # 4. Reproduction, on the cells left free after moves and deaths
+        parents = store.alive_rows()
+        energy = store.energy[parents]
+        parents = parents[(energy >= self.cost_child) & (self.rng.random(len(parents)) <= 0.0005 * energy)]
+        cells, inside = neighbourhood(store.x[parents], store.y[parents], 1, self.width, H)
+        free = inside & (self.flat_cells[cells] == EMPTY)
+        has_free = free.any(axis=1)
+        parents, cells, free = parents[has_free], cells[has_free], free[has_free]
+        target = cells[np.arange(len(parents)), pick_random_true(free, self.rng.random(len(parents)))]
+        strategy = store.strategy[parents].copy()
+        mutate = self.rng.random(len(parents)) < self.mutation_rate
+        strategy[mutate] = self.rng.integers(0, len(STRATEGIES), size=int(mutate.sum()))
+        priority = self.rng.random(len(parents))
+        side = self.side_of(target // H)
+        for s in self.sides:
+            out = side == s
+            claims = np.zeros(int(out.sum()), dtype=HANDOFF_DTYPE)
+            claims['cell'] = target[out]
+            claims['priority'] = priority[out]
+            claims['from_cell'] = -1
+            claims['parent'] = store.id[parents[out]]
+            claims['strategy'] = strategy[out]
+            self.post(s, claims)
+        wait()
+
+        # 5. Children: own and received claims, conflicts resolved by priority
+        own = side == -1
+        won, arrived = self.resolve(target[own], priority[own])
+        cells = np.concatenate([target[own][won], arrived['cell']])
+        cx, cy = np.divmod(cells, H)
+        strategy = np.concatenate([strategy[own][won], arrived['strategy']])
+        parent_ids = np.concatenate([store.id[parents[own][won]], arrived['parent']])
+        store.add_many(cx, cy, float(self.cost_child), strategy, patch=self.food_patch[self.food_index[cx, cy]],
+                       parent=parent_ids)
+        self.occupancy[cx, cy] = strategy
+        store.energy[parents[own][won]] -= self.cost_child
+        wait()
+
+        # 6. Parents of children placed next door pay for them; regrowth; statistics
+        for s in self.sides:
+            store.energy[parents[side == s][self.posted(s)['won']]] -= self.cost_child
+        self.regrow()
+        if store.n_dead > max(AgentModel.COMPACT_MIN_DEAD, store.n_alive):
+            store.compact()
+        self.stats_rows[index, self.tile] = np.concatenate([
+            store.alive_by_strategy,
+            [self.food_resource[self.own_food].sum(dtype=np.float64), self.total_moves, self.loop_prevention_moves],
+            self.migration_deaths, self.successful_migrations, [time.time()]])
+        wait()
+
+    def regrow(self):
+        """AgentModel.regrow_optimized on the food cells of this strip"""
+        resource = self.food_resource[self.own_food]
+        mask = resource >= 0.1
+        r = resource[mask]
+        resource[mask] = np.minimum(r + self.growth_rate * r * (1 - r / self.carrying_capacity), self.carrying_capacity)
+        resource[resource < 0.1] = 0.1
+        self.food_resource[self.own_food] = resource
+
+    def run(self, steps, stop_rules):
+        """Step ``steps`` times, or until a stop rule is met on the counts of all strips.
+
+        Returns the steps done and the stop reason (None when none was met).
+        """
+        for index in range(steps):
+            self.step(index)
+            counts = self.stats_rows[index, :, :len(STRATEGIES)].sum(axis=0)
+            if 'extinction' in stop_rules and counts.sum() == 0:
+                return index + 1, 'extinction'
+            if 'fixation' in stop_rules and self.mutation_rate == 0 and np.count_nonzero(counts) == 1:
+                return index + 1, 'fixation'
+        return steps, None
+
+    def agent_columns(self):
+        """Columns of the alive agents of this strip"""
+        alive = self.agents.alive_rows()
+        return {name: getattr(self.agents, name)[alive]
+                for name in ('id', 'x', 'y', 'energy', 'strategy', 'patch', 'parent')}
+
+
+def _run_tile(tile, bounds, params, seed, handle, agents, first_id, barrier, conn):
+    """Worker process of a TiledModel: serves 'run' and 'agents' commands until 'close'"""
+    shared = SharedArrays(*handle)
+    worker = None
+    try:
+        worker = TileWorker(tile, bounds, params, seed, shared, agents, first_id, barrier)
+        conn.send(('ok', None))
+        while True:
+            command, *args = conn.recv()
+            if command == 'run':
+                conn.send(('ok', worker.run(*args)))
+            elif command == 'agents':
+                conn.send(('ok', worker.agent_columns()))
+            else:
+                break
+    except threading.BrokenBarrierError:
+        conn.send(('error', None))  # another tile failed and reports why
+    except Exception:
+        barrier.abort()
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        worker = None
+        shared.close()
+
+
+class TiledModel:
+    """The synchronous AgentModel with the world split into ``tiles`` vertical strips,
+    each stepped by its own worker process (see TileWorker).
+
+    The rules are those of ``AgentModel(update_mode="synchronous")``: moves on the
+    state at the start of the step, flockmates counted before moving, the same
+    random-priority conflict rule for target cells and children. Only the random
+    streams differ (one per strip, claim priorities are uniforms instead of a
+    permutation), so results agree with the single-process model in distribution,
+    not run for run. Workers step ``CHUNK`` steps per command and write one
+    statistics row per step and strip to shared memory, which ``run`` collects.
+
+    Stop rules 'fixation' and 'extinction' are supported. Use as a context manager
+    (or call ``close``) to stop the workers and release the shared memory.
+    """
+    PARAMS = EnsembleModel.PARAMS
+    STOP_RULES = ('fixation', 'extinction')
+    CHUNK = 256  # steps per command to the workers (rows of the shared statistics buffer)
+
+    def __init__(self, tiles=4, random_seed=None, stop_rules="", debug_mode=False,
+                 update_mode="synchronous", **params):
+        if update_mode != "synchronous":
+            raise ValueError("TiledModel only implements the synchronous update")
+        unsupported = set(params) - set(self.PARAMS)
+        if unsupported:
+            raise ValueError(f"Parameter(s) {sorted(unsupported)} not supported by TiledModel")
+        defaults = inspect.signature(AgentModel.__init__).parameters
+        for name in self.PARAMS:
+            setattr(self, name, params.get(name, defaults[name].default))
+        if isinstance(stop_rules, str):
+            stop_rules = [rule.strip() for rule in stop_rules.split(",") if rule.strip()]
+        unknown = set(stop_rules) - set(self.STOP_RULES)
+        if unknown:
+            raise ValueError(f"Stop rule(s) {sorted(unknown)} not supported by TiledModel")
+        if tiles < 1 or self.width < 2 * tiles:
+            raise ValueError(f"{tiles} tiles need a world at least {2 * tiles} cells wide (2 columns per tile)")
+        self.stop_rules = tuple(stop_rules)
+        self.tiles = tiles
+        self.debug_mode = debug_mode
+        self.params_snapshot = {name: getattr(self, name) for name in self.PARAMS}
+        self.params_snapshot.update(random_seed=random_seed, update_mode=update_mode, tiles=tiles,
+                                    stop_rules=",".join(self.stop_rules))
+        if debug_mode:
+            logger.info(f"[PARAMS] {self.params_snapshot}")
+        self.start_time = time.time()
+        self.stop_reason = None
+        self.stop_step = None
+        self.profiler = None
+        self.stats = StatsSink()
+        self.migration_deaths = dict.fromkeys(STRATEGIES, 0)
+        self.successful_migrations = dict.fromkeys(STRATEGIES, 0)
+        self.loop_prevention_moves = 0
+        self.total_moves = 0
+
+        W, H = self.width, self.height
+        world = load_world(W, H, self.patch_width, self.gap_size, self.carrying_capacity, cache_dir=self.world_cache)
+        self.bounds = np.linspace(0, W, tiles + 1).astype(np.int64)
+        self.shared = SharedArrays([
+            ('cells', (W, H), np.int8),
+            ('food_resource', world['food_resource'].shape, np.float32),
+            ('handoff', (tiles, 2, 2 * H), HANDOFF_DTYPE),  # at most 2 columns of agents claim across a border
+            ('n_handoff', (tiles, 2), np.int64),
+            ('stats', (self.CHUNK, tiles, len(TILE_STATS)), np.float64),
+        ])
+        self.occupancy = self.shared['cells']
+        self.occupancy[...] = EMPTY
+        self.food_resource = self.shared['food_resource']
+        self.food_resource[...] = world['food_resource']
+
+        # Initial agents as AgentModel.setup_agents_from_params, then dealt out to the strips
+        seeds = spawn_seeds(random_seed, tiles + 1)
+        rng = np.random.default_rng(seeds[0])
+        food_x, food_y = world['food_x'], world['food_y']
+        n_coop = round(self.initial_agents * self.percent_cooperators / 100)
+        n_cond = round(self.initial_agents * self.percent_conditionals / 100)
+        n_def = max(0, self.initial_agents - n_coop - n_cond)
+        n_total = n_coop + n_cond + n_def
+        if n_total > len(food_x):
+            raise RuntimeError(f"{n_total} agents do not fit on {len(food_x)} food cells")
+        cells = rng.choice(len(food_x), size=n_total, replace=False)
+        agents = {'id': np.arange(n_total, dtype=np.int64), 'x': food_x[cells], 'y': food_y[cells],
+                  'strategy': np.repeat(np.arange(len(STRATEGIES), dtype=np.int8), [n_coop, n_cond, n_def]),
+                  'patch': world['food_patch'][cells]}
+        self.occupancy[agents['x'], agents['y']] = agents['strategy']
+
+        import multiprocessing
+        ctx = multiprocessing.get_context()
+        barrier = ctx.Barrier(tiles)
+        worker_params = {name: getattr(self, name) for name in self.PARAMS if name != 'results_prefix'}
+        self.workers, self.conns = [], []
+        try:
+            for tile in range(tiles):
+                mine = (agents['x'] >= self.bounds[tile]) & (agents['x'] < self.bounds[tile + 1])
+                conn, child_conn = ctx.Pipe()
+                worker = ctx.Process(target=_run_tile, daemon=True,
+                                     args=(tile, self.bounds, worker_params, seeds[tile + 1], self.shared.handle,
+                                           {name: column[mine] for name, column in agents.items()},
+                                           n_total + tile, barrier, child_conn))
+                worker.start()
+                child_conn.close()
+                self.workers.append(worker)
+                self.conns.append(conn)
+            self._replies()
+        except BaseException:
+            self.close()
+            raise
+
+    def _replies(self):
+        """Wait for every worker's answer to the last command; raise if one of them failed"""
+        replies = [conn.recv() for conn in self.conns]
+        errors = [message for status, message in replies if status == 'error']
+        if errors:
+            raise RuntimeError("Tile worker failed:\n" + next((e for e in errors if e), "unknown error"))
+        return [message for _, message in replies]
+
+    def _ask(self, *command):
+        for conn in self.conns:
+            conn.send(command)
+        return self._replies()
+
+    def run(self, steps):
+        """Step up to ``steps`` collected steps (or until a stop rule is met); returns self"""
+        while self.stats.steps_seen < steps and self.stop_reason is None:
+            n = min(self.CHUNK, steps - self.stats.steps_seen)
+            done, reason = self._ask('run', n, self.stop_rules)[0]
+            self.collect_stats(done)
+            if reason is not None:
+                self.stop_reason, self.stop_step = reason, self.stats.steps_seen - 1
+                if self.debug_mode:
+                    logger.info(f"Stopping at step {self.stop_step}: {reason}")
+        return self
+
+    def collect_stats(self, n):
+        """Append the first ``n`` rows of the shared statistics buffer, summed over the strips"""
+        rows = self.shared['stats']
+        for index in range(n):
+            totals = {name: (value if name == 'total_resources' else int(value))
+                      for name, value in zip(TILE_STATS, rows[index].sum(axis=0))}
+            self.total_moves = int(totals['total_moves'])
+            self.loop_prevention_moves = int(totals['loop_prevention_moves'])
+            self.stats.append({
+                'steps': self.stats.steps_seen,
+                'cooperators': totals['cooperator'], 'conditionals': totals['conditional'],
+                'defectors': totals['defector'], 'total_resources': totals['total_resources'],
+                'runtime': float(rows[index, :, -1].max()) - self.start_time,
+                'agents_alive': sum(totals[s] for s in STRATEGIES),
+                'loop_prevention_ratio': self.loop_prevention_moves / max(1, self.total_moves),
+            })
+        if n:
+            for s in STRATEGIES:
+                self.migration_deaths[s] = totals[f"{s}_migration_deaths"]
+                self.successful_migrations[s] = totals[f"{s}_successful_migrations"]
+
+    def strategy_counts(self):
+        """Alive agents per strategy after the last collected step"""
+        return np.array([self.stats.last(name) for name in ('cooperators', 'conditionals', 'defectors')],
+                        dtype=np.int64)
+
+    def agent_columns(self):
+        """Columns (id, x, y, energy, strategy, patch, parent) of all alive agents, gathered from the workers"""
+        parts = self._ask('agents')
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+
+    # text summary and plots as for AgentModel
+    save_results = AgentModel.save_results
+    _save_plots = AgentModel._save_plots
+
+    def close(self):
+        """Stop the workers and release the shared memory (world arrays are kept as private copies)"""
+        if getattr(self, 'shared', None) is None:
+            return
+        for conn in self.conns:
+            try:
+                conn.send(('close',))
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self.occupancy = np.array(self.occupancy)
+        self.food_resource = np.array(self.food_resource)
+        self.shared.close(unlink=True)
+        self.shared = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------- Headless runner ----------------
+INT_PARAMS = ("width", "height", "initial_agents", "patch_width", "gap_size", "checkpoint_every",
+              "stats_buffer_rows", "stats_every", "stationary_window", "record_every", "record_keyframe_every",
+              "events_buffer_rows")
+MODEL_PARAMS = tuple(name for name in inspect.signature(AgentModel.__init__).parameters if name != "self")
+
+
+def coerce_param(key, value):
+    """Convert a parameter given as text (GUI entry or command line) to the type AgentModel expects"""
+    value = value.strip()
+    if key not in MODEL_PARAMS:
+        raise ValueError(f"Unknown parameter {key!r}")
+    if key in INT_PARAMS:
+        return int(value)
+    if key in ("results_prefix", "update_mode", "stop_rules"):
+        return value
+    if key in ("checkpoint_path", "stats_path", "world_cache", "record_path", "events_path"):
+        return value or None
+    if key == "random_seed":
+        return int(value) if value != "" else None
+    if key in ("debug_mode", "profile", "log_events"):
+        return value.lower() in ("1", "true", "yes", "on")
+    return float(value)
+
+
+def parse_param_overrides(pairs):
+    """Parse ``NAME=VALUE`` strings (NetLogo-style dashed names allowed) into model parameters"""
+    params = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise ValueError(f"Expected NAME=VALUE, got {pair!r}")
+        key = key.strip().replace("-", "_")
+        params[key] = coerce_param(key, value)
+    return params
+
+
+def validate_model_params(params):
+    """Raise ValueError for parameter combinations the model cannot run with"""
+    coop = params.get('percent_cooperators', 60)
+    cond = params.get('percent_conditionals', 10)
+    if coop + cond > 100:
+        raise ValueError("Cooperators + Conditionals cannot exceed 100%")
+    if params.get('width', 112) <= 0 or params.get('height', 112) <= 0:
+        raise ValueError("Width and height must be positive")
+    rules = params.get('stop_rules') or ""
+    rules = [r.strip() for r in rules.split(",") if r.strip()] if isinstance(rules, str) else list(rules)
+    unknown = set(rules) - set(AgentModel.STOP_RULES)
+    if unknown:
+        raise ValueError(f"Unknown stop rule(s) {sorted(unknown)}, expected some of {AgentModel.STOP_RULES}")
+    if 'stationary' in rules and params.get('stationary_window', 500) < 2:
+        raise ValueError("stationary_window must be at least 2")
+
+
+def run_headless(model, steps, results_dir=None, plots=True, save=True):
+    """Step the model without any GUI up to ``steps`` collected steps, then save the results.
+
+    A model resumed from a checkpoint continues from the last step it collected; a
+    model with stop rules ends as soon as one of them is met.
+    """
+    for step in range(model.stats.steps_seen, steps):
+        if model.stop_reason is not None:
+            break
+        model.step()
+        model.collect_stats(step)
+    if save:
+        model.save_results(results_dir=results_dir, plots=plots)
+    return model
+
+# ---------------- Parameter sweeps (BehaviorSpace-style) ----------------
+SWEEP_TYPES = STRATEGIES + ('greedy',)  # 'greedy' = high eaters (conditionals + defectors), as in NetLogo
+
+
+def netlogo_name(param):
+    """``group_dispersal_range`` -> ``group-dispersal-range`` (BehaviorSpace column names)"""
+    return param.replace("_", "-")
+
+
+def format_param_value(value):
+    """Write integral floats as integers (``50`` rather than ``50.0``), as BehaviorSpace does"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def expand_param_grid(param_grid):
+    """All combinations of a {name: [values]} grid, in BehaviorSpace order (last name varies fastest)"""
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+
+
+def parse_grid_spec(specs):
+    """Parse ``NAME=V1,V2,...`` strings into a parameter grid"""
+    grid = {}
+    for spec in specs:
+        key, sep, values = spec.partition("=")
+        if not sep or not values.strip():
+            raise ValueError(f"Expected NAME=V1,V2,..., got {spec!r}")
+        key = key.strip().replace("-", "_")
+        grid[key] = [coerce_param(key, v) for v in values.split(",")]
+    return grid
+
+
+def run_sweep_job(job):
+    """Run one replicate headless and return its result rows (one per type)"""
+    run_number, params, steps, seed = job
+    model = AgentModel(**params, random_seed=seed)
+    run_headless(model, steps, save=False)
+    if model.events:
+        model.events.flush()
+    counts = model.agents.strategy_counts()
+    finals = dict(zip(STRATEGIES, (int(n) for n in counts)))
+    finals['greedy'] = finals['conditional'] + finals['defector']
+    steps_run = model.stats.steps_seen
+    return [(run_number, t, finals[t], steps_run) for t in SWEEP_TYPES]
+
+
+def run_ensemble_job(job):
+    """Run several replicates of one grid point together in an EnsembleModel; rows as run_sweep_job"""
+    run_numbers, params, steps, seeds = job
+    model = EnsembleModel(seeds=seeds, **params).run(steps)
+    counts, steps_run = model.strategy_counts(), model.steps_run()
+    rows = []
+    for r, run_number in enumerate(run_numbers):
+        finals = dict(zip(STRATEGIES, (int(n) for n in counts[r])))
+        finals['greedy'] = finals['conditional'] + finals['defector']
+        rows.extend((run_number, t, finals[t], int(steps_run[r])) for t in SWEEP_TYPES)
+    return rows
+
+
+def job_runs(job):
+    """Number of replicates in a sweep job (ensemble jobs carry a list of run numbers)"""
+    return len(job[0]) if isinstance(job[0], list) else 1
+
+
+def _run_sweep_chunk(jobs):
+    return [row for job in jobs
+            for row in (run_ensemble_job(job) if isinstance(job[0], list) else run_sweep_job(job))]
+
+
+def run_sweep(param_grid, replicates=1, steps=18000, base_params=None, output=None,
+              workers=None, chunksize=1, root_seed=None, ensemble=1, events_dir=None):
+    """Run every grid point ``replicates`` times over a process pool and write one tidy CSV.
+
+    The table has the columns of the NetLogo BehaviorSpace export
+    (``[run number]``, one column per swept parameter, ``types``, ``[final]``,
+    ``[steps]``). With ``ensemble=k`` (synchronous update only) the replicates of
+    a grid point run k at a time in one EnsembleModel; run numbers, seeds and
+    results are the same as without. With ``events_dir`` every run logs its
+    births, deaths and migrations (see EventLog) to ``events_dir/run_<run number>``.
+    Returns the rows as a list of tuples.
+    """
+    base_params = dict(base_params or {})
+    base_params['debug_mode'] = False
+    points = expand_param_grid(param_grid)
+
+    seeds = spawn_seeds(root_seed, len(points) * replicates)
+    jobs = []
+    run_number = 0
+    for point in points:
+        params = {**base_params, **point}
+        if ensemble > 1:
+            for first in range(0, replicates, ensemble):
+                numbers = list(range(run_number + first + 1, run_number + min(replicates, first + ensemble) + 1))
+                jobs.append((numbers, params, steps, [seeds[n - 1] for n in numbers]))
+        else:
+            for k in range(replicates):
+                run_params = (params if events_dir is None else
+                              {**params, 'events_path': os.path.join(events_dir, f"run_{run_number + k + 1}")})
+                jobs.append((run_number + k + 1, run_params, steps, seeds[run_number + k]))
+        run_number += replicates
+    chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), max(1, chunksize))]
+    n_runs = run_number
+
+    start = time.time()
+    results = []
+    done = 0
+
+    def report(n_jobs):
+        nonlocal done
+        done += n_jobs
+        elapsed = time.time() - start
+        eta = elapsed / done * (n_runs - done)
+        logger.info(f"[SWEEP] {done}/{n_runs} runs done, elapsed {elapsed:.1f}s, ETA {eta:.1f}s")
+
+    if workers == 1:
+        for chunk in chunks:
+            results.extend(_run_sweep_chunk(chunk))
+            report(sum(job_runs(job) for job in chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_run_sweep_chunk, chunk): sum(job_runs(job) for job in chunk)
+                       for chunk in chunks}
+            for future in as_completed(futures):
+                results.extend(future.result())
+                report(futures[future])
+
+    by_run = {number: job[1] for job in jobs for number in (job[0] if isinstance(job[0], list) else [job[0]])}
+    rows = []
+    for run_number, type_name, final, steps_run in sorted(results, key=lambda r: (r[0], SWEEP_TYPES.index(r[1]))):
+        point = by_run[run_number]
+        rows.append((run_number, *(format_param_value(point[name]) for name in param_grid),
+                     type_name, final, steps_run))
+
+    if output is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["[run number]", *(netlogo_name(name) for name in param_grid),
+                             "types", "[final]", "[steps]"])
+            writer.writerows(rows)
+        logger.info(f"Saving sweep results to: {output}")
+    return rows
+
+
+# ---------------- Benchmarks ----------------
+BENCH_SEED = 20220905  # every benchmark case runs from the same seed
+BENCH_SUITES = {
+    # scaling curve name -> list of parameter overrides (on top of the AgentModel defaults)
+    'agents': [{'width': 224, 'height': 224, 'initial_agents': n} for n in (80, 320, 1280)],
+    'world': [{'width': n, 'height': n} for n in (112, 224, 448)],
+    'range': [{'group_dispersal_range': r} for r in (0, 10, 50, 150)],
+    'patches': [{'patch_width': w, 'gap_size': g} for w, g in ((2, 30), (4, 20), (8, 10))],
+}
+BENCH_METRICS = {
+    # metric -> True when larger is better (used by the regression check)
+    'steps_per_second': True,
+    'setup_world_seconds': False,
+    'setup_agents_seconds': False,
+    'peak_memory_mb': False,
+}
+BENCH_MIN_SECONDS = 0.005  # setup times below this are timer noise and never flagged
+
+
+def bench_case_name(suite, overrides, update_mode):
+    return f"{suite}/{update_mode}/" + ",".join(f"{k}={v}" for k, v in overrides.items())
+
+
+def run_benchmark_case(params, steps, repeats=3, memory=True):
+    """Best-of-``repeats`` setup and stepping times of one parameter set, plus peak traced memory"""
+    params = {**params, 'random_seed': BENCH_SEED, 'debug_mode': False}
+    best = {'setup_world_seconds': math.inf, 'setup_agents_seconds': math.inf, 'step_seconds': math.inf}
+    for _ in range(max(1, repeats)):
+        model = AgentModel(**params)
+        start = time.perf_counter()
+        for step in range(steps):
+            model.step()
+            model.collect_stats(step)
+        best['step_seconds'] = min(best['step_seconds'], time.perf_counter() - start)
+        best['setup_world_seconds'] = min(best['setup_world_seconds'], model.setup_times['world'])
+        best['setup_agents_seconds'] = min(best['setup_agents_seconds'], model.setup_times['agents'])
+
+    result = dict(best, steps=steps, steps_per_second=steps / max(best['step_seconds'], 1e-9),
+                  agents_alive=int(model.agents.n_alive))
+    if memory:
+        # separate pass: tracing slows the run down, so it never overlaps the timed ones
+        tracemalloc.start()
+        try:
+            model = AgentModel(**params)
+            for step in range(steps):
+                model.step()
+                model.collect_stats(step)
+            result['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(suites=None, steps=200, repeats=3, update_modes=("asynchronous", "synchronous"), memory=True):
+    """Run the scaling curves in ``BENCH_SUITES`` and return a baseline document (JSON-serialisable)"""
+    results = {}
+    for suite in suites or BENCH_SUITES:
+        for update_mode in update_modes:
+            for overrides in BENCH_SUITES[suite]:
+                name = bench_case_name(suite, overrides, update_mode)
+                results[name] = run_benchmark_case({**overrides, 'update_mode': update_mode},
+                                                   steps, repeats=repeats, memory=memory)
+                logger.info(f"[BENCH] {name}: {results[name]['steps_per_second']:.1f} steps/s"
+                            + (f", peak {results[name]['peak_memory_mb']:.1f} MB" if memory else ""))
+    return {
+        'seed': BENCH_SEED, 'steps': steps, 'repeats': repeats,
+        'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.platform(),
+        'results': results,
+    }
+
 
-        if valid_neighbors:
-            # Move to patch with highest resources
-            best_patch = max(valid_neighbors, key=lambda p: self.resource_grid[p[0], p[1]])
-            return best_patch
-        else:
-            # Move to random unoccupied neighbor
-            return random.choice(free_neighbors)
+def compare_benchmarks(current, baseline, threshold=0.15):
+    """Regressions of ``current`` against ``baseline``: (case, metric, baseline value, current value) tuples.
 
-    # ---------- Enhanced step function ----------
-    def step(self):
-        """Enhanced step function with performance monitoring"""
-        step_start = time.time()
-        
-        alive_agents = self.get_alive_agents()
-        random.shuffle(alive_agents)
-        
-        moves_this_step = 0
-        deaths_this_step = 0
-        births_this_step = 0
-        
-        for agent in alive_agents:
-            if not agent['alive']:
+    A metric regresses when it is worse than the baseline by more than ``threshold``
+    (a fraction); cases or metrics missing from either side are skipped.
+    """
+    regressions = []
+    for name, metrics in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric, higher_is_better in BENCH_METRICS.items():
+            if metric not in metrics or metric not in base:
                 continue
-                
-            x, y = agent['position']
-            old_patch = agent['mypatch']
+            old, new = base[metric], metrics[metric]
+            if metric.endswith('_seconds') and max(old, new) < BENCH_MIN_SECONDS:
+                continue
+            worse = new < old * (1 - threshold) if higher_is_better else new > old * (1 + threshold)
+            if worse:
+                regressions.append((name, metric, old, new))
+    return regressions
 
-            # Enhanced flockmate finding with spatial optimization
-            flockmates = self.find_flockmates_optimized(agent)
 
-            # Enhanced movement
-            new_pos = self.get_best_move_anti_loop(agent)
-            if new_pos:
-                newx, newy = new_pos
-                
-                # Update position and history
-                agent['last_positions'].append(agent['position'])
-                agent['position'] = (newx, newy)
-                moves_this_step += 1
-                self.total_moves += 1
-                
-                # Update patch info
-                cell = self.grid[newx][newy]
-                if cell.foodpatch:
-                    agent['mypatch'] = cell.foodpatchnum
-                    if old_patch is not None and old_patch != agent['mypatch']:
-                        self.successful_migrations[agent['strategy']] += 1
-                
-                # Apply dispersal cost if in gap
-                if self.is_gap_grid[newx, newy]:
-                    flock_count = 1 + len(flockmates)
-                    if agent['strategy'] != 'defector':
-                        cost = float(self.dispersal_cost) / float(flock_count)
-                    else:
-                        cost = float(self.dispersal_cost)
-                    
-                    agent['energy'] -= cost
-                    if agent['energy'] <= 0:
-                        self.migration_deaths[agent['strategy']] += 1
-                        agent['alive'] = False
-                        deaths_this_step += 1
-                        continue
+# ---------------- Enhanced Animation ----------------
+class Frame:
+    """Snapshot of one animation frame: the resource grid, the alive agents and the population history.
 
-            # Harvest (optimized)
-            self.harvest_optimized(agent)
-            
-            # Living cost
-            agent['energy'] -= self.living_costs
-            if agent['energy'] <= 0:
-                agent['alive'] = False
-                deaths_this_step += 1
-                continue
+    ``history`` holds the step numbers and the cooperator, conditional and defector
+    counts of every step so far (the frame only keeps views of their first entries).
+    """
+    __slots__ = ('step', 'resource', 'x', 'y', 'strategy', 'energy', 'history', 'loop_moves', 'total_moves', 'done')
 
-            # Reproduction
-            if self.reproduce_optimized(agent):
-                births_this_step += 1
+    def __init__(self, model, step, history, done=False):
+        store = model.agents
+        rows = model.get_alive_rows()
+        self.step = step
+        self.resource = model.resource_grid.astype(np.float32)
+        self.x = store.x[rows]
+        self.y = store.y[rows]
+        self.strategy = store.strategy[rows]
+        self.energy = store.energy[rows].astype(np.float32)
+        self.history = history
+        self.loop_moves = model.loop_prevention_moves
+        self.total_moves = model.total_moves
+        self.done = done
 
-        # Invalidate cache if agents died/born
-        if deaths_this_step > 0 or births_this_step > 0:
-            self.invalidate_cache()
 
-        # Regrow resources (optimized)
-        self.regrow_optimized()
-        
-        step_time = time.time() - step_start
-        
-        if self.debug_mode and hasattr(self, 'current_step'):
-            if self.current_step % 100 == 0:  # Log every 100 steps
-                logger.info(f"Step {self.current_step}: {len(self.get_alive_agents())} alive, "
-                          f"{moves_this_step} moves, {deaths_this_step} deaths, {births_this_step} births, "
-                          f"time: {step_time:.3f}s")
+class FrameFeed:
+    """Steps a model flat out in a background thread and publishes Frames to a bounded queue.
 
-    def find_flockmates_optimized(self, agent):
-        """Optimized flockmate finding"""
-        x, y = agent['position']
-        flockmates = []
-        
-        for other in self.get_alive_agents():
-            if other is agent or not other['alive'] or other['strategy'] != agent['strategy']:
-                continue
-            ox, oy = other['position']
-            distance = math.sqrt((x - ox)**2 + (y - oy)**2)
-            if distance <= self.group_dispersal_range:
-                flockmates.append(other)
-        
-        return flockmates
+    A Frame is taken every ``steps_per_frame`` steps; when the renderer falls
+    behind, the oldest queued frames are dropped, so ``latest`` always returns the
+    newest state and the simulation never waits for the window. Population counts
+    of every step go to preallocated arrays that are only appended to, so frames
+    can share them without copying.
+    """
+    QUEUE_SIZE = 2
 
-    def harvest_optimized(self, agent):
-        """Optimized harvest function"""
-        if not agent['alive']:
-            return
-        
-        x, y = agent['position']
-        if not self.foodpatch_grid[x, y]:
-            return
-            
-        res = self.resource_grid[x, y]
-        if res <= 0:
-            return
-            
-        if agent['eattype'] == 'low':
-            take = 0.5 * res
-        else:
-            take = 0.99 * res
-            
-        self.resource_grid[x, y] = max(0.0, res - take)
-        self.grid[x][y].resource = self.resource_grid[x, y]  # Keep sync
-        agent['energy'] += take
+    def __init__(self, model, steps, steps_per_frame=1):
+        self.model = model
+        self.steps = steps
+        self.steps_per_frame = steps_per_frame
+        self.frames = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self.history = np.zeros((4, steps), dtype=np.int64)  # steps, cooperators, conditionals, defectors
+        self.filled = 0
+        self.dropped = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="simulation", daemon=True)
 
-    def reproduce_optimized(self, agent):
-        """Optimized reproduction with better neighbor finding"""
-        if agent['energy'] < self.cost_child:
-            return False
-            
-        prob = 0.0005 * agent['energy']
-        if random.random() > prob:
-            return False
-            
-        x, y = agent['position']
-        neighbors = self.neighbors_coords_circular(x, y, radius=1)
-        free = [p for p in neighbors if not self.is_position_occupied(p)]
-        
-        if not free:
-            return False
-            
-        dest = random.choice(free)
-        strat = agent['strategy']
-        eattype = 'low' if strat == 'cooperator' else 'high'
-        colors = {"cooperator": "green", "conditional": "blue", "defector": "red"}
-        
-        child = {
-            'id': self.next_agent_id,
-            'strategy': strat,
-            'position': dest,
-            'energy': float(self.cost_child),
-            'eattype': eattype,
-            'alive': True,
-            'mypatch': self.grid[dest[0]][dest[1]].foodpatchnum if self.foodpatch_grid[dest[0], dest[1]] else None,
-            'color': colors[strat],
-            'last_positions': deque(maxlen=3),
-            'stuck_counter': 0
-        }
-        
-        # Mutation
-        if random.random() < self.mutation_rate:
-            child['strategy'] = random.choice(['cooperator', 'conditional', 'defector'])
-            child['eattype'] = 'low' if child['strategy'] == 'cooperator' else 'high'
-            child['color'] = colors[child['strategy']]
-            
-        self.agents.append(child)
-        self.next_agent_id += 1
-        agent['energy'] -= self.cost_child
-        
-        return True
+    def start(self):
+        self._thread.start()
+        return self
 
-    def regrow_optimized(self):
-        """Optimized resource regrowth using numpy"""
-        # Use numpy for vectorized operations where possible
-        mask = self.foodpatch_grid & (self.resource_grid >= 0.1)
-        
-        # Vectorized growth calculation
-        r = self.resource_grid[mask]
-        growth = self.growth_rate * r * (1 - r / self.carrying_capacity)
-        self.resource_grid[mask] = np.minimum(r + growth, self.carrying_capacity)
-        
-        # Handle low resource patches
-        low_mask = self.foodpatch_grid & (self.resource_grid < 0.1)
-        self.resource_grid[low_mask] = 0.1
-        
-        # Sync with grid objects (only for changed patches)
-        changed_mask = mask | low_mask
-        for x in range(self.width):
-            for y in range(self.height):
-                if changed_mask[x, y]:
-                    self.grid[x][y].resource = self.resource_grid[x, y]
+    def stop(self):
+        """Ask the simulation thread to finish after its current step and wait for it"""
+        self._stop.set()
+        self._thread.join()
 
-    def collect_stats(self, step):
-        """Enhanced statistics collection"""
-        self.current_step = step  # Store for debugging
-        
-        alive_agents = self.get_alive_agents()
-        coop = sum(1 for a in alive_agents if a['strategy'] == 'cooperator')
-        cond = sum(1 for a in alive_agents if a['strategy'] == 'conditional')
-        defe = sum(1 for a in alive_agents if a['strategy'] == 'defector')
-        total_res = np.sum(self.resource_grid[self.foodpatch_grid])
-        
-        self.stats['cooperators'].append(coop)
-        self.stats['conditionals'].append(cond)
-        self.stats['defectors'].append(defe)
-        self.stats['total_resources'].append(total_res)
-        self.stats['steps'].append(step)
-        
-        # Performance metrics
-        if hasattr(self, 'start_time'):
-            runtime = time.time() - self.start_time
-            self.stats['performance_metrics'].append({
-                'step': step,
-                'runtime': runtime,
-                'agents_alive': len(alive_agents),
-                'loop_prevention_ratio': self.loop_prevention_moves / max(1, self.total_moves)
-            })
+    def _run(self):
+        model = self.model
+        try:
+            for step in range(self.steps):
+                if self._stop.is_set() or model.stop_reason is not None:
+                    break
+                model.step()
+                model.collect_stats(step)
+                row = model.stats.latest
+                self.history[:, step] = (step, row['cooperators'], row['conditionals'], row['defectors'])
+                self.filled = step + 1
+                if self.filled % self.steps_per_frame == 0:
+                    self.publish(self.filled)
+        except Exception:
+            self.error = traceback.format_exc()
+        finally:
+            self.publish(self.filled, done=True)
 
-    def save_results(self):
-        """Enhanced results saving with performance metrics"""
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        results_dir = os.path.join(script_dir, "results")
-        os.makedirs(results_dir, exist_ok=True)
-        
-        fname = os.path.join(results_dir, f"{self.results_prefix}.txt")
-        logger.info(f"Saving text results to: {fname}")
-        
-        with open(fname, 'w', encoding='utf-8') as f:
-            f.write("Enhanced Simulation Results\n\nParameters:\n")
-            for k, v in self.params_snapshot.items():
-                f.write(f"  {k}: {v}\n")
-            
-            f.write("\nPerformance Metrics:\n")
-            if hasattr(self, 'start_time'):
-                total_runtime = time.time() - self.start_time
-                f.write(f"  Total runtime: {total_runtime:.2f} seconds\n")
-                f.write(f"  Total moves: {self.total_moves}\n")
-                f.write(f"  Loop prevention moves: {self.loop_prevention_moves}\n")
-                f.write(f"  Loop prevention ratio: {self.loop_prevention_moves / max(1, self.total_moves):.3f}\n")
-            
-            f.write("\nFinal Results:\n")
-            if self.stats['steps']:
-                f.write(f"Number of Steps: {len(self.stats['steps'])}\n")
-                f.write(f"Cooperators: {self.stats['cooperators'][-1]}\n")
-                f.write(f"Conditionals: {self.stats['conditionals'][-1]}\n")
-                f.write(f"Defectors: {self.stats['defectors'][-1]}\n")
-                f.write(f"Total Resources: {self.stats['total_resources'][-1]:.2f}\n")
-                
-                f.write("\nMigration Statistics:\n")
-                for strategy in ['cooperator', 'conditional', 'defector']:
-                    f.write(f"  {strategy.capitalize()} - Deaths: {self.migration_deaths[strategy]}, "
-                           f"Successful: {self.successful_migrations[strategy]}\n")
+    def publish(self, step, done=False):
+        frame = Frame(self.model, step, self.history[:, :self.filled], done=done)
+        while True:
+            try:
+                self.frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self.frames.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
 
-        # Save all the plots (same as before but with enhanced data)
-        self._save_plots(results_dir)
-        
-        # Save performance metrics plot
-        if self.stats['performance_metrics']:
-            plt.figure(figsize=(10, 6))
-            metrics = self.stats['performance_metrics']
-            steps = [m['step'] for m in metrics]
-            runtimes = [m['runtime'] for m in metrics]
-            plt.plot(steps, runtimes, 'purple', label='Cumulative Runtime (s)')
-            plt.title('Performance Over Time')
-            plt.xlabel('Step')
-            plt.ylabel('Cumulative Runtime (seconds)')
-            plt.legend()
-            plt.grid(True)
-            perf_plot_path = os.path.join(results_dir, f"{self.results_prefix}_performance.png")
-            plt.savefig(perf_plot_path)
-            logger.info(f"Saving performance plot to: {perf_plot_path}")
-            plt.close()
+    def latest(self):
+        """Newest published frame, or None if none arrived since the last call"""
+        frame = None
+        while True:
+            try:
+                frame = self.frames.get_nowait()
+            except queue.Empty:
+                return frame
 
-    def _save_plots(self, results_dir):
-        """Save all visualization plots"""
-        # Agent population evolution
-        plt.figure(figsize=(10, 6))
-        plt.plot(self.stats['steps'], self.stats['cooperators'], 'g-', label='Cooperators (low harvest, share migration)')
-        plt.plot(self.stats['steps'], self.stats['conditionals'], 'b-', label='Conditionals (high harvest, share migration)')
-        plt.plot(self.stats['steps'], self.stats['defectors'], 'r-', label='Defectors (high harvest, no migration help)')
-        plt.title('Agent Population Evolution')
-        plt.xlabel('Step')
-        plt.ylabel('Number')
-        plt.legend()
-        plt.grid(True)
-        agent_plot_path = os.path.join(results_dir, f"{self.results_prefix}_agents.png")
-        plt.savefig(agent_plot_path)
-        logger.info(f"Saving agent population plot to: {agent_plot_path}")
-        plt.close()
 
-        # Resources evolution
-        plt.figure(figsize=(10, 6))
-        plt.plot(self.stats['steps'], self.stats['total_resources'], 'k-', label='Total Resources')
-        plt.title('Total Resources Evolution')
-        plt.xlabel('Step')
-        plt.ylabel('Resources')
-        plt.legend()
-        plt.grid(True)
-        resources_plot_path = os.path.join(results_dir, f"{self.results_prefix}_resources.png")
-        plt.savefig(resources_plot_path)
-        logger.info(f"Saving resources plot to: {resources_plot_path}")
-        plt.close()
+def animate_simulation(model, steps=1000, steps_per_frame=1, interval=100, show_energy=False, threaded=False,
+                       max_agent_markers=2000, max_energy_labels=300):
+    """Enhanced animation with better performance but original visual style.
 
-        # Final populations bar chart
-        plt.figure(figsize=(8, 6))
-        categories = ['Cooperators', 'Conditionals', 'Defectors']
-        values = [
-            self.stats['cooperators'][-1],
-            self.stats['conditionals'][-1], 
-            self.stats['defectors'][-1]
-        ]
-        colors = ['green', 'blue', 'red']
-        bars = plt.bar(categories, values, color=colors)
-        plt.title(f'Final Agent Populations (Step {len(self.stats["steps"])})')
-        plt.ylabel('Number of Agents')
-        for bar in bars:
-            yval = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2, yval + 0.5, int(yval), ha='center', va='bottom')
-        plt.grid(True, axis='y', linestyle='--', alpha=0.7)
-        summary_plot_path = os.path.join(results_dir, f"{self.results_prefix}_summary.png")
-        plt.savefig(summary_plot_path)
-        logger.info(f"Saving summary bar chart to: {summary_plot_path}")
-        plt.close()
+    With ``threaded`` the model runs in a FrameFeed thread and the window shows the
+    newest frame at every refresh, so slow steps no longer freeze the window and the
+    run is not throttled by ``interval``. Frames are blitted: only the animated
+    artists are redrawn over cached axes backgrounds. Up to ``max_agent_markers``
+    agents are drawn as markers; larger populations are painted into the resource
+    image, one cell per agent. Energy labels are shown for at most
+    ``max_energy_labels`` agents inside the current view.
+    """
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+    from matplotlib.cm import ScalarMappable
+    from matplotlib.collections import PathCollection
+    from matplotlib.colors import Normalize, to_rgba_array
+    from matplotlib.font_manager import FontProperties
+    from matplotlib.textpath import TextPath
+    from matplotlib.transforms import Affine2D
 
-        # Migration statistics
-        plt.figure(figsize=(12, 6))
-        categories = ['Coop Deaths', 'Cond Deaths', 'Def Deaths', 'Coop Success', 'Cond Success', 'Def Success']
-        values = [
-            self.migration_deaths['cooperator'],
-            self.migration_deaths['conditional'],
-            self.migration_deaths['defector'],
-            self.successful_migrations['cooperator'],
-            self.successful_migrations['conditional'],
-            self.successful_migrations['defector']
-        ]
-        colors = ['darkgreen', 'darkblue', 'darkred', 'green', 'blue', 'red']
-        bars = plt.bar(categories, values, color=colors)
-        plt.title('Migration Deaths and Successful Migrations by Agent Type')
-        plt.ylabel('Number')
-        plt.xticks(rotation=45)
-        for bar in bars:
-            yval = bar.get_height()
-            plt.text(bar.get_x() + bar.get_width()/2, yval + 0.5, int(yval), ha='center', va='bottom')
-        plt.grid(True, axis='y', linestyle='--', alpha=0.7)
-        plt.tight_layout()
-        migration_plot_path = os.path.join(results_dir, f"{self.results_prefix}_migrations.png")
-        plt.savefig(migration_plot_path)
-        logger.info(f"Saving migration statistics plot to: {migration_plot_path}")
-        plt.close()
+    label_font = FontProperties(size=7, weight='bold')
+
+    @lru_cache(maxsize=None)
+    def label_path(energy):
+        """Outline of one energy label in points, centred above its anchor"""
+        path = TextPath((0, 0), str(energy), prop=label_font)
+        (x0, _), (x1, _) = path.get_extents().get_points()
+        return path.transformed(Affine2D().translate(-(x0 + x1) / 2, 0))
+
+    class EnergyLabels(PathCollection):
+        """Energy labels of many agents as one collection of cached glyph outlines"""
+
+        def __init__(self, ax, max_labels):
+            super().__init__([], offsets=np.empty((0, 2)), offset_transform=ax.transData,
+                             facecolors='black', linewidths=0)
+            self.set_transform(Affine2D().scale(ax.figure.dpi / 72))
+            ax.add_collection(self, autolim=False)
+            self.max_labels = max_labels
+            self.set_data(np.empty(0), np.empty(0), np.empty(0))
+
+        def set_data(self, x, y, energy):
+            self.x, self.y, self.energy = x, y, energy
+            self.stale = True
+
+        def draw(self, renderer):
+            # labels follow the view: only agents inside it, evenly sampled down to max_labels
+            (x0, x1), (y0, y1) = sorted(self.axes.get_xlim()), sorted(self.axes.get_ylim())
+            shown = np.flatnonzero((self.x >= x0) & (self.x <= x1) & (self.y >= y0) & (self.y <= y1))
+            if len(shown) > self.max_labels:
+                shown = shown[np.linspace(0, len(shown) - 1, self.max_labels).astype(np.int64)]
+            self.set_paths([label_path(energy) for energy in self.energy[shown].astype(np.int64).tolist()])
+            self.set_offsets(np.column_stack((self.x[shown], self.y[shown])))
+            super().draw(renderer)
 
-# ---------------- Enhanced Animation ----------------
-def animate_simulation(model, steps=1000, steps_per_frame=1, interval=100, show_energy=False):
-    """Enhanced animation with better performance but original visual style"""
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 7))
 
-    # Initialize visualization
-    grid_display = np.zeros((model.width, model.height))
-    im = ax1.imshow(grid_display.T, origin='lower', cmap='YlGn', vmin=0, vmax=model.carrying_capacity)
-    scatter = ax1.scatter([], [], s=25)
+    # Initialize visualization: the resources are colour-mapped into an RGBA (y, x) image overwritten in place
+    resource_colors = ScalarMappable(norm=Normalize(vmin=0, vmax=model.carrying_capacity), cmap='YlGn')
+    im = ax1.imshow(np.zeros((model.height, model.width, 4), dtype=np.uint8), origin='lower',
+                    interpolation='nearest')
+    grid_display = im.get_array()
+    strategy_rgba = to_rgba_array(STRATEGY_COLORS)
+    strategy_bytes = (strategy_rgba * 255).astype(np.uint8)
+    scatter = ax1.scatter([], [], s=30)
     ax1.set_xlim(-0.5, model.width - 0.5)
     ax1.set_ylim(-0.5, model.height - 0.5)
-    ax1.set_title("Step 0")
-    fig.colorbar(im, ax=ax1, fraction=0.046, pad=0.04)
+    ax1.set_title("Enhanced Simulation")
+    fig.colorbar(resource_colors, ax=ax1, fraction=0.046, pad=0.04)
 
     # Population chart
     ax2.set_title('Agent Population Evolution (Enhanced)')
@@ -664,96 +3661,100 @@ def animate_simulation(model, steps=1000, steps_per_frame=1, interval=100, show_
     ax2.set_xlim(0, steps)
     ax2.set_ylim(0, model.initial_agents * 3)
 
-    colors_map = {"cooperator": "green", "conditional": "blue", "defector": "red"}
-
     # Energy display
-    energy_texts = []
+    energy_labels = EnergyLabels(ax1, max_energy_labels)
+    energy_labels.set_visible(show_energy)
     performance_text = ax1.text(0.02, 0.98, '', transform=ax1.transAxes, 
                                verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
+    artists = [im, scatter, energy_labels, line_coop, line_cond, line_def, performance_text]
 
-    def update(frame):
-        nonlocal energy_texts
-
-        frame_start = time.time()
+    def finish():
+        ani.event_source.stop()
+        model.save_results()
+        logger.info(f"Simulation finished. Results saved with prefix: {model.results_prefix}")
 
-        # Run simulation steps
+    def next_frame(frame):
+        """Run the steps of one frame in the event loop; None once the run is over"""
         for i in range(steps_per_frame):
             current_step = frame * steps_per_frame + i
-            if current_step >= steps:
-                ani.event_source.stop()
-                model.save_results()
-                logger.info(f"Simulation finished. Results saved with prefix: {model.results_prefix}")
-                return
+            if current_step >= steps or model.stop_reason is not None:
+                finish()
+                return None
 
             model.step()
             model.collect_stats(current_step)
+        history = np.vstack([model.stats[name] for name in ('steps', 'cooperators', 'conditionals', 'defectors')])
+        return Frame(model, frame * steps_per_frame, history)
+
+    def next_feed_frame(frame):
+        """Newest frame of the simulation thread; None while there is nothing new"""
+        snapshot = feed.latest()
+        if snapshot is not None and snapshot.done:
+            feed.stop()
+            if feed.error:
+                logger.error(f"Simulation thread failed:\n{feed.error}")
+            finish()
+            if feed.dropped:
+                logger.info(f"{feed.dropped} frames were skipped to keep up with the simulation")
+        return snapshot
+
+    def init():
+        return artists
+
+    def update(frame):
+        frame_start = time.time()
+        snapshot = next_feed_frame(frame) if threaded else next_frame(frame)
+        if snapshot is None:
+            return artists
 
         # Update resource grid visualization
-        grid_display[:] = model.resource_grid
-        im.set_data(grid_display.T)
-
-        # Update agent positions
-        alive_agents = model.get_alive_agents()
-        if alive_agents:
-            xs = [a['position'][0] for a in alive_agents]
-            ys = [a['position'][1] for a in alive_agents]
-            cs = [colors_map[a['strategy']] for a in alive_agents]
-            scatter.set_offsets(np.c_[xs, ys])
-            scatter.set_color(cs)
-            scatter.set_sizes([30] * len(alive_agents))  
-        else:
-            scatter.set_offsets([])
+        grid_display[...] = resource_colors.to_rgba(snapshot.resource.T, bytes=True)
 
-        # === Energy display: 
-        if show_energy:
-            while len(energy_texts) < len(model.agents):
-                t = ax1.text(0, 0, "", color="black",
-                             ha="center", va="bottom",
-                             fontsize=7, fontweight="bold",
-                             visible=False)
-                energy_texts.append(t)
-
-            for i, agent in enumerate(model.agents):
-                if agent['alive']:
-                    x, y = agent['position']
-                    energy_texts[i].set_position((x, y + 1))
-                    energy_texts[i].set_text(f"{int(agent['energy'])}")
-                    energy_texts[i].set_visible(True)
-                else:
-                    energy_texts[i].set_visible(False)
+        # Update agent positions: markers, or image cells for large populations
+        if len(snapshot.x) > max_agent_markers:
+            grid_display[snapshot.y, snapshot.x] = strategy_bytes[snapshot.strategy]
+            scatter.set_offsets(np.empty((0, 2)))
         else:
-            for t in energy_texts:
-                t.set_visible(False)
+            scatter.set_offsets(np.column_stack((snapshot.x, snapshot.y)))
+            scatter.set_facecolor(strategy_rgba[snapshot.strategy])
+        im.changed()
+        if show_energy:
+            energy_labels.set_data(snapshot.x, snapshot.y + 1, snapshot.energy)
 
         # Update population lines
-        if model.stats.get('steps'):
-            line_coop.set_data(model.stats['steps'], model.stats['cooperators'])
-            line_cond.set_data(model.stats['steps'], model.stats['conditionals'])
-            line_def.set_data(model.stats['steps'], model.stats['defectors'])
+        history = snapshot.history
+        if history.shape[1]:
+            line_coop.set_data(history[0], history[1])
+            line_cond.set_data(history[0], history[2])
+            line_def.set_data(history[0], history[3])
 
         # Performance info
-        current_step = frame * steps_per_frame
-        total_agents = len(alive_agents)
         frame_time = time.time() - frame_start
+        performance_text.set_text(f"Step: {snapshot.step}\n"
+                                  f"Agents: {len(snapshot.x)}\n"
+                                  f"Frame time: {frame_time:.3f}s\n"
+                                  f"Loop prevention: {snapshot.loop_moves}/{snapshot.total_moves}")
 
-        perf_info = (f"Step: {current_step}\n"
-                     f"Agents: {total_agents}\n"
-                     f"Frame time: {frame_time:.3f}s\n"
-                     f"Loop prevention: {model.loop_prevention_moves}/{model.total_moves}")
-
-        ax1.set_title(f"Enhanced Simulation - Step {current_step}")
-
-        return [scatter, im, line_coop, line_cond, line_def, performance_text] + energy_texts
+        return artists
 
 
     total_frames = max(1, steps // steps_per_frame)
     
-    ani = animation.FuncAnimation(fig, update, frames=total_frames + 1,
-                                  interval=interval, blit=False, repeat=False)
+    if threaded:
+        # frames arrive as the simulation produces them: refresh until the feed reports the end
+        feed = FrameFeed(model, steps, steps_per_frame).start()
+        ani = animation.FuncAnimation(fig, update, frames=itertools.count(), init_func=init, interval=interval,
+                                      blit=True, repeat=False, cache_frame_data=False)
+    else:
+        ani = animation.FuncAnimation(fig, update, frames=total_frames + 1, init_func=init,
+                                      interval=interval, blit=True, repeat=False)
 
     def on_close(event):
+        if threaded:
+            feed.stop()
         model.save_results()
-        logger.info("Window closed: results saved.")
+        path = model.save_checkpoint()
+        logger.info(f"Window closed: results saved, resume with: run --resume \"{path}\"")
     
     fig.canvas.mpl_connect('close_event', on_close)
     plt.tight_layout()
@@ -761,9 +3762,69 @@ def animate_simulation(model, steps=1000, steps_per_frame=1, interval=100, show_
     
     return ani
 
+IMAGE_FORMATS = ('.png', '.jpg', '.jpeg', '.svg', '.pdf')
+
+
+def render_replay(path, output=None, start=None, stop=None, every=1, fps=20):
+    """Render a recording (see TrajectoryRecorder) offline, from step ``start`` up to ``stop`` (exclusive).
+
+    Without ``output`` the frames are shown in a window. An image ``output``
+    (.png, .svg, ...) gets the first selected step; any other is written as an
+    animation, .gif through Pillow and video formats (.mp4, ...) through ffmpeg.
+    """
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+    from matplotlib.colors import to_rgba_array
+
+    trajectory = Trajectory(path)
+    steps = trajectory.steps
+    steps = steps[(steps >= (steps[0] if start is None else start)) & (steps < (np.inf if stop is None else stop))]
+    steps = steps[::max(1, every)]
+    if len(steps) == 0:
+        raise ValueError(f"No recorded steps in the requested range (recorded: {len(trajectory)} steps)")
+
+    fig, ax = plt.subplots(figsize=(8, 7))
+    capacity = trajectory.meta['params'].get('carrying_capacity', 10)
+    im = ax.imshow(np.zeros((trajectory.height, trajectory.width), dtype=np.float32), origin='lower',
+                   cmap='YlGn', vmin=0, vmax=capacity)
+    strategy_rgba = to_rgba_array(STRATEGY_COLORS)
+    scatter = ax.scatter([], [], s=30)
+    ax.set_xlim(-0.5, trajectory.width - 0.5)
+    ax.set_ylim(-0.5, trajectory.height - 0.5)
+    fig.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+
+    def draw(step):
+        im.set_data(trajectory.resource_grid(step).T)
+        agents = trajectory.agents(step)
+        scatter.set_offsets(np.column_stack((agents['x'], agents['y'])))
+        scatter.set_facecolor(strategy_rgba[agents['strategy']])
+        counts = np.bincount(agents['strategy'], minlength=len(STRATEGIES))
+        ax.set_title(f"Step {step} - " + ", ".join(f"{name}s: {n}" for name, n in zip(STRATEGIES, counts)))
+        return [im, scatter]
+
+    if output is not None and os.path.splitext(output)[1].lower() in IMAGE_FORMATS:
+        draw(steps[0])
+        fig.savefig(output)
+        plt.close(fig)
+        logger.info(f"Saving step {steps[0]} of {path} to: {output}")
+        return output
+
+    ani = animation.FuncAnimation(fig, draw, frames=steps.tolist(), interval=1000 / fps, blit=False, repeat=False)
+    if output is None:
+        plt.show()
+        return ani
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    ani.save(output, writer='pillow' if output.lower().endswith('.gif') else 'ffmpeg', fps=fps)
+    plt.close(fig)
+    logger.info(f"Saving replay of {len(steps)} steps of {path} to: {output}")
+    return output
+
 def run_simulation_with_params():
     """Enhanced parameter selection GUI"""
-    global root, entries, show_energy_labels, debug_mode_var
+    import tkinter as tk
+    from tkinter import messagebox
+
+    global root, entries, show_energy_labels, debug_mode_var, synchronous_var, threaded_var
     
     root = tk.Tk()
     root.title("Enhanced Agent-based Model Parameters")
@@ -771,6 +3832,8 @@ def run_simulation_with_params():
     
     show_energy_labels = tk.BooleanVar(value=True)
     debug_mode_var = tk.BooleanVar(value=True)
+    synchronous_var = tk.BooleanVar(value=False)
+    threaded_var = tk.BooleanVar(value=True)
 
     labels = [
         "width", "height", "initial_agents",
@@ -851,6 +3914,10 @@ def run_simulation_with_params():
                   variable=show_energy_labels).pack(anchor="w")
     tk.Checkbutton(options_frame, text="Debug mode (detailed logging)", 
                   variable=debug_mode_var).pack(anchor="w")
+    tk.Checkbutton(options_frame, text="Synchronous update (vectorized, for large populations)", 
+                  variable=synchronous_var).pack(anchor="w")
+    tk.Checkbutton(options_frame, text="Simulate in background thread (window shows the newest step)", 
+                  variable=threaded_var).pack(anchor="w")
 
     def start_simulation():
         try:
@@ -870,25 +3937,14 @@ def run_simulation_with_params():
                     continue
                 
                 # Model parameters
-                if key in ["width", "height", "initial_agents", "patch_width", "gap_size"]:
-                    model_params[key] = int(value)
-                elif key == "results_prefix":
-                    model_params[key] = value
-                elif key == "random_seed":
-                    # Handle seed separately
-                    model_params['random_seed'] = int(value) if value != "" else None
-                else:
-                    model_params[key] = float(value)
+                model_params[key] = coerce_param(key, value)
             
             # Add debug mode
             model_params['debug_mode'] = debug_mode_var.get()
+            model_params['update_mode'] = "synchronous" if synchronous_var.get() else "asynchronous"
             
             # Validation
-            if model_params['percent_cooperators'] + model_params['percent_conditionals'] > 100:
-                raise ValueError("Cooperators + Conditionals cannot exceed 100%")
-            
-            if model_params['width'] <= 0 or model_params['height'] <= 0:
-                raise ValueError("Width and height must be positive")
+            validate_model_params(model_params)
             
             if animation_params['steps'] <= 0:
                 raise ValueError("Steps must be positive")
@@ -908,7 +3964,8 @@ def run_simulation_with_params():
                 steps=animation_params['steps'],
                 steps_per_frame=animation_params['steps_per_frame'],
                 interval=50,  # Faster animation
-                show_energy=show_energy_labels.get()
+                show_energy=show_energy_labels.get(),
+                threaded=threaded_var.get()
             )
             
         except Exception as e:
@@ -938,6 +3995,261 @@ def run_simulation_with_params():
 
     root.mainloop()
 
+# ---------------- Command line ----------------
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description="Group dispersal agent-based model: parameter GUI (default) or headless runs")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("gui", help="open the parameter window and animate the run (default)")
+
+    run = commands.add_parser("run", help="run headless and save the results")
+    run.add_argument("--steps", type=int, default=1000, help="number of steps (default: 1000)")
+    run.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                     help="model parameter override, e.g. group_dispersal_range=10 (repeatable)")
+    run.add_argument("--seed", type=int, default=None, help="random seed")
+    run.add_argument("--update-mode", choices=("asynchronous", "synchronous"), default=None)
+    run.add_argument("--results-prefix", default=None, help="output file prefix")
+    run.add_argument("--results-dir", default=None, help="output directory (default: ./results next to this file)")
+    run.add_argument("--no-plots", action="store_true", help="write the text summary only")
+    run.add_argument("--debug", action="store_true", help="detailed per-step logging")
+    run.add_argument("--profile", action="store_true",
+                     help="time every step phase and write <prefix>_profile.csv with the results")
+    run.add_argument("--stop", default=None, metavar="RULES",
+                     help="comma-separated stop rules: fixation, extinction, stationary (default: none)")
+    run.add_argument("--checkpoint-every", type=int, default=None, metavar="N",
+                     help="write a checkpoint every N steps")
+    run.add_argument("--checkpoint", default=None, metavar="PATH",
+                     help="checkpoint file (default: results/<prefix>_checkpoint.npz)")
+    run.add_argument("--stats-file", default=None, metavar="PATH",
+                     help="stream per-step statistics to this CSV while running (bounded memory)")
+    run.add_argument("--stats-every", type=int, default=None, metavar="K",
+                     help="record statistics every K steps only")
+    run.add_argument("--resume", default=None, metavar="PATH",
+                     help="continue a run from a checkpoint up to --steps total steps")
+    run.add_argument("--world-cache", default=None, metavar="DIR",
+                     help="keep built world layouts in DIR and reuse them memory-mapped")
+    run.add_argument("--tiles", type=int, default=1, metavar="N",
+                     help="split the world into N strips stepped by N processes (synchronous update only)")
+    run.add_argument("--record", default=None, metavar="DIR",
+                     help="record agents and resources of every step to DIR for the replay command")
+    run.add_argument("--record-every", type=int, default=None, metavar="K", help="record every K-th step only")
+    run.add_argument("--events", default=None, metavar="DIR",
+                     help="log births, deaths and migrations to DIR for lineage analyses (see EventLog)")
+
+    replay = commands.add_parser("replay", help="render a recorded run (see run --record) offline")
+    replay.add_argument("recording", help="folder written by run --record")
+    replay.add_argument("--step", type=int, default=None, help="render this step only")
+    replay.add_argument("--start", type=int, default=None, help="first step to render (default: first recorded)")
+    replay.add_argument("--stop", type=int, default=None, help="render steps before this one (default: all)")
+    replay.add_argument("--every", type=int, default=1, help="render every K-th recorded step")
+    replay.add_argument("--fps", type=float, default=20, help="frames per second (default: 20)")
+    replay.add_argument("--output", default=None, metavar="FILE",
+                        help="image (.png, .svg, ...) for one step, or .gif / .mp4 animation (default: show a window)")
+
+    sweep = commands.add_parser("sweep", help="BehaviorSpace-style parameter sweep over all cores")
+    sweep.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2,...",
+                       help="swept parameter and its values, e.g. group_dispersal_range=0,30,50 (repeatable)")
+    sweep.add_argument("--replicates", type=int, default=1, help="runs per grid point (default: 1)")
+    sweep.add_argument("--steps", type=int, default=18000, help="steps per run (default: 18000)")
+    sweep.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                       help="fixed model parameter override (repeatable)")
+    sweep.add_argument("--seed", type=int, default=None, help="root seed; every run gets its own child stream")
+    sweep.add_argument("--update-mode", choices=("asynchronous", "synchronous"), default=None)
+    sweep.add_argument("--stop", default=None, metavar="RULES",
+                       help="comma-separated stop rules ending a run early; [steps] records where it stopped")
+    sweep.add_argument("--world-cache", default=None, metavar="DIR",
+                       help="share world layouts between workers through memory-mapped files in DIR")
+    sweep.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    sweep.add_argument("--ensemble", type=int, default=1, metavar="K",
+                       help="run K replicates of a grid point together in one process (synchronous update only)")
+    sweep.add_argument("--chunksize", type=int, default=1, help="runs per task sent to a worker")
+    sweep.add_argument("--events", default=None, metavar="DIR",
+                       help="log births, deaths and migrations of every run to DIR/run_<run number>")
+    sweep.add_argument("--output", default=os.path.join("results", "sweep_experiments.csv"),
+                       help="CSV file to write (default: results/sweep_experiments.csv)")
+
+    bench = commands.add_parser("bench", help="benchmark setup and stepping over scaling curves")
+    bench.add_argument("--suite", action="append", choices=tuple(BENCH_SUITES), default=[],
+                       help="scaling curve to run (repeatable; default: all)")
+    bench.add_argument("--steps", type=int, default=200, help="steps per case (default: 200)")
+    bench.add_argument("--repeats", type=int, default=3, help="timed runs per case, best one kept (default: 3)")
+    bench.add_argument("--update-mode", choices=("asynchronous", "synchronous"), default=None,
+                       help="benchmark one update mode only (default: both)")
+    bench.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory pass")
+    bench.add_argument("--output", default=os.path.join("results", "benchmark.json"),
+                       help="JSON file to write (default: results/benchmark.json)")
+    bench.add_argument("--compare", default=None, metavar="BASELINE",
+                       help="baseline JSON to compare with; exits with status 1 on regressions")
+    bench.add_argument("--threshold", type=float, default=0.15,
+                       help="allowed relative slowdown / growth before a metric is flagged (default: 0.15)")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+
+    if args.command in (None, "gui"):
+        logger.info("Starting Enhanced Agent-Based Model")
+        run_simulation_with_params()
+        return 0
+
+    if args.command == "sweep":
+        return sweep_main(args)
+
+    if args.command == "bench":
+        return bench_main(args)
+
+    if args.command == "replay":
+        return replay_main(args)
+
+    try:
+        params = parse_param_overrides(args.param)
+        if args.seed is not None:
+            params['random_seed'] = args.seed
+        if args.update_mode is not None:
+            params['update_mode'] = args.update_mode
+        if args.results_prefix is not None:
+            params['results_prefix'] = args.results_prefix
+        if args.checkpoint_every is not None:
+            params['checkpoint_every'] = args.checkpoint_every
+        if args.checkpoint is not None:
+            params['checkpoint_path'] = args.checkpoint
+        if args.stats_file is not None:
+            params['stats_path'] = args.stats_file
+        if args.stats_every is not None:
+            params['stats_every'] = args.stats_every
+        if args.profile:
+            params['profile'] = True
+        if args.stop is not None:
+            params['stop_rules'] = args.stop
+        if args.world_cache is not None:
+            params['world_cache'] = args.world_cache
+        if args.record is not None:
+            params['record_path'] = args.record
+        if args.record_every is not None:
+            params['record_every'] = args.record_every
+        if args.events is not None:
+            params['events_path'] = args.events
+        params.setdefault('debug_mode', args.debug)
+        validate_model_params(params)
+        if args.steps <= 0:
+            raise ValueError("Steps must be positive")
+        if args.tiles > 1:
+            if params.get('update_mode', 'asynchronous') != 'synchronous':
+                raise ValueError("--tiles needs --update-mode synchronous")
+            unsupported = set(params) - set(TiledModel.PARAMS) - {'update_mode', 'stop_rules', 'random_seed',
+                                                                   'debug_mode'}
+            rules = {rule.strip() for rule in params.get('stop_rules', "").split(",") if rule.strip()}
+            unsupported |= rules - set(TiledModel.STOP_RULES)
+            if unsupported or args.resume:
+                raise ValueError(f"--tiles does not support {sorted(unsupported) or ['--resume']}")
+    except ValueError as e:
+        logger.error(f"Parameter error: {e}")
+        return 2
+
+    if not args.no_plots:
+        import matplotlib
+        matplotlib.use("Agg")
+
+    if args.tiles > 1:
+        start = time.time()
+        with TiledModel(tiles=args.tiles, **params) as model:
+            model.run(args.steps)
+            model.save_results(results_dir=args.results_dir, plots=not args.no_plots)
+        logger.info(f"Finished {model.stats.steps_seen} steps on {args.tiles} tiles in {time.time() - start:.2f}s, "
+                    f"{model.stats.last('agents_alive')} agents alive")
+        return 0
+
+    if args.resume:
+        model = AgentModel.load_checkpoint(args.resume, **params)
+    else:
+        model = AgentModel(**params)
+    start = time.time()
+    run_headless(model, args.steps, results_dir=args.results_dir, plots=not args.no_plots)
+    logger.info(f"Finished {args.steps} steps in {time.time() - start:.2f}s, "
+                f"{len(model.get_alive_rows())} agents alive")
+    return 0
+
+
+def sweep_main(args):
+    try:
+        grid = parse_grid_spec(args.grid)
+        if not grid:
+            raise ValueError("Give at least one --grid NAME=V1,V2,...")
+        base = parse_param_overrides(args.param)
+        if args.update_mode is not None:
+            base['update_mode'] = args.update_mode
+        if args.stop is not None:
+            base['stop_rules'] = args.stop
+        if args.world_cache is not None:
+            base['world_cache'] = args.world_cache
+        for point in expand_param_grid(grid):
+            validate_model_params({**base, **point})
+        if args.steps <= 0 or args.replicates <= 0:
+            raise ValueError("Steps and replicates must be positive")
+        if args.ensemble > 1:
+            if base.get('update_mode', 'asynchronous') != 'synchronous':
+                raise ValueError("--ensemble needs --update-mode synchronous")
+            unsupported = set(base) - set(EnsembleModel.PARAMS) - {'update_mode', 'stop_rules'}
+            unsupported |= set(grid) - set(EnsembleModel.PARAMS)
+            if unsupported:
+                raise ValueError(f"--ensemble does not support {sorted(unsupported)}")
+            rules = {rule.strip() for rule in base.get('stop_rules', "").split(",") if rule.strip()}
+            if rules - set(EnsembleModel.STOP_RULES):
+                raise ValueError(f"--ensemble supports the stop rules {EnsembleModel.STOP_RULES} only")
+            if args.events is not None:
+                raise ValueError("--ensemble does not support --events")
+    except ValueError as e:
+        logger.error(f"Parameter error: {e}")
+        return 2
+
+    run_sweep(grid, replicates=args.replicates, steps=args.steps, base_params=base, output=args.output,
+              workers=args.workers, chunksize=args.chunksize, root_seed=args.seed, ensemble=args.ensemble,
+              events_dir=args.events)
+    return 0
+
+
+def bench_main(args):
+    if args.steps <= 0 or args.repeats <= 0:
+        logger.error("Parameter error: Steps and repeats must be positive")
+        return 2
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    modes = (args.update_mode,) if args.update_mode else ("asynchronous", "synchronous")
+    report = run_benchmarks(args.suite or None, steps=args.steps, repeats=args.repeats,
+                            update_modes=modes, memory=not args.no_memory)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Saving benchmark results to: {args.output}")
+
+    if baseline is None:
+        return 0
+    regressions = compare_benchmarks(report, baseline, threshold=args.threshold)
+    for name, metric, old, new in regressions:
+        logger.warning(f"[BENCH] regression in {name}: {metric} {old:.4g} -> {new:.4g}")
+    if regressions:
+        return 1
+    logger.info(f"[BENCH] no regressions against {args.compare} (threshold {args.threshold:.0%})")
+    return 0
+
+
+def replay_main(args):
+    start, stop = (args.step, args.step + 1) if args.step is not None else (args.start, args.stop)
+    if args.output is not None:
+        import matplotlib
+        matplotlib.use("Agg")
+    try:
+        render_replay(args.recording, output=args.output, start=start, stop=stop, every=args.every, fps=args.fps)
+    except (OSError, ValueError) as e:
+        logger.error(f"Replay error: {e}")
+        return 2
+    return 0
+
+
 if __name__ == "__main__":
-    logger.info("Starting Enhanced Agent-Based Model")
-    run_simulation_with_params()
\ No newline at end of file
+    sys.exit(main())
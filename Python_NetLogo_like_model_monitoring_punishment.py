@@ -0,0 +1,503 @@
+"""
+Headless Python version of the NetLogo model
+'Evolution_of_sustainability_through_monitoring_and_punishment.nlogo' (second model).
+Features:
+- Torus world (61 x 61 patches) whose patches hold a logistically regrowing resource.
+- One agent per patch at most. Four types, from two inherited traits:
+    harvest preference  -> 'low' (Harvest-sustainable) or 'high' (Harvest-greedy)
+    punisher?           -> monitors its Moore neighbourhood and punishes greedy neighbours it perceives
+- Each tick, as the NetLogo 'go' procedure: harvest-commons (with move-away when the commons
+  run dry), sense-cheaters, punish ('suspend harvest once', 'pay fine' or 'kill'), then
+  energy, reproduce (with mutate), death, and regrow.
+- Runs on the array-backed agent store of the group dispersal model; the sequential
+  NetLogo 'ask' loops are executed as rounds of agents that cannot interact
+  (see turn_rounds), so every phase is vectorized and follows the NetLogo order exactly.
+- BehaviorSpace-style experiments over all cores, written in the layout of
+  'second model experiments....csv':
+    python Python_NetLogo_like_model_monitoring_punishment.py experiments --replicates 8 --steps 2000
+"""
+
+import numpy as np
+import os
+import sys
+import time
+import argparse
+import csv
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Python_NetLogo_like_model_group_dispersal_Matplotlib_Animation import (
+    AgentStore, StatsSink, EMPTY, NO_PATCH, disk_offsets, pick_random_true, spawn_seeds, logger)
+
+# ---------------- Constants ----------------
+# Agent types, in the order and with the labels of the BehaviorSpace export
+TYPES = (" sustainable, punishing", "sustainable, non-punishing", "greedy, non-punishing", "greedy, punishing")
+PUNISHMENTS = ("kill", "suspend harvest once", "pay fine")
+NETLOGO_NAMES = {
+    # parameter -> NetLogo slider / chooser name
+    'width': 'world-width', 'height': 'world-height', 'number_agents': 'Number-Agents',
+    'percent_sustainables': 'Percent-Sustainables', 'percent_punishers': 'Percent-Punishers',
+    'mutation_rate': 'Mutation-rate', 'living_costs': 'Living-costs', 'death_rate': 'Death-rate',
+    'carrying_capacity': 'Carrying-capacity', 'growth_rate': 'Growth-rate',
+    'harvest_sustainable': 'Harvest-sustainable', 'harvest_greedy': 'Harvest-greedy',
+    'perception_accuracy': 'Perception-accuracy', 'costs_perception': 'Costs-perception',
+    'costs_punishment': 'Costs-punishment', 'punishment': 'Punishment', 'fine': 'Fine',
+}
+# Harvest-greedy x Perception-accuracy pairs of 'second model experiments....csv'
+DEFAULT_EXPERIMENTS = [{'harvest_greedy': g, 'perception_accuracy': a}
+                       for g, a in ((15, 99), (14, 90), (13, 70), (12, 60), (11, 50), (10, 40), (9, 30))]
+
+
+def type_codes(greedy, punisher):
+    """Type code (index into TYPES) from the two traits"""
+    return np.where(greedy, 2 + punisher, 1 - punisher).astype(np.int8)
+
+
+def moore_cells(x, y, width, height, include_self=False):
+    """(x, y) of the Moore neighbours of every position on the torus, one row of 8 (or 9) per position"""
+    dx, dy = disk_offsets(1.5)
+    if include_self:
+        dx, dy = np.append(dx, 0), np.append(dy, 0)
+    return (np.asarray(x)[:, None] + dx) % width, (np.asarray(y)[:, None] + dy) % height
+
+
+def turn_rounds(x, y, order, reach, width, height):
+    """Split a NetLogo ``ask`` (agents acting one at a time, in ``order``) into rounds of agents
+    that can act at once.
+
+    An agent joins a round once every agent within Chebyshev distance ``reach`` (on
+    the torus) that comes earlier in the order has acted. Agents of one round are
+    then more than ``reach`` apart, so when a turn only touches cells that close to
+    the agent, running the rounds one after the other gives exactly the result of
+    the sequential ask. Positions are those at the start of the ask (an agent that
+    has acted may move, but no longer matters to the ones still waiting).
+    Yields arrays of indices into x / y.
+    """
+    n = len(order)
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+    grid = np.full((width, height), n, dtype=np.int64)  # rank of the agent still waiting on each cell
+    grid[x, y] = rank
+    wrap_x = np.arange(-reach, width + reach) % width  # torus padding by ``reach`` cells
+    wrap_y = np.arange(-reach, height + reach) % height
+    waiting = np.ones(n, dtype=bool)
+    while waiting.any():
+        padded = grid[wrap_x][:, wrap_y]
+        low = padded[:width]
+        for d in range(1, 2 * reach + 1):
+            low = np.minimum(low, padded[d:d + width])
+        padded = low
+        low = padded[:, :height]
+        for d in range(1, 2 * reach + 1):
+            low = np.minimum(low, padded[:, d:d + height])
+        ready = np.flatnonzero(waiting & (low[x, y] == rank))
+        waiting[ready] = False
+        grid[x[ready], y[ready]] = n
+        yield ready
+
+
+# ---------------- Model ----------------
+class CommonsAgentStore(AgentStore):
+    """AgentStore for the second model: ``strategy`` holds the type code (index into TYPES)
+    and two extra columns hold the harvest of the current tick and the punished? flag"""
+    N_STRATEGIES = len(TYPES)
+    COLUMNS = AgentStore.COLUMNS + ('harvest', 'punished')
+
+    def _grow(self, capacity):
+        extra = {'harvest': np.zeros(capacity, dtype=np.float64), 'punished': np.zeros(capacity, dtype=bool)}
+        for name, column in extra.items():
+            if getattr(self, name, None) is not None:
+                column[:self.size] = getattr(self, name)[:self.size]
+        super()._grow(capacity)
+        for name, column in extra.items():
+            setattr(self, name, column)
+
+    def add_many(self, xs, ys, energy, strategies, patch=NO_PATCH, parent=-1, ids=None):
+        rows = super().add_many(xs, ys, energy, strategies, patch=patch, parent=parent, ids=ids)
+        self.harvest[rows] = 0.0
+        self.punished[rows] = False
+        return rows
+
+    def greedy(self, rows):
+        return self.strategy[rows] >= 2
+
+    def punisher(self, rows):
+        return np.isin(self.strategy[rows], (0, 3))
+
+
+class CommonsModel:
+    """The monitoring & punishment model, one tick per ``step`` (the NetLogo 'go' procedure).
+
+    The world is a dense ``resource`` grid and an ``occupancy`` grid of agent rows
+    (EMPTY where no agent stands), on a torus as in the NetLogo world settings.
+    Parameters and defaults are the sliders of the .nlogo file.
+    """
+
+    def __init__(self, width=61, height=61, number_agents=250, percent_sustainables=99,
+                 percent_punishers=20, mutation_rate=1.0, living_costs=4, death_rate=1.0,
+                 carrying_capacity=100, growth_rate=0.3, harvest_sustainable=7, harvest_greedy=15,
+                 perception_accuracy=99, costs_perception=0.5, costs_punishment=0.8,
+                 punishment="suspend harvest once", fine=1, random_seed=None, debug_mode=False):
+        if punishment not in PUNISHMENTS:
+            raise ValueError(f"punishment must be one of {PUNISHMENTS}, not {punishment!r}")
+        if number_agents > width * height:
+            raise ValueError(f"{number_agents} agents do not fit on {width * height} patches")
+        self.width = width
+        self.height = height
+        self.number_agents = number_agents
+        self.percent_sustainables = percent_sustainables
+        self.percent_punishers = percent_punishers
+        self.mutation_rate = mutation_rate
+        self.living_costs = living_costs
+        self.death_rate = death_rate
+        self.carrying_capacity = carrying_capacity
+        self.growth_rate = growth_rate
+        self.harvest_sustainable = harvest_sustainable
+        self.harvest_greedy = harvest_greedy
+        self.perception_accuracy = perception_accuracy
+        self.costs_perception = costs_perception
+        self.costs_punishment = costs_punishment
+        self.punishment = punishment
+        self.fine = fine
+        self.debug_mode = debug_mode
+        self.params_snapshot = {name: getattr(self, name) for name in NETLOGO_NAMES}
+        if debug_mode:
+            logger.info(f"[PARAMS] {self.params_snapshot}")
+
+        self.rng = np.random.default_rng(random_seed)
+        self.resource = np.full((width, height), float(carrying_capacity))
+        self.occupancy = np.full((width, height), EMPTY, dtype=np.int64)
+        self.agents = CommonsAgentStore(capacity=max(64, 2 * number_agents))
+        self.stats = StatsSink(columns=[('steps', np.int64)] + [(name, np.int64) for name in TYPES] +
+                               [('agents_alive', np.int64), ('total_resources', np.float64)])
+        self.setup()
+
+    def setup(self):
+        """NetLogo 'setup': one agent on each of number_agents random patches"""
+        cells = self.rng.choice(self.width * self.height, size=self.number_agents, replace=False)
+        xs, ys = np.divmod(cells, self.height)
+        greedy = self.rng.random(self.number_agents) * 100 >= self.percent_sustainables
+        punisher = self.rng.random(self.number_agents) * 100 < self.percent_punishers
+        rows = self.agents.add_many(xs, ys, self.living_costs + 1, type_codes(greedy, punisher))
+        self.occupancy[xs, ys] = rows
+
+    # ---------- Helpers ----------
+    def alive_rows(self):
+        return self.agents.alive_rows()
+
+    def neighbour_rows(self, rows):
+        """(n, 8) rows of the agents on the Moore neighbours of ``rows`` (EMPTY where none)"""
+        nx, ny = moore_cells(self.agents.x[rows], self.agents.y[rows], self.width, self.height)
+        return self.occupancy[nx, ny]
+
+    def rounds(self, rows, reach):
+        """Rounds of ``rows`` in a fresh random 'ask' order (see turn_rounds)"""
+        store = self.agents
+        order = self.rng.permutation(len(rows))
+        for ready in turn_rounds(store.x[rows], store.y[rows], order, reach, self.width, self.height):
+            yield rows[ready]
+
+    def free_neighbour(self, rows, score=None):
+        """A free Moore neighbour of each of ``rows``: the one with the highest ``score``
+        (ties at random, as max-one-of) or a random one; returns x, y and a found mask"""
+        store = self.agents
+        nx, ny = moore_cells(store.x[rows], store.y[rows], self.width, self.height)
+        free = self.occupancy[nx, ny] == EMPTY
+        found = free.any(axis=1)
+        if score is not None:
+            value = np.where(free, score[nx, ny], -np.inf)
+            free &= value == value.max(axis=1, keepdims=True)
+        choice = pick_random_true(free | ~found[:, None], self.rng.random(len(rows)))
+        i = np.arange(len(rows))
+        return nx[i, choice], ny[i, choice], found
+
+    def kill(self, rows):
+        self.agents.kill_many(rows)
+        self.occupancy[self.agents.x[rows], self.agents.y[rows]] = EMPTY
+
+    # ---------- Step ----------
+    def step(self):
+        """One tick: harvesting, sense-cheaters, punish, energy / reproduce / death, regrow"""
+        store = self.agents
+        rows = self.alive_rows()
+        if len(rows) == 0:
+            return
+
+        # Harvesting: agents suspended by last tick's punishment harvest nothing this time
+        store.harvest[rows] = 0.0
+        if self.punishment == "suspend harvest once":
+            harvesting = rows[~store.punished[rows]]
+        else:
+            harvesting = rows
+        for batch in self.rounds(harvesting, reach=2):
+            self.harvest_commons(batch)
+        store.punished[rows] = False
+
+        self.sense_and_punish(rows)
+
+        # Energy, reproduction and death, agent by agent (children do not take a turn this tick)
+        for batch in self.rounds(self.alive_rows(), reach=2):
+            self.live(batch)
+
+        self.regrow()
+
+    def harvest_commons(self, rows):
+        """NetLogo 'harvest-commons' for agents whose commons (Moore neighbourhood and own patch) do not overlap"""
+        store = self.agents
+        want = np.where(store.greedy(rows), float(self.harvest_greedy), float(self.harvest_sustainable))
+        cx, cy = moore_cells(store.x[rows], store.y[rows], self.width, self.height, include_self=True)
+        res = self.resource[cx, cy]
+        total = res.sum(axis=1)
+
+        # Enough resource: take from the richest patches first until the wanted amount is reached
+        order = np.lexsort((self.rng.random(res.shape), -res))  # richest first, ties in random order
+        richest = np.take_along_axis(res, order, axis=1)
+        before = np.cumsum(richest, axis=1) - richest
+        take = np.clip(want[:, None] - before, 0.0, richest)
+        left = np.empty_like(res)
+        np.put_along_axis(left, order, richest - take, axis=1)
+
+        # Not enough: take everything and move away
+        short = total < want
+        left[short] = 0.0
+        self.resource[cx, cy] = left
+        store.harvest[rows] = np.where(short, total, want)
+
+        movers = rows[short]
+        if len(movers):
+            tx, ty, found = self.free_neighbour(movers, score=self.resource)
+            movers, tx, ty = movers[found], tx[found], ty[found]
+            self.occupancy[store.x[movers], store.y[movers]] = EMPTY
+            store.x[movers] = tx
+            store.y[movers] = ty
+            self.occupancy[tx, ty] = movers
+            store.energy[movers] -= 1
+
+    def sense_and_punish(self, rows):
+        """NetLogo 'sense-cheaters' and 'punish'"""
+        store = self.agents
+
+        # Every punisher pays for monitoring and perceives a share of its greedy neighbours
+        punishers = rows[store.punisher(rows)]
+        store.harvest[punishers] -= self.costs_perception
+        neighbours = self.neighbour_rows(punishers)
+        cheater = neighbours != EMPTY
+        cheater[cheater] = store.greedy(neighbours[cheater])
+        k = np.floor(self.perception_accuracy / 100 * cheater.sum(axis=1)).astype(np.int64)  # n-of rounds down
+        keys = np.where(cheater, self.rng.random(cheater.shape), 2.0)
+        aware = np.argsort(np.argsort(keys, axis=1), axis=1) < k[:, None]
+        pair_punisher = np.repeat(punishers, aware.sum(axis=1))
+        pair_cheater = neighbours[aware]
+
+        if self.punishment == "kill":
+            # a punished agent dies at once (and its punishers pay nothing): later cheaters
+            # can only be punished by punishers still alive, so this runs in turn order
+            cheaters = rows[store.greedy(rows)]
+            for batch in self.rounds(cheaters, reach=1):
+                hit = np.isin(pair_cheater, batch) & store.alive[pair_punisher]
+                self.kill(np.unique(pair_cheater[hit]))
+            return
+
+        n_punishers = np.bincount(pair_cheater, minlength=store.size)
+        cost = self.costs_punishment / n_punishers[pair_cheater]
+        store.harvest[:store.size] -= np.bincount(pair_punisher, weights=cost, minlength=store.size)
+        punished = np.flatnonzero(n_punishers)
+        if self.punishment == "suspend harvest once":
+            store.punished[punished] = True
+        else:
+            # pay fine: the fine goes to the agents around the punished one; as in the NetLogo
+            # code, each of them gets Fine / (number of agents around itself)
+            store.harvest[punished] -= self.fine
+            around = self.neighbour_rows(punished)
+            around = around[around != EMPTY]
+            crowd = (self.neighbour_rows(around) != EMPTY).sum(axis=1)
+            store.harvest[:store.size] += np.bincount(around, weights=self.fine / crowd, minlength=store.size)
+
+    def live(self, rows):
+        """Energy, expend-energy, reproduce (with mutate) and death for agents more than 2 patches apart"""
+        store = self.agents
+        store.energy[rows] += store.harvest[rows]
+        store.energy[rows] -= self.living_costs
+
+        parents = rows[self.rng.random(len(rows)) < 0.001 * store.energy[rows]]
+        cx, cy, found = self.free_neighbour(parents)
+        born = parents[found]
+        greedy = store.greedy(born) ^ (self.rng.random(len(born)) * 100 < self.mutation_rate)
+        punisher = store.punisher(born) ^ (self.rng.random(len(born)) * 100 < self.mutation_rate)
+        children = store.add_many(cx[found], cy[found], store.energy[born] / 2, type_codes(greedy, punisher),
+                                  parent=store.id[born])
+        self.occupancy[cx[found], cy[found]] = children
+        store.energy[parents] /= 2
+
+        dead = (store.energy[rows] <= 0) | (self.rng.random(len(rows)) * 100 < self.death_rate)
+        self.kill(rows[dead])
+
+    def regrow(self):
+        """NetLogo 'regrow' on every patch"""
+        r = self.resource
+        grown = np.ceil(r + self.growth_rate * r * (1 - r / self.carrying_capacity))
+        self.resource = np.where(r > 0, grown, 0.1)
+
+    # ---------- Runs ----------
+    def collect_stats(self, step):
+        counts = self.agents.strategy_counts()
+        row = {'steps': step, 'agents_alive': self.agents.n_alive, 'total_resources': self.resource.sum()}
+        row.update(zip(TYPES, counts))
+        self.stats.append(row)
+
+    def run(self, steps):
+        """Up to ``steps`` ticks; stops early when no agent is left, as NetLogo 'go'"""
+        for step in range(self.stats.steps_seen, steps):
+            if self.agents.n_alive == 0:
+                break
+            self.step()
+            self.collect_stats(step)
+        return self
+
+    def type_frequencies(self):
+        """Final and mean (over the ticks run) frequency of every type, in % of the agents alive"""
+        counts = np.stack([self.stats[name] for name in TYPES], axis=1).astype(np.float64)
+        alive = counts.sum(axis=1)
+        share = 100 * counts[alive > 0] / alive[alive > 0, None]
+        if len(share) == 0:
+            return np.zeros(len(TYPES)), np.zeros(len(TYPES))
+        final = share[-1] if alive[-1] > 0 else np.zeros(len(TYPES))
+        return final, share.mean(axis=0)
+
+
+# ---------------- Experiments (BehaviorSpace-style) ----------------
+def run_experiment_job(job):
+    """Run one replicate and return its result rows (one per type)"""
+    experiment, run_number, params, steps, seed = job
+    model = CommonsModel(**params, random_seed=seed).run(steps)
+    final, mean = model.type_frequencies()
+    return [(experiment, run_number, TYPES[t], final[t], mean[t]) for t in range(len(TYPES))]
+
+
+def run_experiments(experiments, replicates=8, steps=2000, base_params=None, output=None,
+                    workers=None, root_seed=None):
+    """Run every experiment (a dict of parameter values) ``replicates`` times over a process pool.
+
+    Writes the layout of 'second model experiments....csv': experiment, run number
+    (counted per experiment), the parameters the experiments set, type, final and
+    mean frequency of the type in %. Returns the rows as a list of tuples.
+    Frequencies are formatted as in the NetLogo export (10 significant digits).
+    """
+    base_params = dict(base_params or {})
+    names = list(dict.fromkeys(name for experiment in experiments for name in experiment))
+    seeds = spawn_seeds(root_seed, len(experiments) * replicates)
+    jobs = [(e + 1, k + 1, {**base_params, **experiment}, steps, seeds[e * replicates + k])
+            for e, experiment in enumerate(experiments) for k in range(replicates)]
+
+    start = time.time()
+    results = []
+    if workers == 1:
+        for job in jobs:
+            results.extend(run_experiment_job(job))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_experiment_job, job) for job in jobs]
+            for done, future in enumerate(as_completed(futures), 1):
+                results.extend(future.result())
+                elapsed = time.time() - start
+                logger.info(f"[EXPERIMENTS] {done}/{len(jobs)} runs done, elapsed {elapsed:.1f}s, "
+                            f"ETA {elapsed / done * (len(jobs) - done):.1f}s")
+
+    by_experiment = {e + 1: experiment for e, experiment in enumerate(experiments)}
+    rows = []
+    for experiment, run_number, type_name, final, mean in sorted(
+            results, key=lambda r: (r[0], r[1], TYPES.index(r[2]))):
+        point = by_experiment[experiment]
+        rows.append((experiment, run_number, *(point.get(name, base_params.get(name)) for name in names),
+                     type_name, f"{final:.10g}", f"{mean:.10g}"))
+
+    if output is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["experiment ", "run number ", *(f"{NETLOGO_NAMES[name]} " for name in names),
+                             "types", " final frequency of the trait %", "mean frequency of the trait %"])
+            writer.writerows(rows)
+        logger.info(f"Saving experiment results to: {output}")
+    return rows
+
+
+# ---------------- Command line ----------------
+def parse_values(pairs):
+    """``NAME=VALUE`` strings (NetLogo-style dashed names allowed) -> parameter dict"""
+    params = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        key = key.strip().replace("-", "_").lower()
+        if not sep or key not in NETLOGO_NAMES:
+            raise ValueError(f"Expected NAME=VALUE with NAME one of {sorted(NETLOGO_NAMES)}, got {pair!r}")
+        value = value.strip()
+        if key == 'punishment':
+            params[key] = value
+        else:
+            number = float(value)
+            params[key] = int(number) if number.is_integer() else number
+    return params
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Monitoring & punishment model (second model), headless")
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="one run, printing the type frequencies")
+    run.add_argument("--steps", type=int, default=2000, help="ticks to run (default: 2000)")
+    run.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                     help="model parameter override, e.g. harvest-greedy=12 (repeatable)")
+    run.add_argument("--seed", type=int, default=None, help="random seed")
+
+    experiments = commands.add_parser("experiments", help="BehaviorSpace-style experiments over all cores")
+    experiments.add_argument("--experiment", action="append", default=[], metavar="NAME=V,NAME=V",
+                             help="parameter values of one experiment (repeatable; default: the "
+                                  "Harvest-greedy x Perception-accuracy pairs of the NetLogo results)")
+    experiments.add_argument("--replicates", type=int, default=8, help="runs per experiment (default: 8)")
+    experiments.add_argument("--steps", type=int, default=2000, help="ticks per run (default: 2000)")
+    experiments.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                             help="fixed model parameter override (repeatable)")
+    experiments.add_argument("--seed", type=int, default=None, help="root seed; every run gets its own child stream")
+    experiments.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    experiments.add_argument("--output", default=os.path.join("results", "second_model_experiments.csv"),
+                             help="CSV file to write (default: results/second_model_experiments.csv)")
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.command is None:
+        build_arg_parser().print_help()
+        return 2
+    try:
+        params = parse_values(args.param)
+        if args.steps <= 0:
+            raise ValueError("Steps must be positive")
+        if args.command == "experiments":
+            experiments = [parse_values(spec.split(",")) for spec in args.experiment] or DEFAULT_EXPERIMENTS
+            if args.replicates <= 0:
+                raise ValueError("Replicates must be positive")
+        points = [params] if args.command == "run" else [{**params, **e} for e in experiments]
+        if any(point.get('punishment', PUNISHMENTS[1]) not in PUNISHMENTS for point in points):
+            raise ValueError(f"Punishment must be one of {PUNISHMENTS}")
+    except ValueError as e:
+        logger.error(f"Parameter error: {e}")
+        return 2
+
+    if args.command == "run":
+        start = time.time()
+        model = CommonsModel(**params, random_seed=args.seed).run(args.steps)
+        final, mean = model.type_frequencies()
+        logger.info(f"Finished {model.stats.steps_seen} ticks in {time.time() - start:.2f}s, "
+                    f"{model.agents.n_alive} agents alive")
+        for name, f, m in zip(TYPES, final, mean):
+            print(f"{name.strip():28s} final {f:6.2f}%  mean {m:6.2f}%")
+        return 0
+
+    run_experiments(experiments, replicates=args.replicates, steps=args.steps, base_params=params,
+                    output=args.output, workers=args.workers, root_seed=args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
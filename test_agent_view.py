@@ -0,0 +1,23 @@
+"""Smoke checks for the dict-style agent access kept for old code (AgentView)"""
+from Python_NetLogo_like_model_group_dispersal_Matplotlib_Animation import AgentModel, AgentView, STRATEGIES
+
+
+def test_agent_accessors():
+    model = AgentModel(random_seed=1, debug_mode=False, initial_agents=20)
+    model.step()
+    model.collect_stats(0)
+
+    alive = model.get_alive_agents()
+    assert len(alive) == int(model.agents.alive[:model.agents.size].sum())
+    assert all(isinstance(agent, AgentView) and agent['alive'] for agent in alive)
+
+    store = model.agents
+    agent = store[0]
+    assert agent['id'] == int(store.id[0])
+    assert agent['position'] == (int(store.x[0]), int(store.y[0]))
+    assert agent['strategy'] in STRATEGIES
+    assert agent['eattype'] in ('low', 'high')
+    assert agent.get('no such key', 'default') == 'default'
+    assert store[-1]['id'] == int(store.id[store.size - 1])
+    assert [a['id'] for a in store] == store.id[:store.size].tolist()
+    assert store.view(0)['id'] == agent['id']